@@ -52,6 +52,10 @@ PERFORMANCE OF THIS SOFTWARE.
 #define HAVE_MYSQL_OPT_LOCAL_INFILE_DIR
 #endif
 
+#if defined(MARIADB_PACKAGE_VERSION_ID) && MARIADB_PACKAGE_VERSION_ID >= 30000
+#define HAVE_STMT_ARRAY_BINDING
+#endif
+
 #define PY_SSIZE_T_CLEAN 1
 #include "Python.h"
 
@@ -61,6 +65,7 @@ PERFORMANCE OF THIS SOFTWARE.
 
 #include "bytesobject.h"
 #include "structmember.h"
+#include "datetime.h"
 #include "errmsg.h"
 
 #define MyAlloc(s,t) (s *) t.tp_alloc(&t,0)
@@ -78,12 +83,18 @@ static PyObject *_mysql_InternalError;
 static PyObject *_mysql_ProgrammingError;
 static PyObject *_mysql_NotSupportedError;
 
+/* Default temporal converters from MySQLdb.times. */
+static PyObject *_mysql_DateTime_or_None;
+static PyObject *_mysql_Date_or_None;
+static PyObject *_mysql_TimeDelta_or_None;
+
 typedef struct {
     PyObject_HEAD
     MYSQL connection;
     bool open;
     bool reconnect;
     PyObject *converter;
+    PyObject *plan_cache; // column signature -> decode plan
     PyThread_type_lock lock;
 } _mysql_ConnectionObject;
 
@@ -91,6 +102,70 @@ typedef struct {
 
 extern PyTypeObject _mysql_ConnectionObject_Type;
 
+/* How a column is decoded. The kinds other than DECODE_CALL are handled
+ * in C without calling the converter. */
+enum {
+    DECODE_BYTES,
+    DECODE_STR,
+    DECODE_INT,
+    DECODE_DATETIME,
+    DECODE_DATE,
+    DECODE_TIMEDELTA,
+    DECODE_FLOAT,
+    DECODE_SCALED_INT,
+    DECODE_CALL,
+};
+
+/* Representation of DECIMAL columns (decimal_format option). */
+enum {
+    DECIMAL_AS_DECIMAL,  // converter of the column, decimal.Decimal by default
+    DECIMAL_AS_FLOAT,
+    DECIMAL_AS_INT,      // int scaled by 10**decimals
+    DECIMAL_AS_STR,
+};
+
+typedef struct {
+    int kind;
+    // Pass bytes instead of str when the converter is called.
+    bool binary;
+    int scale; // for DECODE_SCALED_INT
+    PyObject *converter; // borrowed from _mysql_DecodePlan.converter
+    vectorcallfunc vectorcall;
+} _mysql_ColumnDecoder;
+
+/* Decode plan of a result set. It depends only on the converter mapping
+ * and the column signature (type, flags and charset of each column), so
+ * it is cached in the connection and shared by results of the same shape. */
+typedef struct {
+    Py_ssize_t nfields;
+    PyObject *converter; // tuple of converters, one per column
+    _mysql_ColumnDecoder columns[];
+} _mysql_DecodePlan;
+
+#define DECODE_PLAN_CAPSULE "_mysql.decode_plan"
+#define PLAN_CACHE_SIZE 256
+
+/* Rows of a use result are read in batches without the GIL. Rows
+ * returned by mysql_fetch_row() are valid only until the next call, so
+ * they are copied into one buffer. The last batch is kept in the result,
+ * for unread(). */
+#define ROW_BATCH_SIZE 4096
+#define ROW_BATCH_BYTES (16 * 1024 * 1024)
+
+typedef struct {
+    unsigned int nfields;
+    Py_ssize_t nrows;
+    Py_ssize_t pos;         /* next row to return */
+    Py_ssize_t start;       /* first row unread() can give back */
+    Py_ssize_t allocated;   /* rows of values and lengths */
+    bool eof;
+    MYSQL_ROW values;       /* nrows * nfields, pointers into data */
+    unsigned long *lengths; /* nrows * nfields */
+    char *data;
+    size_t size;
+    size_t capacity;
+} _mysql_RowBatch;
+
 typedef struct {
     PyObject_HEAD
     PyObject *conn;
@@ -99,11 +174,54 @@ typedef struct {
     int use;
     char has_next;
     PyObject *converter;
+    PyObject *plan; // capsule of _mysql_DecodePlan
+    _mysql_ColumnDecoder *decoders;
     const char *encoding;
+    _mysql_RowBatch batch;
 } _mysql_ResultObject;
 
 extern PyTypeObject _mysql_ResultObject_Type;
 
+/* Row formats, the how argument of fetch_row(). */
+enum {
+    ROW_TUPLE,
+    ROW_DICT,
+    ROW_DICT_OLD,
+    ROW_LAZY,
+    ROW_NAMED,
+};
+
+static PyObject *_mysql_named_row_types; // column names -> named row type
+static PyObject *_mysql_array_type; // array.array
+#define NAMED_ROW_CACHE_SIZE 256
+
+/* Row of a stored result which converts a column when it is accessed.
+ * The row pointer stays valid as long as the result is alive. */
+typedef struct {
+    PyObject_VAR_HEAD
+    _mysql_ResultObject *result;
+    PyObject *names; // column name -> index, shared by rows of the result
+    MYSQL_ROW row;
+    unsigned long *lengths;
+    PyObject *values[1]; // converted values, NULL until accessed
+} _mysql_LazyRowObject;
+
+extern PyTypeObject _mysql_LazyRowObject_Type;
+
+/* Sequence of the rows of a stored result. Rows are converted when they
+ * are accessed, so the result set is never held as Python objects. */
+typedef struct {
+    PyObject_HEAD
+    _mysql_ResultObject *result;
+    int how;
+    Py_ssize_t nrows;
+    MYSQL_ROW_OFFSET *offsets; // mysql_row_tell() of each row
+    PyObject *cache; // keys of dict rows, filled by the first converted row
+    bool cache_filled;
+} _mysql_RowsObject;
+
+extern PyTypeObject _mysql_RowsObject_Type;
+
 static int
 _mysql_ConnectionObject_AllocateLock(_mysql_ConnectionObject *self)
 {
@@ -166,22 +284,13 @@ _mysql_ConnectionObject_Unlock(_mysql_ConnectionObject *self)
     BEGIN_CONNECTION_OPERATION(result_connection(r), on_closed)
 
 
-PyObject *
-_mysql_Exception(_mysql_ConnectionObject *c)
+/* Raises the exception class of the MySQL error code merr. */
+static PyObject *
+_mysql_SetError(int merr, const char *message)
 {
     PyObject *t, *e;
-    int merr;
 
     if (!(t = PyTuple_New(2))) return NULL;
-    if (!(c->open)) {
-        /* GH-270: When connection is closed, accessing the c->connection
-         * object may cause SEGV.
-         */
-        merr = CR_SERVER_GONE_ERROR;
-    }
-    else {
-        merr = mysql_errno(&(c->connection));
-    }
     switch (merr) {
     case 0:
         e = _mysql_InterfaceError;
@@ -272,12 +381,195 @@ _mysql_Exception(_mysql_ConnectionObject *c)
         break;
     }
     PyTuple_SET_ITEM(t, 0, PyLong_FromLong((long)merr));
-    PyTuple_SET_ITEM(t, 1, PyUnicode_FromString(mysql_error(&(c->connection))));
+    PyTuple_SET_ITEM(t, 1, PyUnicode_FromString(message));
     PyErr_SetObject(e, t);
     Py_DECREF(t);
     return NULL;
 }
 
+PyObject *
+_mysql_Exception(_mysql_ConnectionObject *c)
+{
+    int merr;
+
+    if (!(c->open)) {
+        /* GH-270: When connection is closed, accessing the c->connection
+         * object may cause SEGV.
+         */
+        merr = CR_SERVER_GONE_ERROR;
+    }
+    else {
+        merr = mysql_errno(&(c->connection));
+    }
+    return _mysql_SetError(merr, mysql_error(&(c->connection)));
+}
+
+/* Growing byte buffer, allocated with PyMem_Raw* so that it can be
+ * filled without the GIL. If bytes is set, data is the buffer of that
+ * bytes object instead, see _mysql_Buffer_init_bytes(). */
+typedef struct {
+    char *data;
+    size_t size;
+    size_t capacity;
+    PyObject *bytes;
+} _mysql_Buffer;
+
+/* Reserves n more bytes. It may be called without the GIL. */
+static int
+_mysql_Buffer_reserve(
+    _mysql_Buffer *b,
+    size_t n)
+{
+    if (b->size + n <= b->capacity) {
+        return 0;
+    }
+    // Double the capacity, or grow to the exact size needed by a large
+    // append, so that a big value doesn't take twice its size.
+    size_t capacity = b->capacity ? b->capacity * 2 : 4096;
+    if (capacity < b->size + n) capacity = b->size + n;
+    if (b->bytes) {
+        if (_PyBytes_Resize(&b->bytes, capacity) < 0) {
+            b->data = NULL;
+            b->capacity = b->size = 0;
+            return -1;
+        }
+        b->data = PyBytes_AS_STRING(b->bytes);
+    } else {
+        char *data = PyMem_RawRealloc(b->data, capacity);
+        if (!data) {
+            return -1;
+        }
+        b->data = data;
+    }
+    b->capacity = capacity;
+    return 0;
+}
+
+/* Makes b build a bytes object in place, which _mysql_Buffer_finish()
+ * returns without another copy. Needs the GIL to grow. */
+static int
+_mysql_Buffer_init_bytes(
+    _mysql_Buffer *b,
+    size_t capacity)
+{
+    if (!(b->bytes = PyBytes_FromStringAndSize(NULL, capacity ? capacity : 1))) {
+        return -1;
+    }
+    b->data = PyBytes_AS_STRING(b->bytes);
+    b->size = 0;
+    b->capacity = PyBytes_GET_SIZE(b->bytes);
+    return 0;
+}
+
+/* Returns the bytes object of a buffer set up by _mysql_Buffer_init_bytes(). */
+static PyObject *
+_mysql_Buffer_finish(
+    _mysql_Buffer *b)
+{
+    PyObject *r = b->bytes;
+    b->bytes = NULL;
+    b->data = NULL;
+    if (_PyBytes_Resize(&r, b->size) < 0) {
+        return NULL;
+    }
+    return r;
+}
+
+/* Bytes mysql_real_escape_string() may escape as two: the special
+ * characters in any character set, and in UTF-8 the bytes which may start
+ * a multibyte character, which are escaped when the character is invalid. */
+enum {
+    ESCAPED_SPECIAL = 1,
+    ESCAPED_UTF8_LEAD = 2,
+};
+static const unsigned char _mysql_escaped_bytes[256] = {
+    ['\0'] = ESCAPED_SPECIAL, ['\n'] = ESCAPED_SPECIAL, ['\r'] = ESCAPED_SPECIAL,
+    ['\\'] = ESCAPED_SPECIAL, ['\''] = ESCAPED_SPECIAL, ['"'] = ESCAPED_SPECIAL,
+    ['\032'] = ESCAPED_SPECIAL,
+};
+
+/* Which bytes of the connection character set mysql_real_escape_string()
+ * may escape, for _mysql_escaped_size(). */
+enum {
+    ESCAPE_SINGLE_BYTE = ESCAPED_SPECIAL,
+    ESCAPE_UTF8 = ESCAPED_SPECIAL | ESCAPED_UTF8_LEAD,
+    ESCAPE_MULTIBYTE = 0, // other multibyte character sets: any lead byte
+};
+
+/* Returns the ESCAPE_* kind of the character set of mysql, which must be
+ * locked, or ESCAPE_MULTIBYTE for NULL (the default character set). */
+static int
+_mysql_escape_kind(
+    MYSQL *mysql)
+{
+    if (!mysql) {
+        return ESCAPE_MULTIBYTE;
+    }
+    MY_CHARSET_INFO cs;
+    mysql_get_character_set_info(mysql, &cs);
+    if (cs.mbmaxlen <= 1) {
+        return ESCAPE_SINGLE_BYTE;
+    }
+    if (strncmp("utf8", cs.csname, 4) == 0) {
+        return ESCAPE_UTF8;
+    }
+    return ESCAPE_MULTIBYTE;
+}
+
+/* Strings at least this long are scanned and escaped without the GIL,
+ * so that other threads run while multi-megabyte values are escaped.
+ * The input must not change meanwhile: it is immutable or exported. */
+#define ESCAPE_NOGIL_SIZE (1 << 20)
+
+/* Returns an upper bound of the size of in escaped in a character set
+ * of the ESCAPE_* kind. Short strings, and strings in multibyte character
+ * sets other than UTF-8, whose lead bytes may all be escaped, are not
+ * scanned: twice their size is reserved. */
+static size_t
+_mysql_escaped_size(
+    const char *in,
+    size_t size,
+    int kind)
+{
+    if (size < 4096 || kind == ESCAPE_MULTIBYTE) {
+        return size * 2;
+    }
+    PyThreadState *save = size >= ESCAPE_NOGIL_SIZE ? PyEval_SaveThread() : NULL;
+    size_t n = size;
+    for (size_t i = 0; i < size; i++) {
+        unsigned char c = in[i];
+        n += ((_mysql_escaped_bytes[c] | (c >= 0xc0 ? ESCAPED_UTF8_LEAD : 0)) & kind) != 0;
+    }
+    if (save) PyEval_RestoreThread(save);
+    return n;
+}
+
+/* Escapes in into out like string_literal() without the quotes, with the
+ * connection if use_connection (its lock must be held). Returns the
+ * length of out. */
+static unsigned long
+_mysql_real_escape(
+    MYSQL *mysql,
+    bool use_connection,
+    char *out,
+    const char *in,
+    size_t size)
+{
+    unsigned long len;
+    PyThreadState *save = size >= ESCAPE_NOGIL_SIZE ? PyEval_SaveThread() : NULL;
+    if (use_connection) {
+#if MYSQL_VERSION_ID >= 50707 && !defined(MARIADB_BASE_VERSION) && !defined(MARIADB_VERSION_ID)
+        len = mysql_real_escape_string_quote(mysql, out, in, size, '\'');
+#else
+        len = mysql_real_escape_string(mysql, out, in, size);
+#endif
+    } else {
+        len = mysql_escape_string(out, in, size);
+    }
+    if (save) PyEval_RestoreThread(save);
+    return len;
+}
+
 static const char *utf8 = "utf8";
 
 static const char*
@@ -300,6 +592,275 @@ _get_encoding(MYSQL *mysql)
     return cs.csname;
 }
 
+/* MySQLdb.times imports this module, so the default converters can not be
+ * looked up in PyInit__mysql(). They are loaded when the first result is
+ * created instead. */
+static int
+_mysql_load_time_converters(void)
+{
+    if (_mysql_DateTime_or_None) {
+        return 0;
+    }
+    PyObject *times = PyImport_ImportModule("MySQLdb.times");
+    if (!times) {
+        return -1;
+    }
+    PyObject *datetime_or_none = PyObject_GetAttrString(times, "DateTime_or_None");
+    PyObject *date_or_none = PyObject_GetAttrString(times, "Date_or_None");
+    PyObject *timedelta_or_none = PyObject_GetAttrString(times, "TimeDelta_or_None");
+    Py_DECREF(times);
+    if (!datetime_or_none || !date_or_none || !timedelta_or_none) {
+        Py_XDECREF(datetime_or_none);
+        Py_XDECREF(date_or_none);
+        Py_XDECREF(timedelta_or_none);
+        return -1;
+    }
+    _mysql_Date_or_None = date_or_none;
+    _mysql_TimeDelta_or_None = timedelta_or_none;
+    _mysql_DateTime_or_None = datetime_or_none;
+    return 0;
+}
+
+/* Look up the converter for a field in the conversion mapping.
+ * Returns a new reference; Py_None when there is no converter. */
+static PyObject *
+_mysql_resolve_converter(PyObject *conv, MYSQL_FIELD *field)
+{
+    PyObject *tmp, *fun;
+    tmp = PyLong_FromLong((long) field->type);
+    if (!tmp) {
+        return NULL;
+    }
+    fun = conv ? PyObject_GetItem(conv, tmp) : NULL;
+    Py_DECREF(tmp);
+    if (!fun) {
+        if (PyErr_Occurred()) {
+            if (!PyErr_ExceptionMatches(PyExc_KeyError)) {
+                return NULL;
+            }
+            PyErr_Clear();
+        }
+        Py_RETURN_NONE;
+    }
+    if (PySequence_Check(fun)) {
+        long flags = field->flags;
+        PyObject *fun2=NULL;
+        Py_ssize_t j, n2=PySequence_Size(fun);
+        // BINARY_FLAG means ***_bin collation is used.
+        // To distinguish text and binary, we should use charsetnr==63 (binary).
+        // But we abuse BINARY_FLAG for historical reason.
+        if (field->charsetnr == 63) {
+            flags |= BINARY_FLAG;
+        } else {
+            flags &= ~BINARY_FLAG;
+        }
+        for (j=0; j<n2; j++) {
+            PyObject *t = PySequence_GetItem(fun, j);
+            if (!t) {
+                Py_DECREF(fun);
+                return NULL;
+            }
+            if (PyTuple_Check(t) && PyTuple_GET_SIZE(t) == 2) {
+                PyObject *pmask = PyTuple_GET_ITEM(t, 0);
+                if (!PyLong_Check(pmask) || (PyLong_AS_LONG(pmask) & flags)) {
+                    fun2 = PyTuple_GET_ITEM(t, 1);
+                    Py_INCREF(fun2);
+                    Py_DECREF(t);
+                    break;
+                }
+            }
+            Py_DECREF(t);
+        }
+        if (!fun2) {
+            fun2 = Py_None;
+            Py_INCREF(fun2);
+        }
+        Py_DECREF(fun);
+        fun = fun2;
+    }
+    return fun;
+}
+
+static void
+_mysql_DecodePlan_destructor(PyObject *capsule)
+{
+    _mysql_DecodePlan *plan = PyCapsule_GetPointer(capsule, DECODE_PLAN_CAPSULE);
+    Py_XDECREF(plan->converter);
+    PyMem_Free(plan);
+}
+
+static int
+_get_decimal_format_num(const char *decimal_format)
+{
+    static const char *decimal_format_list[] = {
+        "decimal", "float", "int", "str" };
+    unsigned int i;
+    if (!decimal_format) {
+        return DECIMAL_AS_DECIMAL;
+    }
+    for (i=0; i < sizeof(decimal_format_list)/sizeof(decimal_format_list[0]); i++) {
+        if (strcmp(decimal_format, decimal_format_list[i]) == 0) {
+            return i;
+        }
+    }
+    return -1;
+}
+
+static PyObject *
+_mysql_compile_decode_plan(
+    PyObject *conv,
+    MYSQL_FIELD *fields,
+    unsigned int n,
+    int decimal_format)
+{
+    _mysql_DecodePlan *plan = PyMem_Calloc(1,
+            sizeof(_mysql_DecodePlan) + n * sizeof(_mysql_ColumnDecoder));
+    if (!plan) {
+        return PyErr_NoMemory();
+    }
+    plan->nfields = n;
+    PyObject *capsule = PyCapsule_New(plan, DECODE_PLAN_CAPSULE,
+                                      _mysql_DecodePlan_destructor);
+    if (!capsule) {
+        PyMem_Free(plan);
+        return NULL;
+    }
+    if (!(plan->converter = PyTuple_New(n))) {
+        Py_DECREF(capsule);
+        return NULL;
+    }
+    if (_mysql_load_time_converters() < 0) {
+        Py_DECREF(capsule);
+        return NULL;
+    }
+    for (unsigned int i=0; i<n; i++) {
+        _mysql_ColumnDecoder *dec = &plan->columns[i];
+        PyObject *fun;
+        bool is_decimal = (fields[i].type == FIELD_TYPE_DECIMAL ||
+                           fields[i].type == FIELD_TYPE_NEWDECIMAL);
+        if (is_decimal && decimal_format == DECIMAL_AS_FLOAT) {
+            fun = (PyObject*)&PyFloat_Type;
+            Py_INCREF(fun);
+        }
+        else if (is_decimal && decimal_format == DECIMAL_AS_INT) {
+            fun = (PyObject*)&PyLong_Type;
+            Py_INCREF(fun);
+        }
+        else if (is_decimal && decimal_format == DECIMAL_AS_STR) {
+            fun = (PyObject*)&PyUnicode_Type;
+            Py_INCREF(fun);
+        }
+        else {
+            fun = _mysql_resolve_converter(conv, &fields[i]);
+        }
+        if (!fun) {
+            Py_DECREF(capsule);
+            return NULL;
+        }
+        PyTuple_SET_ITEM(plan->converter, i, fun);
+        dec->converter = fun;
+
+        switch (fields[i].type) {
+        case FIELD_TYPE_DECIMAL:
+        case FIELD_TYPE_NEWDECIMAL:
+        case FIELD_TYPE_TIMESTAMP:
+        case FIELD_TYPE_DATETIME:
+        case FIELD_TYPE_TIME:
+        case FIELD_TYPE_DATE:
+            dec->binary = false;  // pass str, because these converters expect it
+            break;
+        default: // Default to just passing bytes
+            dec->binary = true;
+        }
+
+        if (fun == Py_None || fun == (PyObject*)&PyBytes_Type) {
+            dec->kind = DECODE_BYTES;
+        }
+        else if (fun == (PyObject*)&PyUnicode_Type) {
+            dec->kind = DECODE_STR;
+        }
+        else if (fun == (PyObject*)&PyLong_Type) {
+            if (!is_decimal) {
+                dec->kind = DECODE_INT;
+            } else if (decimal_format == DECIMAL_AS_INT) {
+                dec->kind = DECODE_SCALED_INT;
+                dec->scale = fields[i].decimals;
+            } else {
+                // int as a converter of DECIMAL: int('1.50') raises.
+                dec->kind = DECODE_CALL;
+            }
+        }
+        else if (fun == (PyObject*)&PyFloat_Type) {
+            dec->kind = DECODE_FLOAT;
+        }
+        else if (fun == _mysql_DateTime_or_None) {
+            dec->kind = DECODE_DATETIME;
+        }
+        else if (fun == _mysql_Date_or_None) {
+            dec->kind = DECODE_DATE;
+        }
+        else if (fun == _mysql_TimeDelta_or_None) {
+            dec->kind = DECODE_TIMEDELTA;
+        }
+        else {
+            dec->kind = DECODE_CALL;
+        }
+        dec->vectorcall = PyVectorcall_Function(fun);
+    }
+    return capsule;
+}
+
+/* Returns the decode plan (a capsule) for the fields. Plans are cached
+ * in the connection when the connection's converter mapping is used, and
+ * dropped when the mapping is reassigned. In-place changes of the mapping
+ * are not detected, since that would cost a lookup per column. */
+static PyObject *
+_mysql_get_decode_plan(
+    _mysql_ConnectionObject *conn,
+    PyObject *conv,
+    MYSQL_FIELD *fields,
+    unsigned int n,
+    int decimal_format)
+{
+    PyObject *cache = conn->plan_cache;
+    if (!cache || !conv || conv != conn->converter) {
+        return _mysql_compile_decode_plan(conv, fields, n, decimal_format);
+    }
+
+    PyObject *key = PyBytes_FromStringAndSize(NULL, ((Py_ssize_t)n * 3 + 1) * sizeof(uint32_t));
+    if (!key) {
+        return NULL;
+    }
+    uint32_t *sig = (uint32_t *)PyBytes_AS_STRING(key);
+    *sig++ = (uint32_t)decimal_format;
+    for (unsigned int i=0; i<n; i++) {
+        sig[i*3] = (uint32_t)fields[i].type;
+        sig[i*3+1] = (uint32_t)fields[i].flags;
+        sig[i*3+2] = (uint32_t)fields[i].charsetnr;
+    }
+
+    PyObject *plan = PyDict_GetItemWithError(cache, key); // borrowed
+    if (plan) {
+        Py_DECREF(key);
+        return Py_NewRef(plan);
+    }
+    if (PyErr_Occurred() ||
+            !(plan = _mysql_compile_decode_plan(conv, fields, n, decimal_format))) {
+        Py_DECREF(key);
+        return NULL;
+    }
+    if (PyDict_GET_SIZE(cache) >= PLAN_CACHE_SIZE) {
+        PyDict_Clear(cache);
+    }
+    if (PyDict_SetItem(cache, key, plan) < 0) {
+        Py_DECREF(key);
+        Py_DECREF(plan);
+        return NULL;
+    }
+    Py_DECREF(key);
+    return plan;
+}
+
 static const char _mysql_ResultObject__doc__[] =
 "result(connection, use=0, converter={}) -- Result set from a query.\n\
 \n\
@@ -315,17 +876,25 @@ _mysql_ResultObject_Initialize(
     PyObject *args,
     PyObject *kwargs)
 {
-    static char *kwlist[] = {"connection", "use", "converter", NULL};
+    static char *kwlist[] = {"connection", "use", "converter",
+                             "decimal_format", NULL};
     MYSQL_RES *result;
     _mysql_ConnectionObject *conn=NULL;
     int use=0;
     PyObject *conv=NULL;
-    int n, i;
+    const char *decimal_format=NULL;
+    int decimal_format_num;
+    unsigned int n;
     MYSQL_FIELD *fields;
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!|iO", kwlist,
-                     &_mysql_ConnectionObject_Type, &conn, &use, &conv))
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!|iOz", kwlist,
+                     &_mysql_ConnectionObject_Type, &conn, &use, &conv,
+                     &decimal_format))
         return -1;
+    if ((decimal_format_num = _get_decimal_format_num(decimal_format)) < 0) {
+        PyErr_Format(PyExc_ValueError, "Unknown decimal_format: %s", decimal_format);
+        return -1;
+    }
 
     self->conn = (PyObject *) conn;
     Py_INCREF(conn);
@@ -360,78 +929,14 @@ _mysql_ResultObject_Initialize(
     }
     n = mysql_num_fields(result);
     self->nfields = n;
-    if (!(self->converter = PyTuple_New(n))) {
-        return -1;
-    }
     fields = mysql_fetch_fields(result);
-    for (i=0; i<n; i++) {
-        PyObject *tmp, *fun;
-        tmp = PyLong_FromLong((long) fields[i].type);
-        if (!tmp) {
-            return -1;
-        }
-        fun = conv ? PyObject_GetItem(conv, tmp) : NULL;
-        Py_DECREF(tmp);
-        if (!fun) {
-            if (PyErr_Occurred()) {
-                if (!PyErr_ExceptionMatches(PyExc_KeyError)) {
-                    return -1;
-                }
-                PyErr_Clear();
-            }
-            fun = Py_None;
-            Py_INCREF(Py_None);
-        }
-        else if (PySequence_Check(fun)) {
-            long flags = fields[i].flags;
-            PyObject *fun2=NULL;
-            int j, n2=PySequence_Size(fun);
-            // BINARY_FLAG means ***_bin collation is used.
-            // To distinguish text and binary, we should use charsetnr==63 (binary).
-            // But we abuse BINARY_FLAG for historical reason.
-            if (fields[i].charsetnr == 63) {
-                flags |= BINARY_FLAG;
-            } else {
-                flags &= ~BINARY_FLAG;
-            }
-            for (j=0; j<n2; j++) {
-                PyObject *t = PySequence_GetItem(fun, j);
-                if (!t) {
-                    Py_DECREF(fun);
-                    return -1;
-                }
-                if (PyTuple_Check(t) && PyTuple_GET_SIZE(t) == 2) {
-                    long mask;
-                    PyObject *pmask=NULL;
-                    pmask = PyTuple_GET_ITEM(t, 0);
-                    fun2 = PyTuple_GET_ITEM(t, 1);
-                    Py_XINCREF(fun2);
-                    if (PyLong_Check(pmask)) {
-                        mask = PyLong_AS_LONG(pmask);
-                        if (mask & flags) {
-                            Py_DECREF(t);
-                            break;
-                        }
-                        else {
-                            fun2 = NULL;
-                        }
-                    } else {
-                        Py_DECREF(t);
-                        break;
-                    }
-                }
-                Py_DECREF(t);
-            }
-            if (!fun2) {
-                fun2 = Py_None;
-                Py_INCREF(fun2);
-            }
-            Py_DECREF(fun);
-            fun = fun2;
-        }
-        PyTuple_SET_ITEM(self->converter, i, fun);
+    if (!(self->plan = _mysql_get_decode_plan(conn, conv, fields, n, decimal_format_num))) {
+        return -1;
     }
-
+    _mysql_DecodePlan *plan = PyCapsule_GetPointer(self->plan, DECODE_PLAN_CAPSULE);
+    self->decoders = plan->columns;
+    self->converter = plan->converter;
+    Py_INCREF(self->converter);
     return 0;
 }
 
@@ -440,18 +945,16 @@ static int _mysql_ResultObject_traverse(
     visitproc visit,
     void *arg)
 {
-    int r;
-    if (self->converter) {
-        if (!(r = visit(self->converter, arg))) return r;
-    }
-    if (self->conn)
-        return visit(self->conn, arg);
+    Py_VISIT(self->converter);
+    Py_VISIT(self->plan);
+    Py_VISIT(self->conn);
     return 0;
 }
 
 static int _mysql_ResultObject_clear(_mysql_ResultObject *self)
 {
     Py_CLEAR(self->converter);
+    Py_CLEAR(self->plan);
     Py_CLEAR(self->conn);
     return 0;
 }
@@ -521,6 +1024,7 @@ _mysql_ConnectionObject_Initialize(
          *local_infile_dir=NULL;
 
     self->converter = NULL;
+    self->plan_cache = NULL;
     self->open = false;
     self->reconnect = false;
     self->lock = NULL;
@@ -707,6 +1211,8 @@ _mysql_ConnectionObject_Initialize(
     if (!conv)
         return -1;
     self->converter = conv;
+    if (!(self->plan_cache = PyDict_New()))
+        return -1;
 
     /*
       PyType_GenericAlloc() automatically sets up GC allocation and
@@ -793,8 +1299,8 @@ static int _mysql_ConnectionObject_traverse(
     visitproc visit,
     void *arg)
 {
-    if (self->converter)
-        return visit(self->converter, arg);
+    Py_VISIT(self->converter);
+    Py_VISIT(self->plan_cache);
     return 0;
 }
 
@@ -803,6 +1309,7 @@ static int _mysql_ConnectionObject_clear(
 {
     Py_XDECREF(self->converter);
     self->converter = NULL;
+    Py_CLEAR(self->plan_cache);
     return 0;
 }
 
@@ -1126,28 +1633,25 @@ _mysql_escape_string(
     Py_ssize_t size;
     int use_connection = 0;
     if (!PyArg_ParseTuple(args, "s#:escape_string", &in, &size)) return NULL;
-    str = PyBytes_FromStringAndSize((char *) NULL, size*2+1);
-    if (!str) return PyErr_NoMemory();
-    out = PyBytes_AS_STRING(str);
 
     if (self && PyModule_Check((PyObject*)self))
         self = NULL;
     if (self) {
         if (BEGIN_CONNECTION_LOCK(self) < 0) {
-            Py_DECREF(str);
             return NULL;
         }
         use_connection = self->open;
     }
-    if (use_connection) {
-#if MYSQL_VERSION_ID >= 50707 && !defined(MARIADB_BASE_VERSION) && !defined(MARIADB_VERSION_ID)
-        len = mysql_real_escape_string_quote(&(self->connection), out, in, size, '\'');
-#else
-        len = mysql_real_escape_string(&(self->connection), out, in, size);
-#endif
-    } else {
-        len = mysql_escape_string(out, in, size);
+    int kind = _mysql_escape_kind(use_connection ? &(self->connection) : NULL);
+    str = PyBytes_FromStringAndSize((char *) NULL, _mysql_escaped_size(in, size, kind) + 1);
+    if (!str) {
+        if (self) {
+            END_CONNECTION_LOCK(self);
+        }
+        return PyErr_NoMemory();
     }
+    out = PyBytes_AS_STRING(str);
+    len = _mysql_real_escape(self ? &(self->connection) : NULL, use_connection, out, in, size);
     if (self) {
         END_CONNECTION_LOCK(self);
     }
@@ -1217,7 +1721,8 @@ _mysql_string_literal(
     }
 
     // Prepare output buffer (str, out)
-    str = PyBytes_FromStringAndSize((char *) NULL, size*2+3);
+    int kind = _mysql_escape_kind(use_connection ? &(self->connection) : NULL);
+    str = PyBytes_FromStringAndSize((char *) NULL, _mysql_escaped_size(in, size, kind) + 3);
     if (!str) {
         Py_DECREF(s);
         PyErr_NoMemory();
@@ -1226,16 +1731,8 @@ _mysql_string_literal(
     char *out = PyBytes_AS_STRING(str);
 
     // escape
-    unsigned long len;
-    if (use_connection) {
-#if MYSQL_VERSION_ID >= 50707 && !defined(MARIADB_BASE_VERSION) && !defined(MARIADB_VERSION_ID)
-        len = mysql_real_escape_string_quote(&(self->connection), out+1, in, size, '\'');
-#else
-        len = mysql_real_escape_string(&(self->connection), out+1, in, size);
-#endif
-    } else {
-        len = mysql_escape_string(out+1, in, size);
-    }
+    unsigned long len = _mysql_real_escape(self ? &(self->connection) : NULL,
+                                           use_connection, out+1, in, size);
 
     Py_DECREF(s);
     if (self) {
@@ -1317,921 +1814,5703 @@ _mysql_escape(
     }
 }
 
-static const char _mysql_ResultObject_describe__doc__[] =
-"Returns the sequence of 7-tuples required by the DB-API for\n\
-the Cursor.description attribute.\n\
-";
-
-static PyObject *
-_mysql_ResultObject_describe(
-    _mysql_ResultObject *self,
-    PyObject *noargs)
-{
-    PyObject *d;
-    MYSQL_FIELD *fields;
-    unsigned int i, n;
+/* Types which _mysql_literal_append() encodes in C. Other values, and
+ * types whose encoder is not the default one, go through literal(). */
+enum {
+    LITERAL_STR = 1,
+    LITERAL_BYTES = 2,  // bytes and bytearray
+    LITERAL_SEQ = 4,    // tuple and list
+    LITERAL_INT = 8,
+    LITERAL_FLOAT = 16,
+    LITERAL_NONE = 32,
+    LITERAL_BOOL = 64,
+    LITERAL_DATE = 128,
+    LITERAL_DATETIME = 256,
+    LITERAL_TIMEDELTA = 512,
+    LITERAL_DECIMAL = 1024,
+};
 
-    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+/* Types which literal() encodes in C while their encoder is the default
+ * one of MySQLdb.converters.conversions. Loaded on first use, since
+ * MySQLdb.converters imports this module. */
+static struct {
+    PyObject *type;
+    int flag;
+    PyObject *encoder;
+} _mysql_literal_defaults[8];
+static PyTypeObject *_mysql_Decimal_Type;
 
-    n = mysql_num_fields(self->result);
-    fields = mysql_fetch_fields(self->result);
-    if (!(d = PyTuple_New(n))) return NULL;
-    for (i=0; i<n; i++) {
-        PyObject *t;
-        PyObject *name;
-        if (self->encoding == utf8) {
-            name = PyUnicode_DecodeUTF8(fields[i].name, fields[i].name_length, "replace");
-        } else {
-            name = PyUnicode_Decode(fields[i].name, fields[i].name_length, self->encoding, "replace");
-        }
-        if (name == NULL) {
-            goto error;
+static int
+_mysql_load_literal_defaults(void)
+{
+    if (_mysql_literal_defaults[0].type) {
+        return 0;
+    }
+    PyObject *decimal = PyImport_ImportModule("decimal");
+    if (!decimal) {
+        return -1;
+    }
+    PyObject *decimal_type = PyObject_GetAttrString(decimal, "Decimal");
+    Py_DECREF(decimal);
+    if (!decimal_type) {
+        return -1;
+    }
+    PyObject *converters = PyImport_ImportModule("MySQLdb.converters");
+    PyObject *conversions = converters ?
+        PyObject_GetAttrString(converters, "conversions") : NULL;
+    Py_XDECREF(converters);
+    if (!conversions) {
+        Py_DECREF(decimal_type);
+        return -1;
+    }
+    const struct { PyObject *type; int flag; } types[] = {
+        {(PyObject *)&PyLong_Type, LITERAL_INT},
+        {(PyObject *)&PyFloat_Type, LITERAL_FLOAT},
+        {(PyObject *)Py_TYPE(Py_None), LITERAL_NONE},
+        {(PyObject *)&PyBool_Type, LITERAL_BOOL},
+        {(PyObject *)PyDateTimeAPI->DateType, LITERAL_DATE},
+        {(PyObject *)PyDateTimeAPI->DateTimeType, LITERAL_DATETIME},
+        {(PyObject *)PyDateTimeAPI->DeltaType, LITERAL_TIMEDELTA},
+        {decimal_type, LITERAL_DECIMAL},
+    };
+    for (size_t i = 0; i < sizeof(types) / sizeof(types[0]); i++) {
+        PyObject *encoder = PyObject_GetItem(conversions, types[i].type);
+        if (!encoder) {
+            PyErr_Clear();
         }
+        _mysql_literal_defaults[i].flag = types[i].flag;
+        _mysql_literal_defaults[i].encoder = encoder;
+        _mysql_literal_defaults[i].type = Py_NewRef(types[i].type);
+    }
+    Py_DECREF(conversions);
+    _mysql_Decimal_Type = (PyTypeObject *)decimal_type;
+    return 0;
+}
 
-        t = Py_BuildValue("(Niiiiii)",
-                  name,
-                  (long) fields[i].type,
-                  (long) fields[i].max_length,
-                  (long) fields[i].length,
-                  (long) fields[i].length,
-                  (long) fields[i].decimals,
-                  (long) !(IS_NOT_NULL(fields[i].flags)));
-        if (!t) goto error;
-        PyTuple_SET_ITEM(d, i, t);
+/* Returns the LITERAL_* flag of type if encoder is its default encoder,
+ * else 0. */
+static int
+_mysql_literal_flag(
+    PyObject *type,
+    PyObject *encoder)
+{
+    for (size_t i = 0; i < sizeof(_mysql_literal_defaults) / sizeof(_mysql_literal_defaults[0]); i++) {
+        if (_mysql_literal_defaults[i].type == type) {
+            return encoder == _mysql_literal_defaults[i].encoder ?
+                _mysql_literal_defaults[i].flag : 0;
+        }
     }
-    END_RESULT_CONNECTION_LOCK(self);
-    return d;
-  error:
-    END_RESULT_CONNECTION_LOCK(self);
-    Py_XDECREF(d);
-    return NULL;
+    return 0;
 }
 
-static const char _mysql_ResultObject_field_flags__doc__[] =
-"Returns a tuple of field flags, one for each column in the result.\n\
-" ;
+/* Literal encoder of a connection: the Python literal() method, the
+ * types encoded in C and the binary_prefix option. */
+typedef struct {
+    _mysql_ConnectionObject *conn;
+    PyObject *literal;
+    int types;
+    bool binary_prefix;
+    bool locked;          // conn is locked, see _mysql_Literal_lock()
+    const char *encoding; // of conn, while it is locked
+    int escape_kind;      // ESCAPE_* of conn, while it is locked
+} _mysql_Literal;
+
+/* Locks the connection for a batch of values, so that they are escaped
+ * without taking the lock and looking up the character set for each
+ * one. The lock is released while Python's literal() is called. */
+static int
+_mysql_Literal_lock(
+    _mysql_Literal *lit)
+{
+    if (BEGIN_CONNECTION_LOCK(lit->conn) < 0) return -1;
+    lit->locked = true;
+    lit->encoding = lit->conn->open ? _get_encoding(&(lit->conn->connection)) : utf8;
+    lit->escape_kind = _mysql_escape_kind(lit->conn->open ? &(lit->conn->connection) : NULL);
+    return 0;
+}
 
-static PyObject *
-_mysql_ResultObject_field_flags(
-    _mysql_ResultObject *self,
-    PyObject *noargs)
+static void
+_mysql_Literal_unlock(
+    _mysql_Literal *lit)
 {
-    PyObject *d;
-    MYSQL_FIELD *fields;
-    unsigned int i, n;
-    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
-    n = mysql_num_fields(self->result);
-    fields = mysql_fetch_fields(self->result);
-    if (!(d = PyTuple_New(n))) return NULL;
-    for (i=0; i<n; i++) {
-        PyObject *f;
-        if (!(f = PyLong_FromLong((long)fields[i].flags))) goto error;
-        PyTuple_SET_ITEM(d, i, f);
+    if (lit->locked) {
+        END_CONNECTION_LOCK(lit->conn);
+        lit->locked = false;
     }
-    END_RESULT_CONNECTION_LOCK(self);
-    return d;
-  error:
-    END_RESULT_CONNECTION_LOCK(self);
-    Py_XDECREF(d);
-    return NULL;
 }
 
-static PyObject *
-_mysql_field_to_python(
-    PyObject *converter,
-    const char *rowitem,
-    Py_ssize_t length,
-    MYSQL_FIELD *field,
-    const char *encoding)
+/* Appends a quoted and escaped string literal, like string_literal(). */
+static int
+_mysql_escape_append(
+    _mysql_Literal *lit,
+    _mysql_Buffer *b,
+    const char *in,
+    Py_ssize_t size)
 {
-    if (rowitem == NULL) {
-        Py_RETURN_NONE;
+    _mysql_ConnectionObject *self = lit->conn;
+    if (!lit->locked && BEGIN_CONNECTION_LOCK(self) < 0) return -1;
+    int kind = lit->locked ? lit->escape_kind :
+        _mysql_escape_kind(self->open ? &(self->connection) : NULL);
+    if (_mysql_Buffer_reserve(b, _mysql_escaped_size(in, size, kind) + 3)) {
+        if (!lit->locked) END_CONNECTION_LOCK(self);
+        PyErr_NoMemory();
+        return -1;
+    }
+    char *out = b->data + b->size;
+    unsigned long len = _mysql_real_escape(&(self->connection), self->open, out+1, in, size);
+    if (!lit->locked) END_CONNECTION_LOCK(self);
+    out[0] = out[len+1] = '\'';
+    b->size += len + 2;
+    return 0;
+}
+
+static int
+_mysql_Buffer_append(
+    _mysql_Buffer *b,
+    const char *s,
+    size_t len)
+{
+    if (_mysql_Buffer_reserve(b, len)) {
+        PyErr_NoMemory();
+        return -1;
     }
+    memcpy(b->data + b->size, s, len);
+    b->size += len;
+    return 0;
+}
 
-    // Fast paths for int, string and binary.
-    if (converter == (PyObject*)&PyUnicode_Type) {
+/* Appends the SQL literal of o, as Connection.literal() returns it. */
+static int
+_mysql_literal_append(
+    _mysql_Literal *lit,
+    _mysql_Buffer *b,
+    PyObject *o)
+{
+    int types = lit->types;
+    if ((types & LITERAL_STR) && PyUnicode_Check(o)) {
+        const char *encoding = lit->locked ? lit->encoding :
+            lit->conn->open ? _get_encoding(&(lit->conn->connection)) : utf8;
         if (encoding == utf8) {
-            //fprintf(stderr, "decoding with utf8!\n");
-            return PyUnicode_DecodeUTF8(rowitem, length, NULL);
-        } else {
-            //fprintf(stderr, "decoding with %s\n", encoding);
-            return PyUnicode_Decode(rowitem, length, encoding, NULL);
+            Py_ssize_t size;
+            const char *s = PyUnicode_AsUTF8AndSize(o, &size);
+            if (!s) return -1;
+            return _mysql_escape_append(lit, b, s, size);
         }
+        PyObject *e = PyUnicode_AsEncodedString(o, encoding, "strict");
+        if (!e) return -1;
+        int r = _mysql_escape_append(lit, b, PyBytes_AS_STRING(e), PyBytes_GET_SIZE(e));
+        Py_DECREF(e);
+        return r;
     }
-    if (converter == (PyObject*)&PyBytes_Type || converter == Py_None) {
-        //fprintf(stderr, "decoding with bytes\n", encoding);
-        return PyBytes_FromStringAndSize(rowitem, length);
+    if ((types & LITERAL_BYTES) && (PyBytes_Check(o) || PyByteArray_Check(o))) {
+        if (lit->binary_prefix && _mysql_Buffer_append(b, "_binary", 7)) {
+            return -1;
+        }
+        if (PyBytes_Check(o)) {
+            return _mysql_escape_append(lit, b, PyBytes_AS_STRING(o), PyBytes_GET_SIZE(o));
+        }
+        // Exported, so that it can't be resized while escaped without the GIL.
+        Py_buffer view;
+        if (PyObject_GetBuffer(o, &view, PyBUF_SIMPLE)) return -1;
+        int r = _mysql_escape_append(lit, b, view.buf, view.len);
+        PyBuffer_Release(&view);
+        return r;
     }
-    if (converter == (PyObject*)&PyLong_Type) {
-        //fprintf(stderr, "decoding with int\n", encoding);
-        return PyLong_FromString(rowitem, NULL, 10);
+    if ((types & LITERAL_SEQ) && (PyTuple_Check(o) || PyList_Check(o))) {
+        // Nested or self-referencing sequences must not overflow the stack.
+        if (Py_EnterRecursiveCall(" in literal")) return -1;
+        int r = _mysql_Buffer_append(b, "(", 1);
+        for (Py_ssize_t i = 0; !r && i < PySequence_Fast_GET_SIZE(o); i++) {
+            if (i && _mysql_Buffer_append(b, ",", 1)) {
+                r = -1;
+                break;
+            }
+            PyObject *item = Py_NewRef(PySequence_Fast_GET_ITEM(o, i));
+            r = _mysql_literal_append(lit, b, item);
+            Py_DECREF(item);
+        }
+        Py_LeaveRecursiveCall();
+        return r ? -1 : _mysql_Buffer_append(b, ")", 1);
+    }
+    if ((types & LITERAL_NONE) && o == Py_None) {
+        return _mysql_Buffer_append(b, "NULL", 4);
+    }
+    if ((types & LITERAL_BOOL) && PyBool_Check(o)) {
+        return _mysql_Buffer_append(b, o == Py_True ? "1" : "0", 1);
+    }
+    if ((types & LITERAL_INT) && PyLong_CheckExact(o)) {
+        int overflow;
+        long long v = PyLong_AsLongLongAndOverflow(o, &overflow);
+        if (!overflow) {
+            char s[24];
+            return _mysql_Buffer_append(b, s, snprintf(s, sizeof(s), "%lld", v));
+        }
+        PyObject *str = PyObject_Str(o);
+        if (!str) return -1;
+        Py_ssize_t size;
+        const char *s = PyUnicode_AsUTF8AndSize(str, &size);
+        int r = s ? _mysql_Buffer_append(b, s, size) : -1;
+        Py_DECREF(str);
+        return r;
+    }
+    if ((types & LITERAL_DATETIME) && PyDateTime_CheckExact(o)) {
+        // DateTime2literal()
+        char s[40];
+        int n = snprintf(s, sizeof(s), "'%04d-%02d-%02d %02d:%02d:%02d",
+                         PyDateTime_GET_YEAR(o), PyDateTime_GET_MONTH(o),
+                         PyDateTime_GET_DAY(o), PyDateTime_DATE_GET_HOUR(o),
+                         PyDateTime_DATE_GET_MINUTE(o), PyDateTime_DATE_GET_SECOND(o));
+        if (PyDateTime_DATE_GET_MICROSECOND(o)) {
+            n += snprintf(s + n, sizeof(s) - n, ".%06d", PyDateTime_DATE_GET_MICROSECOND(o));
+        }
+        s[n++] = '\'';
+        return _mysql_Buffer_append(b, s, n);
+    }
+    if ((types & LITERAL_DATE) && PyDate_CheckExact(o)) {
+        // Thing2Literal(), the quoted str() of the date
+        char s[16];
+        int n = snprintf(s, sizeof(s), "'%04d-%02d-%02d'", PyDateTime_GET_YEAR(o),
+                         PyDateTime_GET_MONTH(o), PyDateTime_GET_DAY(o));
+        return _mysql_Buffer_append(b, s, n);
+    }
+    if ((types & LITERAL_TIMEDELTA) && PyDelta_CheckExact(o)) {
+        // DateTimeDelta2literal(), without the microseconds
+        int seconds = PyDateTime_DELTA_GET_SECONDS(o);
+        char s[40];
+        int n = snprintf(s, sizeof(s), "'%d %d:%d:%d'", PyDateTime_DELTA_GET_DAYS(o),
+                         seconds / 3600, seconds / 60 % 60, seconds % 60);
+        return _mysql_Buffer_append(b, s, n);
+    }
+    if ((types & LITERAL_DECIMAL) && Py_TYPE(o) == _mysql_Decimal_Type) {
+        // Decimal2Literal()
+        PyObject *str = PyObject_CallMethod(o, "__format__", "s", "f");
+        if (!str) return -1;
+        Py_ssize_t size;
+        const char *s = PyUnicode_AsUTF8AndSize(str, &size);
+        int r = s ? _mysql_Buffer_append(b, s, size) : -1;
+        Py_DECREF(str);
+        return r;
+    }
+    if ((types & LITERAL_FLOAT) && PyFloat_CheckExact(o)) {
+        // Float2Str()
+        char *s = PyOS_double_to_string(PyFloat_AS_DOUBLE(o), 'r', 0, Py_DTSF_ADD_DOT_0, NULL);
+        if (!s) return -1;
+        int r;
+        if (!Py_IS_FINITE(PyFloat_AS_DOUBLE(o))) {
+            PyErr_Format(_mysql_ProgrammingError, "%s can not be used with MySQL", s);
+            r = -1;
+        } else {
+            r = _mysql_Buffer_append(b, s, strlen(s));
+            if (!r && !strchr(s, 'e')) r = _mysql_Buffer_append(b, "e0", 2);
+        }
+        PyMem_Free(s);
+        return r;
     }
 
-    //fprintf(stderr, "decoding with callback\n");
-    //PyObject_Print(converter, stderr, 0);
-    //fprintf(stderr, "\n");
-    int binary;
-    switch (field->type) {
-    case FIELD_TYPE_DECIMAL:
-    case FIELD_TYPE_NEWDECIMAL:
-    case FIELD_TYPE_TIMESTAMP:
-    case FIELD_TYPE_DATETIME:
-    case FIELD_TYPE_TIME:
-    case FIELD_TYPE_DATE:
-        binary = 0;  // pass str, because these converters expect it
-        break;
-    default: // Default to just passing bytes
-        binary = 1;
+    bool locked = lit->locked;
+    _mysql_Literal_unlock(lit);
+    PyObject *s = PyObject_CallOneArg(lit->literal, o);
+    if (locked && _mysql_Literal_lock(lit)) {
+        Py_XDECREF(s);
+        return -1;
     }
-    return PyObject_CallFunction(converter,
-            binary ? "y#" : "s#",
-            rowitem, (Py_ssize_t)length);
+    if (!s) return -1;
+    if (!PyBytes_Check(s)) {
+        PyErr_Format(PyExc_TypeError, "literal() returned %.200s, not bytes",
+                     Py_TYPE(s)->tp_name);
+        Py_DECREF(s);
+        return -1;
+    }
+    int r = _mysql_Buffer_append(b, PyBytes_AS_STRING(s), PyBytes_GET_SIZE(s));
+    Py_DECREF(s);
+    return r;
 }
 
-static PyObject *
-_mysql_row_to_tuple(
-    _mysql_ResultObject *self,
-    MYSQL_ROW row,
-    PyObject *unused)
+/* Sets up lit to encode values like self.literal(): str, bytes,
+ * sequences and the types whose encoder in encoders (if not NULL) is the
+ * default one in C, others by calling self.literal(). */
+static int
+_mysql_Literal_init(
+    _mysql_Literal *lit,
+    _mysql_ConnectionObject *self,
+    PyObject *encoders)
 {
-    unsigned int n, i;
-    unsigned long *length;
-    PyObject *r, *c;
-    MYSQL_FIELD *fields;
-
-    n = mysql_num_fields(self->result);
-    if (!(r = PyTuple_New(n))) return NULL;
-    length = mysql_fetch_lengths(self->result);
-    fields = mysql_fetch_fields(self->result);
-    for (i=0; i<n; i++) {
-        PyObject *v;
-        c = PyTuple_GET_ITEM(self->converter, i);
-        v = _mysql_field_to_python(c, row[i], length[i], &fields[i], self->encoding);
-        if (!v) goto error;
-        PyTuple_SET_ITEM(r, i, v);
+    *lit = (_mysql_Literal){self, NULL, LITERAL_STR | LITERAL_BYTES | LITERAL_SEQ};
+    for (size_t i = 0; encoders && i < sizeof(_mysql_literal_defaults) / sizeof(_mysql_literal_defaults[0]); i++) {
+        PyObject *encoder = PyObject_GetItem(encoders, _mysql_literal_defaults[i].type);
+        if (!encoder) {
+            PyErr_Clear();
+            continue;
+        }
+        if (encoder == _mysql_literal_defaults[i].encoder) {
+            lit->types |= _mysql_literal_defaults[i].flag;
+        }
+        Py_DECREF(encoder);
     }
-    return r;
-  error:
-    Py_XDECREF(r);
-    return NULL;
+    PyObject *prefix = PyObject_GetAttrString((PyObject *)self, "_binary_prefix");
+    if (!prefix) {
+        PyErr_Clear();
+    } else {
+        int t = PyObject_IsTrue(prefix);
+        Py_DECREF(prefix);
+        if (t < 0) return -1;
+        lit->binary_prefix = t;
+    }
+    if (!(lit->literal = PyObject_GetAttrString((PyObject *)self, "literal"))) return -1;
+    return 0;
 }
 
+static const char _mysql_ConnectionObject_literal__doc__[] =
+"literal(obj) -- If obj is a single object, returns an SQL literal as\n\
+bytes. If obj is a tuple or list, the items are converted and returned\n\
+as a parenthesized list.\n\
+\n\
+Values whose encoder in self.encoders is the default one are encoded in\n\
+C; other values are passed to their encoder.\n\
+\n\
+Non-standard. For internal use; do not use this in your applications.";
 static PyObject *
-_mysql_row_to_dict(
-    _mysql_ResultObject *self,
-    MYSQL_ROW row,
-    PyObject *cache)
+_mysql_ConnectionObject_literal(
+    _mysql_ConnectionObject *self,
+    PyObject *o)
 {
-    unsigned int n, i;
-    unsigned long *length;
-    PyObject *r, *c;
-    MYSQL_FIELD *fields;
-
-    n = mysql_num_fields(self->result);
-    if (!(r = PyDict_New())) return NULL;
-    length = mysql_fetch_lengths(self->result);
-    fields = mysql_fetch_fields(self->result);
-    for (i=0; i<n; i++) {
-        PyObject *v;
-        c = PyTuple_GET_ITEM(self->converter, i);
-        v = _mysql_field_to_python(c, row[i], length[i], &fields[i], self->encoding);
-        if (!v) goto error;
-
-        PyObject *pyname = PyUnicode_FromString(fields[i].name);
-        if (pyname == NULL) {
-            Py_DECREF(v);
-            goto error;
+    _mysql_Literal lit = {NULL};
+    PyObject *encoders = NULL, *encoder = NULL, *r = NULL;
+    _mysql_Buffer b = {0};
+    int flag = 0;
+    bool seq = PyTuple_Check(o) || PyList_Check(o);
+
+    if (_mysql_load_literal_defaults()) return NULL;
+    if (seq || !(PyUnicode_Check(o) || PyBytes_Check(o) || PyByteArray_Check(o))) {
+        if (!(encoders = PyObject_GetAttrString((PyObject *)self, "encoders"))) {
+            return NULL;
         }
-        int err = PyDict_Contains(r, pyname);
-        if (err < 0) { // error
-            Py_DECREF(v);
-            goto error;
+    }
+    if (encoders && !seq) {
+        if (!(encoder = PyObject_GetItem(encoders, (PyObject *)Py_TYPE(o)))) {
+            PyErr_Clear();
+            Py_DECREF(encoders);
+            return _mysql_string_literal(self, o);
         }
-        if (err) { // duplicate
-            Py_DECREF(pyname);
-            pyname = PyUnicode_FromFormat("%s.%s", fields[i].table, fields[i].name);
-            if (pyname == NULL) {
-                Py_DECREF(v);
-                goto error;
+        if (!(flag = _mysql_literal_flag((PyObject *)Py_TYPE(o), encoder))) {
+            if (!(r = PyObject_CallFunctionObjArgs(encoder, o, encoders, NULL))) goto done;
+            if (PyUnicode_Check(r)) {
+                const char *encoding = self->open ? _get_encoding(&self->connection) : utf8;
+                Py_SETREF(r, PyUnicode_AsEncodedString(r, encoding, "strict"));
+            } else if (!PyBytes_Check(r)) {
+                PyErr_Format(PyExc_TypeError, "encoder returned %.200s, not bytes",
+                             Py_TYPE(r)->tp_name);
+                Py_CLEAR(r);
             }
+            goto done;
         }
-
-        err = PyDict_SetItem(r, pyname, v);
-        if (cache) {
-            PyTuple_SET_ITEM(cache, i, pyname);
-        } else {
-            Py_DECREF(pyname);
-        }
-        Py_DECREF(v);
-        if (err) {
-            goto error;
-        }
     }
+    if (_mysql_Literal_init(&lit, self, flag ? NULL : encoders)) goto done;
+    if (flag) {
+        lit.types = flag;
+    } else if (seq && (!PyCFunction_Check(lit.literal) ||
+                       PyCFunction_GET_FUNCTION(lit.literal) != (PyCFunction)_mysql_ConnectionObject_literal)) {
+        // Overridden: the items go through the override.
+        lit.types = LITERAL_SEQ;
+    }
+    if (_mysql_Buffer_init_bytes(&b, 64) || _mysql_Literal_lock(&lit)) goto done;
+    int err = _mysql_literal_append(&lit, &b, o);
+    _mysql_Literal_unlock(&lit);
+    if (!err) {
+        r = _mysql_Buffer_finish(&b);
+    }
+  done:
+    Py_XDECREF(b.bytes);
+    Py_XDECREF(encoder);
+    Py_XDECREF(encoders);
+    Py_XDECREF(lit.literal);
     return r;
-error:
-    Py_DECREF(r);
-    return NULL;
 }
 
+static const char _mysql_ConnectionObject_literal_many__doc__[] =
+"literal_many(seq) -- Returns the list of the literal() of the items\n\
+of seq. The connection is locked, and its character set looked up,\n\
+once for all of them.\n\
+\n\
+Non-standard. For internal use; do not use this in your applications.";
 static PyObject *
-_mysql_row_to_dict_old(
-    _mysql_ResultObject *self,
-    MYSQL_ROW row,
-    PyObject *cache)
+_mysql_ConnectionObject_literal_many(
+    _mysql_ConnectionObject *self,
+    PyObject *seq)
 {
-    unsigned int n, i;
-    unsigned long *length;
-    PyObject *r, *c;
-    MYSQL_FIELD *fields;
-
-    n = mysql_num_fields(self->result);
-    if (!(r = PyDict_New())) return NULL;
-    length = mysql_fetch_lengths(self->result);
-    fields = mysql_fetch_fields(self->result);
-    for (i=0; i<n; i++) {
-        PyObject *v;
-        c = PyTuple_GET_ITEM(self->converter, i);
-        v = _mysql_field_to_python(c, row[i], length[i], &fields[i], self->encoding);
-        if (!v) {
+    _mysql_Literal lit = {NULL};
+    PyObject *items = NULL, *encoders = NULL, *r = NULL;
+    _mysql_Buffer b = {0};
+
+    if (_mysql_load_literal_defaults()) return NULL;
+    if (!(items = PySequence_Fast(seq, "argument must be iterable"))) return NULL;
+    if (!(encoders = PyObject_GetAttrString((PyObject *)self, "encoders"))) goto error;
+    if (_mysql_Literal_init(&lit, self, encoders)) goto error;
+    if (!PyCFunction_Check(lit.literal) ||
+            PyCFunction_GET_FUNCTION(lit.literal) != (PyCFunction)_mysql_ConnectionObject_literal) {
+        lit.types = 0;
+    }
+    if (!(r = PyList_New(0))) goto error;
+    if (_mysql_Literal_lock(&lit)) goto error;
+    for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(items); i++) {
+        PyObject *item = Py_NewRef(PySequence_Fast_GET_ITEM(items, i));
+        b.size = 0;
+        int err = _mysql_literal_append(&lit, &b, item);
+        Py_DECREF(item);
+        if (err) goto error;
+        PyObject *s = PyBytes_FromStringAndSize(b.data, b.size);
+        if (!s || PyList_Append(r, s)) {
+            Py_XDECREF(s);
             goto error;
         }
+        Py_DECREF(s);
+    }
+    _mysql_Literal_unlock(&lit);
+    goto done;
+  error:
+    _mysql_Literal_unlock(&lit);
+    Py_CLEAR(r);
+  done:
+    PyMem_RawFree(b.data);
+    Py_DECREF(items);
+    Py_XDECREF(encoders);
+    Py_XDECREF(lit.literal);
+    return r;
+}
 
-        PyObject *pyname;
-        if (strlen(fields[i].table)) {
-            pyname = PyUnicode_FromFormat("%s.%s", fields[i].table, fields[i].name);
-        } else {
-            pyname = PyUnicode_FromString(fields[i].name);
+static const char _mysql_ConnectionObject_bind_query__doc__[] =
+"bind_query(segments, args) -- Returns the bytes segments of a query\n\
+joined by the literal() of the items of args. str parameters are\n\
+escaped straight into the query, which is built in place.\n\
+\n\
+Non-standard. For internal use; use cursor.execute().";
+static PyObject *
+_mysql_ConnectionObject_bind_query(
+    _mysql_ConnectionObject *self,
+    PyObject *args)
+{
+    PyObject *segments, *values;
+    PyObject *parts = NULL, *items = NULL, *encoders = NULL, *r = NULL;
+    _mysql_Literal lit = {NULL};
+    _mysql_Buffer b = {0};
+
+    if (!PyArg_ParseTuple(args, "OO:bind_query", &segments, &values)) return NULL;
+    if (_mysql_load_literal_defaults()) return NULL;
+    if (!(parts = PySequence_Fast(segments, "segments must be a sequence"))) goto done;
+    if (!(items = PySequence_Fast(values, "args must be a sequence"))) goto done;
+    Py_ssize_t n = PySequence_Fast_GET_SIZE(items);
+    if (PySequence_Fast_GET_SIZE(parts) != n + 1) {
+        PyErr_SetString(PyExc_ValueError, "need one more segment than args");
+        goto done;
+    }
+    size_t capacity = 16 * n;
+    for (Py_ssize_t i = 0; i <= n; i++) {
+        PyObject *part = PySequence_Fast_GET_ITEM(parts, i);
+        if (!PyBytes_Check(part)) {
+            PyErr_SetString(PyExc_TypeError, "segments must be bytes");
+            goto done;
         }
-        int err = PyDict_SetItem(r, pyname, v);
-        Py_DECREF(v);
-        if (cache) {
-            PyTuple_SET_ITEM(cache, i, pyname);
-        } else {
-            Py_DECREF(pyname);
+        capacity += PyBytes_GET_SIZE(part);
+    }
+    if (!(encoders = PyObject_GetAttrString((PyObject *)self, "encoders"))) goto done;
+    if (_mysql_Literal_init(&lit, self, encoders)) goto done;
+    if (!PyCFunction_Check(lit.literal) ||
+            PyCFunction_GET_FUNCTION(lit.literal) != (PyCFunction)_mysql_ConnectionObject_literal) {
+        lit.types = 0;
+    }
+    if (_mysql_Buffer_init_bytes(&b, capacity) || _mysql_Literal_lock(&lit)) goto done;
+    for (Py_ssize_t i = 0; ; i++) {
+        PyObject *part = PySequence_Fast_GET_ITEM(parts, i);
+        if (_mysql_Buffer_append(&b, PyBytes_AS_STRING(part), PyBytes_GET_SIZE(part))) break;
+        if (i == n) {
+            r = _mysql_Buffer_finish(&b);
+            break;
         }
-        if (err) {
-            goto error;
+        if (i >= PySequence_Fast_GET_SIZE(items)) {
+            PyErr_SetString(PyExc_RuntimeError, "parameters changed size");
+            break;
         }
+        PyObject *item = Py_NewRef(PySequence_Fast_GET_ITEM(items, i));
+        int err = _mysql_literal_append(&lit, &b, item);
+        Py_DECREF(item);
+        if (err) break;
     }
+    _mysql_Literal_unlock(&lit);
+  done:
+    Py_XDECREF(b.bytes);
+    Py_XDECREF(parts);
+    Py_XDECREF(items);
+    Py_XDECREF(encoders);
+    Py_XDECREF(lit.literal);
     return r;
-  error:
-    Py_XDECREF(r);
-    return NULL;
 }
 
-static PyObject *
-_mysql_row_to_dict_cached(
-    _mysql_ResultObject *self,
-    MYSQL_ROW row,
-    PyObject *cache)
-{
-    PyObject *r = PyDict_New();
-    if (!r) {
-        return NULL;
-    }
-
-    unsigned int n = mysql_num_fields(self->result);
-    unsigned long *length = mysql_fetch_lengths(self->result);
-    MYSQL_FIELD *fields = mysql_fetch_fields(self->result);
-
-    for (unsigned int i=0; i<n; i++) {
-        PyObject *c = PyTuple_GET_ITEM(self->converter, i);
-        PyObject *v = _mysql_field_to_python(c, row[i], length[i], &fields[i], self->encoding);
-        if (!v) {
-            goto error;
-        }
+/* Parsed VALUES template of executemany(): %s or %(name)s placeholders
+ * between literal parts. Part i is text[ends[i-1]:ends[i]], %% is
+ * unescaped. */
+typedef struct {
+    Py_ssize_t nparams;
+    bool named;
+    char *text;
+    size_t *ends;     // nparams + 1
+    PyObject **keys;  // str names, if named
+    PyObject **bkeys; // bytes names, if named
+} _mysql_ValuesTemplate;
 
-        PyObject *pyname = PyTuple_GET_ITEM(cache, i); // borrowed
-        int err = PyDict_SetItem(r, pyname, v);
-        Py_DECREF(v);
-        if (err) {
-            goto error;
+static void
+_mysql_ValuesTemplate_clear(
+    _mysql_ValuesTemplate *t)
+{
+    if (t->keys) {
+        for (Py_ssize_t i = 0; i < t->nparams; i++) {
+            Py_XDECREF(t->keys[i]);
+            Py_XDECREF(t->bkeys[i]);
         }
     }
-    return r;
-  error:
-    Py_XDECREF(r);
-    return NULL;
+    PyMem_Free(t->keys);
+    PyMem_Free(t->bkeys);
+    PyMem_Free(t->text);
+    PyMem_Free(t->ends);
+    memset(t, 0, sizeof(*t));
 }
 
-
-typedef PyObject *_convertfunc(_mysql_ResultObject *, MYSQL_ROW, PyObject *);
-static _convertfunc * const row_converters[] = {
-    _mysql_row_to_tuple,
-    _mysql_row_to_dict,
-    _mysql_row_to_dict_old
-};
-
-Py_ssize_t
-_mysql__fetch_row(
-    _mysql_ResultObject *self,
-    PyObject *r, /* list object */
-    Py_ssize_t maxrows,
-    int how)
+static int
+_mysql_ValuesTemplate_parse(
+    _mysql_ValuesTemplate *t,
+    const char *s,
+    Py_ssize_t len,
+    const char *encoding)
 {
-    _convertfunc *convert_row = row_converters[how];
-
-    PyObject *cache = NULL;
-    if (maxrows > 0 && how > 0) {
-        cache = PyTuple_New(mysql_num_fields(self->result));
-        if (!cache) {
-            return -1;
+    Py_ssize_t n = 0, i;
+    for (i = 0; i + 1 < len; i++) {
+        if (s[i] == '%') {
+            if (s[i + 1] != '%') n++;
+            i++;
         }
     }
+    memset(t, 0, sizeof(*t));
+    t->text = PyMem_Malloc(len ? len : 1);
+    t->ends = PyMem_New(size_t, n + 1);
+    t->keys = PyMem_Calloc(n ? n : 1, sizeof(PyObject *));
+    t->bkeys = PyMem_Calloc(n ? n : 1, sizeof(PyObject *));
+    if (!t->text || !t->ends || !t->keys || !t->bkeys) {
+        PyErr_NoMemory();
+        goto error;
+    }
 
-    Py_ssize_t i;
-    for (i = 0; i < maxrows; i++) {
-        MYSQL_ROW row;
-        if (!self->use)
-            row = mysql_fetch_row(self->result);
-        else {
-            Py_BEGIN_ALLOW_THREADS
-            row = mysql_fetch_row(self->result);
-            Py_END_ALLOW_THREADS
+    size_t size = 0;
+    for (i = 0; i < len; i++) {
+        if (s[i] != '%') {
+            t->text[size++] = s[i];
+            continue;
         }
-        if (!row && mysql_errno(&(((_mysql_ConnectionObject *)(self->conn))->connection))) {
-            _mysql_Exception((_mysql_ConnectionObject *)self->conn);
+        if (++i == len) {
+            PyErr_SetString(_mysql_ProgrammingError, "incomplete format");
             goto error;
         }
-        if (!row) {
-            break;
+        if (s[i] == '%') {
+            t->text[size++] = '%';
+            continue;
         }
-        PyObject *v = convert_row(self, row, cache);
-        if (!v) {
+        bool named = s[i] == '(';
+        if (named) {
+            const char *end = memchr(s + i, ')', len - i);
+            if (!end) {
+                PyErr_SetString(_mysql_ProgrammingError, "incomplete format key");
+                goto error;
+            }
+            const char *name = s + i + 1;
+            Py_ssize_t namelen = end - name;
+            t->bkeys[t->nparams] = PyBytes_FromStringAndSize(name, namelen);
+            t->keys[t->nparams] = PyUnicode_Decode(name, namelen, encoding, "strict");
+            if (!t->bkeys[t->nparams] || !t->keys[t->nparams]) goto error;
+            i = end - s + 1;
+        }
+        if (i == len || s[i] != 's') {
+            PyErr_SetString(_mysql_ProgrammingError,
+                            "only %s and %(name)s placeholders are supported");
             goto error;
         }
-        if (cache) {
-            convert_row = _mysql_row_to_dict_cached;
+        if (t->nparams && named != t->named) {
+            PyErr_SetString(_mysql_ProgrammingError, "format requires a mapping");
+            goto error;
         }
-        if (PyList_Append(r, v)) {
-            Py_DECREF(v);
+        t->named = named;
+        t->ends[t->nparams++] = size;
+    }
+    t->ends[t->nparams] = size;
+    return 0;
+  error:
+    _mysql_ValuesTemplate_clear(t);
+    return -1;
+}
+
+/* Appends the template formatted with a row of parameters. */
+static int
+_mysql_ValuesTemplate_append(
+    _mysql_ValuesTemplate *t,
+    _mysql_Literal *lit,
+    _mysql_Buffer *b,
+    PyObject *row)
+{
+    PyObject *seq = NULL;
+    if (!t->named) {
+        if (!(seq = PySequence_Fast(row, "parameters must be a sequence"))) {
+            return -1;
+        }
+        if (PySequence_Fast_GET_SIZE(seq) != t->nparams) {
+            PyErr_SetString(_mysql_ProgrammingError,
+                            PySequence_Fast_GET_SIZE(seq) < t->nparams ?
+                            "not enough arguments for format string" :
+                            "not all arguments converted during bytes formatting");
             goto error;
         }
+    }
+    for (Py_ssize_t i = 0; i <= t->nparams; i++) {
+        size_t start = i ? t->ends[i - 1] : 0;
+        if (_mysql_Buffer_append(b, t->text + start, t->ends[i] - start)) goto error;
+        if (i == t->nparams) break;
+        PyObject *v;
+        if (seq) {
+            if (i >= PySequence_Fast_GET_SIZE(seq)) {
+                PyErr_SetString(PyExc_RuntimeError, "parameters changed size");
+                goto error;
+            }
+            v = Py_NewRef(PySequence_Fast_GET_ITEM(seq, i));
+        } else {
+            // _mogrify() accepts str and bytes keys.
+            v = PyObject_GetItem(row, t->keys[i]);
+            if (!v && PyErr_ExceptionMatches(PyExc_KeyError)) {
+                PyErr_Clear();
+                v = PyObject_GetItem(row, t->bkeys[i]);
+            }
+            if (!v) goto error;
+        }
+        int r = _mysql_literal_append(lit, b, v);
         Py_DECREF(v);
+        if (r) goto error;
     }
-    Py_XDECREF(cache);
-    return i;
-error:
-    Py_XDECREF(cache);
+    Py_XDECREF(seq);
+    return 0;
+  error:
+    Py_XDECREF(seq);
     return -1;
 }
 
-static const char _mysql_ResultObject_fetch_row__doc__[] =
-"fetch_row([maxrows, how]) -- Fetches up to maxrows as a tuple.\n\
-The rows are formatted according to how:\n\
-\n\
-    0 -- tuples (default)\n\
-    1 -- dictionaries, key=column or table.column if duplicated\n\
-    2 -- dictionaries, key=table.column\n\
+typedef struct {
+    PyObject_HEAD
+    _mysql_Literal literal;
+    PyObject *args;    // iterator of parameter rows
+    PyObject *prefix;  // bytes
+    PyObject *postfix; // bytes
+    Py_ssize_t max_stmt_length;
+    _mysql_ValuesTemplate template;
+    _mysql_Buffer row;  // the row which didn't fit the last statement
+    _mysql_Buffer stmt;
+    PyObject *separator; // bytes
+    bool has_row;
+    bool done;
+} _mysql_BulkValuesObject;
+
+extern PyTypeObject _mysql_BulkValuesObject_Type;
+
+static const char _mysql_ConnectionObject_bulk_values__doc__[] =
+"bulk_values(prefix, values, postfix, args, max_stmt_length, literal,\n\
+             types, binary_prefix, separator=b',') -- Returns an iterator\n\
+of multi-row INSERT statements: prefix, values formatted with the rows\n\
+of args (joined by separator) and postfix, up to max_stmt_length bytes.\n\
+values may contain %s or %(name)s placeholders. Parameters are\n\
+encoded in C when their type is in types, else by literal().\n\
+With separator=b';\\n', prefix and postfix empty and a whole statement\n\
+as values, it returns multi-statement batches instead.\n\
+Non-standard. For internal use; use cursor.executemany().\n\
 ";
 
 static PyObject *
-_mysql_ResultObject_fetch_row(
-    _mysql_ResultObject *self,
+_mysql_ConnectionObject_bulk_values(
+    _mysql_ConnectionObject *self,
     PyObject *args,
     PyObject *kwargs)
 {
-    static char *kwlist[] = {"maxrows", "how", NULL };
-    int maxrows=1, how=0;
-    PyObject *r=NULL;
-
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|ii:fetch_row", kwlist,
-                     &maxrows, &how))
+    static char *kwlist[] = {"prefix", "values", "postfix", "args", "max_stmt_length",
+                             "literal", "types", "binary_prefix", "separator", NULL};
+    PyObject *prefix, *postfix, *rows, *literal, *types;
+    const char *values;
+    Py_ssize_t len, max_stmt_length;
+    int binary_prefix = 0;
+    PyObject *separator = NULL;
+    _mysql_BulkValuesObject *r = NULL;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "Sy#SOnOO|pS:bulk_values", kwlist,
+                                     &prefix, &values, &len, &postfix, &rows,
+                                     &max_stmt_length, &literal, &types, &binary_prefix,
+                                     &separator))
         return NULL;
-    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
-    if (how >= (int)(sizeof(row_converters) / sizeof(row_converters[0]))) {
-        END_RESULT_CONNECTION_LOCK(self);
-        PyErr_SetString(PyExc_ValueError, "how out of range");
+    if (!(r = MyAlloc(_mysql_BulkValuesObject, _mysql_BulkValuesObject_Type))) {
         return NULL;
     }
-    if (!maxrows) {
-        if (self->use) {
-            maxrows = INT_MAX;
-        } else {
-            // todo: preallocate.
-            maxrows = (Py_ssize_t) mysql_num_rows(self->result);
-        }
+    r->literal.conn = (_mysql_ConnectionObject *)Py_NewRef(self);
+    r->literal.literal = Py_NewRef(literal);
+    r->literal.binary_prefix = binary_prefix;
+    r->prefix = Py_NewRef(prefix);
+    r->postfix = Py_NewRef(postfix);
+    r->max_stmt_length = max_stmt_length;
+    r->separator = separator ? Py_NewRef(separator) : PyBytes_FromStringAndSize(",", 1);
+    if (!r->separator) goto error;
+
+    if (_mysql_load_literal_defaults()) goto error;
+    const struct { PyObject *type; int flag; } known[] = {
+        {(PyObject *)&PyUnicode_Type, LITERAL_STR},
+        {(PyObject *)&PyBytes_Type, LITERAL_BYTES},
+        {(PyObject *)&PyTuple_Type, LITERAL_SEQ},
+    };
+    for (size_t i = 0; i < sizeof(known) / sizeof(known[0]); i++) {
+        int contains = PySequence_Contains(types, known[i].type);
+        if (contains < 0) goto error;
+        if (contains) r->literal.types |= known[i].flag;
+    }
+    for (size_t i = 0; i < sizeof(_mysql_literal_defaults) / sizeof(_mysql_literal_defaults[0]); i++) {
+        int contains = PySequence_Contains(types, _mysql_literal_defaults[i].type);
+        if (contains < 0) goto error;
+        if (contains) r->literal.types |= _mysql_literal_defaults[i].flag;
     }
-    if (!(r = PyList_New(0))) goto error;
-    Py_ssize_t rowsadded = _mysql__fetch_row(self, r, maxrows, how);
-    if (rowsadded == -1) goto error;
 
-    /* DB-API allows return rows as list.
-     * But we need to return list because Django expecting tuple.
-     */
-    PyObject *t = PyList_AsTuple(r);
-    Py_DECREF(r);
-    END_RESULT_CONNECTION_LOCK(self);
-    return t;
+    const char *encoding = self->open ? _get_encoding(&self->connection) : utf8;
+    if (_mysql_ValuesTemplate_parse(&r->template, values, len, encoding)) goto error;
+    if (!(r->args = PyObject_GetIter(rows))) goto error;
+    return (PyObject *)r;
   error:
-    END_RESULT_CONNECTION_LOCK(self);
-    Py_XDECREF(r);
+    Py_DECREF(r);
     return NULL;
 }
 
-static const char _mysql_ResultObject_discard__doc__[] =
-"discard() -- Discard remaining rows in the resultset.";
-
 static PyObject *
-_mysql_ResultObject_discard(
-    _mysql_ResultObject *self,
-    PyObject *noargs)
+_mysql_BulkValuesObject_iternext(
+    _mysql_BulkValuesObject *self)
 {
-    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+    Py_ssize_t nrows = 0;
+    size_t postfix_len = PyBytes_GET_SIZE(self->postfix);
 
-    MYSQL_ROW row;
-    Py_BEGIN_ALLOW_THREADS
-    while (NULL != (row = mysql_fetch_row(self->result))) {
-        // do nothing
+    self->stmt.size = 0;
+    if (self->done || _mysql_Buffer_append(&self->stmt, PyBytes_AS_STRING(self->prefix),
+                                           PyBytes_GET_SIZE(self->prefix))) {
+        return NULL;
     }
-    Py_END_ALLOW_THREADS
-    _mysql_ConnectionObject *conn = (_mysql_ConnectionObject *)self->conn;
-    if (mysql_errno(&conn->connection)) {
-        PyObject *ret = _mysql_Exception(conn);
-        END_RESULT_CONNECTION_LOCK(self);
-        return ret;
+    for (;;) {
+        if (!self->has_row) {
+            PyObject *row = PyIter_Next(self->args);
+            if (!row) {
+                if (PyErr_Occurred()) goto error;
+                self->done = true;
+                break;
+            }
+            self->row.size = 0;
+            int err = _mysql_Literal_lock(&self->literal);
+            if (!err) {
+                err = _mysql_ValuesTemplate_append(&self->template, &self->literal,
+                                                   &self->row, row);
+                _mysql_Literal_unlock(&self->literal);
+            }
+            Py_DECREF(row);
+            if (err) goto error;
+            self->has_row = true;
+        }
+        // The first row is added even if it is too long.
+        size_t separator_len = PyBytes_GET_SIZE(self->separator);
+        if (nrows && self->stmt.size + separator_len + self->row.size + postfix_len >
+                (size_t)self->max_stmt_length) {
+            break;
+        }
+        if (nrows && _mysql_Buffer_append(&self->stmt, PyBytes_AS_STRING(self->separator),
+                                          separator_len)) {
+            goto error;
+        }
+        if (_mysql_Buffer_append(&self->stmt, self->row.data, self->row.size)) goto error;
+        self->has_row = false;
+        nrows++;
     }
-    END_RESULT_CONNECTION_LOCK(self);
-    Py_RETURN_NONE;
+    if (!nrows) {
+        return NULL;
+    }
+    if (_mysql_Buffer_append(&self->stmt, PyBytes_AS_STRING(self->postfix), postfix_len)) {
+        goto error;
+    }
+    return PyBytes_FromStringAndSize(self->stmt.data, self->stmt.size);
+  error:
+    self->done = true;
+    return NULL;
 }
 
-static const char _mysql_ConnectionObject_change_user__doc__[] =
-"Changes the user and causes the database specified by db to\n\
-become the default (current) database on the connection\n\
-specified by mysql. In subsequent queries, this database is\n\
-the default for table references that do not include an\n\
-explicit database specifier.\n\
-\n\
-This function was introduced in MySQL Version 3.23.3.\n\
-\n\
-Fails unless the connected user can be authenticated or if he\n\
-doesn't have permission to use the database. In this case the\n\
-user and database are not changed.\n\
-\n\
-The db parameter may be set to None if you don't want to have\n\
-a default database.\n\
-";
-
-static PyObject *
-_mysql_ConnectionObject_change_user(
-    _mysql_ConnectionObject *self,
-    PyObject *args,
-    PyObject *kwargs)
+static int
+_mysql_BulkValuesObject_traverse(
+    _mysql_BulkValuesObject *self,
+    visitproc visit,
+    void *arg)
 {
-    char *user, *pwd=NULL, *db=NULL;
-    int r;
-    static char *kwlist[] = { "user", "passwd", "db", NULL } ;
+    Py_VISIT(self->literal.conn);
+    Py_VISIT(self->literal.literal);
+    Py_VISIT(self->args);
+    return 0;
+}
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s|ss:change_user",
-                     kwlist, &user, &pwd, &db))
-        return NULL;
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    Py_BEGIN_ALLOW_THREADS
-        r = mysql_change_user(&(self->connection), user, pwd, db);
-    Py_END_ALLOW_THREADS
-    if (r) {
-        PyObject *ret = _mysql_Exception(self);
-        END_CONNECTION_LOCK(self);
-        return ret;
-    }
-    END_CONNECTION_LOCK(self);
-    Py_RETURN_NONE;
+static int
+_mysql_BulkValuesObject_clear(
+    _mysql_BulkValuesObject *self)
+{
+    Py_CLEAR(self->literal.conn);
+    Py_CLEAR(self->literal.literal);
+    Py_CLEAR(self->args);
+    Py_CLEAR(self->prefix);
+    Py_CLEAR(self->postfix);
+    Py_CLEAR(self->separator);
+    return 0;
 }
 
-static const char _mysql_ConnectionObject_character_set_name__doc__[] =
-"Returns the default character set for the current connection.\n\
-Non-standard.\n\
-";
+static void
+_mysql_BulkValuesObject_dealloc(
+    _mysql_BulkValuesObject *self)
+{
+    PyObject_GC_UnTrack((PyObject *)self);
+    _mysql_BulkValuesObject_clear(self);
+    _mysql_ValuesTemplate_clear(&self->template);
+    PyMem_RawFree(self->row.data);
+    PyMem_RawFree(self->stmt.data);
+    MyFree(self);
+}
 
+/* Returns the sequence of DB-API 7-tuples describing the fields. */
 static PyObject *
-_mysql_ConnectionObject_character_set_name(
-    _mysql_ConnectionObject *self,
-    PyObject *noargs)
+_mysql_describe_fields(
+    MYSQL_FIELD *fields,
+    unsigned int n,
+    const char *encoding)
 {
-    const char *s;
-    PyObject *ret;
-
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    s = mysql_character_set_name(&(self->connection));
-    ret = PyUnicode_FromString(s);
-    END_CONNECTION_LOCK(self);
-    return ret;
-}
+    PyObject *d;
+    unsigned int i;
 
-static const char _mysql_ConnectionObject_set_character_set__doc__[] =
-"Sets the default character set for the current connection.\n\
-Non-standard.\n\
-";
+    if (!(d = PyTuple_New(n))) return NULL;
+    for (i=0; i<n; i++) {
+        PyObject *t;
+        PyObject *name;
+        if (encoding == utf8) {
+            name = PyUnicode_DecodeUTF8(fields[i].name, fields[i].name_length, "replace");
+        } else {
+            name = PyUnicode_Decode(fields[i].name, fields[i].name_length, encoding, "replace");
+        }
+        if (name == NULL) {
+            goto error;
+        }
+
+        t = Py_BuildValue("(Niiiiii)",
+                  name,
+                  (long) fields[i].type,
+                  (long) fields[i].max_length,
+                  (long) fields[i].length,
+                  (long) fields[i].length,
+                  (long) fields[i].decimals,
+                  (long) !(IS_NOT_NULL(fields[i].flags)));
+        if (!t) goto error;
+        PyTuple_SET_ITEM(d, i, t);
+    }
+    return d;
+  error:
+    Py_XDECREF(d);
+    return NULL;
+}
 
+/* Returns the tuple of flags of the fields. */
 static PyObject *
-_mysql_ConnectionObject_set_character_set(
-    _mysql_ConnectionObject *self,
-    PyObject *args)
+_mysql_field_flags(
+    MYSQL_FIELD *fields,
+    unsigned int n)
 {
-    const char *s;
-    int err;
+    PyObject *d;
+    unsigned int i;
 
-    if (!PyArg_ParseTuple(args, "s", &s)) return NULL;
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    Py_BEGIN_ALLOW_THREADS
-    err = mysql_set_character_set(&(self->connection), s);
-    Py_END_ALLOW_THREADS
-    if (err) {
-        PyObject *ret = _mysql_Exception(self);
-        END_CONNECTION_LOCK(self);
-        return ret;
+    if (!(d = PyTuple_New(n))) return NULL;
+    for (i=0; i<n; i++) {
+        PyObject *f;
+        if (!(f = PyLong_FromLong((long)fields[i].flags))) goto error;
+        PyTuple_SET_ITEM(d, i, f);
     }
-    END_CONNECTION_LOCK(self);
-    Py_RETURN_NONE;
+    return d;
+  error:
+    Py_XDECREF(d);
+    return NULL;
 }
 
-#if MYSQL_VERSION_ID >= 50010
-static const char _mysql_ConnectionObject_get_character_set_info__doc__[] =
-"Returns a dict with information about the current character set:\n\
-\n\
-collation\n\
-    collation name\n\
-name\n\
-    character set name\n\
-comment\n\
-    comment or descriptive name\n\
-dir\n\
-    character set directory\n\
-mbminlen\n\
-    min. length for multibyte string\n\
-mbmaxlen\n\
-    max. length for multibyte string\n\
-\n\
-Not all keys may be present, particularly dir.\n\
-\n\
-Non-standard.\n\
+static const char _mysql_ResultObject_describe__doc__[] =
+"Returns the sequence of 7-tuples required by the DB-API for\n\
+the Cursor.description attribute.\n\
 ";
 
 static PyObject *
-_mysql_ConnectionObject_get_character_set_info(
-    _mysql_ConnectionObject *self,
+_mysql_ResultObject_describe(
+    _mysql_ResultObject *self,
     PyObject *noargs)
 {
-    PyObject *result;
-    MY_CHARSET_INFO cs;
-
+    PyObject *d;
 
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    mysql_get_character_set_info(&(self->connection), &cs);
-    if (!(result = PyDict_New())) {
-        END_CONNECTION_LOCK(self);
-        return NULL;
-    }
-    if (cs.csname)
-        PyDict_SetItemString(result, "name", PyUnicode_FromString(cs.csname));
-    if (cs.name)
-        PyDict_SetItemString(result, "collation", PyUnicode_FromString(cs.name));
-    if (cs.comment)
-        PyDict_SetItemString(result, "comment", PyUnicode_FromString(cs.comment));
-    if (cs.dir)
-        PyDict_SetItemString(result, "dir", PyUnicode_FromString(cs.dir));
-    PyDict_SetItemString(result, "mbminlen", PyLong_FromLong(cs.mbminlen));
-    PyDict_SetItemString(result, "mbmaxlen", PyLong_FromLong(cs.mbmaxlen));
-    END_CONNECTION_LOCK(self);
-    return result;
+    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+    d = _mysql_describe_fields(mysql_fetch_fields(self->result),
+                               mysql_num_fields(self->result), self->encoding);
+    END_RESULT_CONNECTION_LOCK(self);
+    return d;
 }
-#endif
 
-static const char _mysql_ConnectionObject_get_native_connection__doc__[] =
-"Return the internal MYSQL* wrapped in a PyCapsule object.\n\
-NOTE: this is a private API introduced ONLY for XTA integration,\n\
-      don't use it for different use cases.\n\
-      This method is supported only for XTA integration and support must\n\
-      be asked to LIXA project: http://www.tiian.org/lixa/\n\
-      Please DO NOT ask support to PyMySQL/mysqlclient-python project.\n\
-";
+static const char _mysql_ResultObject_field_flags__doc__[] =
+"Returns a tuple of field flags, one for each column in the result.\n\
+" ;
 
 static PyObject *
-_mysql_ConnectionObject_get_native_connection(
-    _mysql_ConnectionObject *self,
+_mysql_ResultObject_field_flags(
+    _mysql_ResultObject *self,
     PyObject *noargs)
 {
-    PyObject *result;
+    PyObject *d;
 
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    result = PyCapsule_New(&(self->connection),
-        "_mysql.connection.native_connection", NULL);
-    END_CONNECTION_LOCK(self);
-    return result;
+    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+    d = _mysql_field_flags(mysql_fetch_fields(self->result), mysql_num_fields(self->result));
+    END_RESULT_CONNECTION_LOCK(self);
+    return d;
 }
 
+/* Parse exactly n ASCII digits. Returns -1 if a non digit is found. */
+static int
+_parse_digits(const char *s, int n)
+{
+    int v = 0;
+    for (int i = 0; i < n; i++) {
+        if (s[i] < '0' || s[i] > '9') {
+            return -1;
+        }
+        v = v * 10 + (s[i] - '0');
+    }
+    return v;
+}
 
-static const char _mysql_get_client_info__doc__[] =
-"get_client_info() -- Returns a string that represents\n\
-the client library version.";
+/* Parse 1~6 digits of fractional seconds into microseconds. */
+static int
+_parse_microseconds(const char *s, int n)
+{
+    int v = _parse_digits(s, n);
+    if (v < 0) {
+        return -1;
+    }
+    for (; n < 6; n++) {
+        v *= 10;
+    }
+    return v;
+}
+
+/* The Python converters return None for values like '0000-00-00'
+ * which the datetime module rejects with ValueError. */
 static PyObject *
-_mysql_get_client_info(
-    PyObject *self,
-    PyObject *noargs)
+_none_on_value_error(PyObject *v)
 {
-    return PyUnicode_FromString(mysql_get_client_info());
+    if (v == NULL && PyErr_ExceptionMatches(PyExc_ValueError)) {
+        PyErr_Clear();
+        Py_RETURN_NONE;
+    }
+    return v;
 }
 
-static const char _mysql_ConnectionObject_get_host_info__doc__[] =
-"Returns a string that represents the MySQL client library\n\
-version. Non-standard.\n\
-";
+/* The _scan_* functions split the canonical formats MySQL uses for
+ * temporal columns into fields. They return -1 when the value is not in
+ * the canonical format. */
 
-static PyObject *
-_mysql_ConnectionObject_get_host_info(
-    _mysql_ConnectionObject *self,
-    PyObject *noargs)
+// YYYY-MM-DD
+static int
+_scan_date(const char *s, Py_ssize_t length, int *f)
 {
-    PyObject *ret;
+    if (length != 10 || s[4] != '-' || s[7] != '-' ||
+            (f[0] = _parse_digits(s, 4)) < 0 ||
+            (f[1] = _parse_digits(s+5, 2)) < 0 ||
+            (f[2] = _parse_digits(s+8, 2)) < 0) {
+        return -1;
+    }
+    return 0;
+}
 
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    ret = PyUnicode_FromString(mysql_get_host_info(&(self->connection)));
-    END_CONNECTION_LOCK(self);
-    return ret;
+// YYYY-MM-DD hh:mm:ss[.ffffff]
+static int
+_scan_datetime(const char *s, Py_ssize_t length, int *f)
+{
+    if (length != 19 && (length < 21 || length > 26 || s[19] != '.')) {
+        return -1;
+    }
+    if (s[4] != '-' || s[7] != '-' || (s[10] != ' ' && s[10] != 'T') ||
+            s[13] != ':' || s[16] != ':' ||
+            (f[0] = _parse_digits(s, 4)) < 0 ||
+            (f[1] = _parse_digits(s+5, 2)) < 0 ||
+            (f[2] = _parse_digits(s+8, 2)) < 0 ||
+            (f[3] = _parse_digits(s+11, 2)) < 0 ||
+            (f[4] = _parse_digits(s+14, 2)) < 0 ||
+            (f[5] = _parse_digits(s+17, 2)) < 0) {
+        return -1;
+    }
+    f[6] = 0;
+    if (length > 19 && (f[6] = _parse_microseconds(s+20, (int)length-20)) < 0) {
+        return -1;
+    }
+    return 0;
 }
 
-static const char _mysql_ConnectionObject_get_proto_info__doc__[] =
-"Returns an unsigned integer representing the protocol version\n\
-used by the current connection. Non-standard.\n\
-";
+// [-]h:mm:ss[.ffffff]
+static int
+_scan_timedelta(const char *s, Py_ssize_t length,
+                int *negative, long long *seconds, int *usec)
+{
+    const char *p = s, *end = s + length;
+    int ndigits = 0, minute, second;
+    long long hours = 0;
+
+    *negative = 0;
+    *usec = 0;
+    if (p < end && *p == '-') {
+        *negative = 1;
+        p++;
+    }
+    for (; p < end && ndigits < 9 && *p >= '0' && *p <= '9'; p++, ndigits++) {
+        hours = hours * 10 + (*p - '0');
+    }
+    if (ndigits == 0 || end - p < 6 || p[0] != ':' || p[3] != ':' ||
+            (minute = _parse_digits(p+1, 2)) < 0 ||
+            (second = _parse_digits(p+4, 2)) < 0) {
+        return -1;
+    }
+    p += 6;
+    if (p < end) {
+        int n = (int)(end - p) - 1;
+        if (*p != '.' || n < 1 || n > 6 || (*usec = _parse_microseconds(p+1, n)) < 0) {
+            return -1;
+        }
+    }
+    *seconds = hours * 3600 + minute * 60 + second;
+    return 0;
+}
+
+/* The _mysql_parse_* functions decode temporal columns. They return NULL
+ * without exception set when the value is not in the canonical format,
+ * so that the caller can fall back to the Python converter. */
 
 static PyObject *
-_mysql_ConnectionObject_get_proto_info(
-    _mysql_ConnectionObject *self,
-    PyObject *noargs)
+_mysql_parse_date(const char *s, Py_ssize_t length)
 {
-    unsigned int proto;
-
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    proto = mysql_get_proto_info(&(self->connection));
-    END_CONNECTION_LOCK(self);
-    return PyLong_FromLong((long)proto);
+    int f[3];
+    if (_scan_date(s, length, f) < 0) {
+        return NULL;
+    }
+    return _none_on_value_error(PyDate_FromDate(f[0], f[1], f[2]));
 }
 
-static const char _mysql_ConnectionObject_get_server_info__doc__[] =
-"Returns a string that represents the server version number.\n\
-Non-standard.\n\
-";
+static PyObject *
+_mysql_parse_datetime(const char *s, Py_ssize_t length)
+{
+    int f[7];
+    if (length < 11) {
+        return _mysql_parse_date(s, length);
+    }
+    if (_scan_datetime(s, length, f) < 0) {
+        return NULL;
+    }
+    return _none_on_value_error(PyDateTime_FromDateAndTime(
+                f[0], f[1], f[2], f[3], f[4], f[5], f[6]));
+}
 
 static PyObject *
-_mysql_ConnectionObject_get_server_info(
-    _mysql_ConnectionObject *self,
-    PyObject *noargs)
+_mysql_parse_timedelta(const char *s, Py_ssize_t length)
 {
-    PyObject *ret;
+    int negative, usec;
+    long long seconds;
+    if (_scan_timedelta(s, length, &negative, &seconds, &usec) < 0) {
+        return NULL;
+    }
+    int days = (int)(seconds / 86400);
+    int secs = (int)(seconds % 86400);
+    if (negative) {
+        return PyDelta_FromDSU(-days, -secs, -usec);
+    }
+    return PyDelta_FromDSU(days, secs, usec);
+}
 
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    ret = PyUnicode_FromString(mysql_get_server_info(&(self->connection)));
-    END_CONNECTION_LOCK(self);
-    return ret;
+static PyObject *
+_mysql_parse_float(const char *s, Py_ssize_t length)
+{
+    char *end;
+    double x = PyOS_string_to_double(s, &end, NULL);
+    if (x == -1.0 && PyErr_Occurred()) {
+        PyErr_Clear();
+        return NULL;
+    }
+    if (end != s + length) {
+        return NULL;
+    }
+    return PyFloat_FromDouble(x);
 }
 
-static const char _mysql_ConnectionObject_info__doc__[] =
-"Retrieves a string providing information about the most\n\
-recently executed query. Non-standard. Use messages or\n\
-Cursor.messages.\n\
-";
+// DECIMAL as int scaled by 10**scale. e.g. '-1.5' -> -150 when scale=2.
+static PyObject *
+_mysql_parse_scaled_int(const char *s, Py_ssize_t length, int scale)
+{
+    char stackbuf[128];
+    char *buf = stackbuf;
+    const char *end = s + length;
+    Py_ssize_t size = length + scale + 1;
+    Py_ssize_t frac = -1; // number of digits after '.'
+
+    if (size > (Py_ssize_t)sizeof(stackbuf)) {
+        if (!(buf = PyMem_Malloc(size))) {
+            return PyErr_NoMemory();
+        }
+    }
+    char *p = buf;
+    if (s < end && *s == '-') {
+        *p++ = *s++;
+    }
+    for (; s < end; s++) {
+        if (*s == '.' && frac < 0) {
+            frac = 0;
+            continue;
+        }
+        *p++ = *s;
+        if (frac >= 0) {
+            frac++;
+        }
+    }
+    if (frac < 0) {
+        frac = 0;
+    }
+    for (; frac < scale; frac++) {
+        *p++ = '0';
+    }
+    *p = '\0';
+
+    PyObject *v = NULL;
+    if (frac > scale) {
+        PyErr_Format(PyExc_ValueError,
+                "DECIMAL value %.*s has more than %d digits after the decimal point",
+                (int)length, end - length, scale);
+    } else {
+        v = PyLong_FromString(buf, &p, 10);
+        if (v && *p != '\0') {
+            Py_CLEAR(v);
+            PyErr_Format(PyExc_ValueError, "invalid DECIMAL value: %.*s",
+                         (int)length, end - length);
+        }
+    }
+    if (buf != stackbuf) {
+        PyMem_Free(buf);
+    }
+    return v;
+}
+
+static PyObject *
+_mysql_decode_column(
+    _mysql_ColumnDecoder *dec,
+    const char *rowitem,
+    Py_ssize_t length,
+    const char *encoding)
+{
+    if (rowitem == NULL) {
+        Py_RETURN_NONE;
+    }
+
+    PyObject *v = NULL;
+    switch (dec->kind) {
+    case DECODE_BYTES:
+        return PyBytes_FromStringAndSize(rowitem, length);
+    case DECODE_STR:
+        if (encoding == utf8) {
+            return PyUnicode_DecodeUTF8(rowitem, length, NULL);
+        }
+        return PyUnicode_Decode(rowitem, length, encoding, NULL);
+    case DECODE_INT:
+        return PyLong_FromString(rowitem, NULL, 10);
+    // Values not in the canonical format are passed to the converter.
+    case DECODE_DATETIME:
+        v = _mysql_parse_datetime(rowitem, length);
+        break;
+    case DECODE_DATE:
+        v = _mysql_parse_date(rowitem, length);
+        break;
+    case DECODE_TIMEDELTA:
+        v = _mysql_parse_timedelta(rowitem, length);
+        break;
+    case DECODE_FLOAT:
+        v = _mysql_parse_float(rowitem, length);
+        break;
+    case DECODE_SCALED_INT:
+        return _mysql_parse_scaled_int(rowitem, length, dec->scale);
+    }
+    if (v || PyErr_Occurred()) {
+        return v;
+    }
+
+    PyObject *args[2];
+    args[1] = dec->binary ?
+        PyBytes_FromStringAndSize(rowitem, length) :
+        PyUnicode_FromStringAndSize(rowitem, length);
+    if (!args[1]) {
+        return NULL;
+    }
+    size_t nargsf = 1 | PY_VECTORCALL_ARGUMENTS_OFFSET;
+    if (dec->vectorcall) {
+        v = dec->vectorcall(dec->converter, args+1, nargsf, NULL);
+    } else {
+        v = PyObject_Vectorcall(dec->converter, args+1, nargsf, NULL);
+    }
+    Py_DECREF(args[1]);
+    return v;
+}
+
+static PyObject *
+_mysql_row_to_tuple(
+    _mysql_ResultObject *self,
+    MYSQL_ROW row,
+    unsigned long *length,
+    PyObject *unused)
+{
+    unsigned int n, i;
+    PyObject *r;
+
+    n = mysql_num_fields(self->result);
+    if (!(r = PyTuple_New(n))) return NULL;
+    for (i=0; i<n; i++) {
+        PyObject *v;
+        v = _mysql_decode_column(&self->decoders[i], row[i], length[i], self->encoding);
+        if (!v) goto error;
+        PyTuple_SET_ITEM(r, i, v);
+    }
+    return r;
+  error:
+    Py_XDECREF(r);
+    return NULL;
+}
+
+static PyObject *
+_mysql_row_to_dict(
+    _mysql_ResultObject *self,
+    MYSQL_ROW row,
+    unsigned long *length,
+    PyObject *cache)
+{
+    unsigned int n, i;
+    PyObject *r;
+    MYSQL_FIELD *fields;
+
+    n = mysql_num_fields(self->result);
+    if (!(r = PyDict_New())) return NULL;
+    fields = mysql_fetch_fields(self->result);
+    for (i=0; i<n; i++) {
+        PyObject *v;
+        v = _mysql_decode_column(&self->decoders[i], row[i], length[i], self->encoding);
+        if (!v) goto error;
+
+        PyObject *pyname = PyUnicode_FromString(fields[i].name);
+        if (pyname == NULL) {
+            Py_DECREF(v);
+            goto error;
+        }
+        int err = PyDict_Contains(r, pyname);
+        if (err < 0) { // error
+            Py_DECREF(v);
+            goto error;
+        }
+        if (err) { // duplicate
+            Py_DECREF(pyname);
+            pyname = PyUnicode_FromFormat("%s.%s", fields[i].table, fields[i].name);
+            if (pyname == NULL) {
+                Py_DECREF(v);
+                goto error;
+            }
+        }
+
+        err = PyDict_SetItem(r, pyname, v);
+        if (cache) {
+            PyTuple_SET_ITEM(cache, i, pyname);
+        } else {
+            Py_DECREF(pyname);
+        }
+        Py_DECREF(v);
+        if (err) {
+            goto error;
+        }
+    }
+    return r;
+error:
+    Py_DECREF(r);
+    return NULL;
+}
+
+static PyObject *
+_mysql_row_to_dict_old(
+    _mysql_ResultObject *self,
+    MYSQL_ROW row,
+    unsigned long *length,
+    PyObject *cache)
+{
+    unsigned int n, i;
+    PyObject *r;
+    MYSQL_FIELD *fields;
+
+    n = mysql_num_fields(self->result);
+    if (!(r = PyDict_New())) return NULL;
+    fields = mysql_fetch_fields(self->result);
+    for (i=0; i<n; i++) {
+        PyObject *v;
+        v = _mysql_decode_column(&self->decoders[i], row[i], length[i], self->encoding);
+        if (!v) {
+            goto error;
+        }
+
+        PyObject *pyname;
+        if (strlen(fields[i].table)) {
+            pyname = PyUnicode_FromFormat("%s.%s", fields[i].table, fields[i].name);
+        } else {
+            pyname = PyUnicode_FromString(fields[i].name);
+        }
+        int err = PyDict_SetItem(r, pyname, v);
+        Py_DECREF(v);
+        if (cache) {
+            PyTuple_SET_ITEM(cache, i, pyname);
+        } else {
+            Py_DECREF(pyname);
+        }
+        if (err) {
+            goto error;
+        }
+    }
+    return r;
+  error:
+    Py_XDECREF(r);
+    return NULL;
+}
+
+static PyObject *
+_mysql_row_to_dict_cached(
+    _mysql_ResultObject *self,
+    MYSQL_ROW row,
+    unsigned long *length,
+    PyObject *cache)
+{
+    PyObject *r = PyDict_New();
+    if (!r) {
+        return NULL;
+    }
+
+    unsigned int n = mysql_num_fields(self->result);
+
+    for (unsigned int i=0; i<n; i++) {
+        PyObject *v = _mysql_decode_column(&self->decoders[i], row[i], length[i], self->encoding);
+        if (!v) {
+            goto error;
+        }
+
+        PyObject *pyname = PyTuple_GET_ITEM(cache, i); // borrowed
+        int err = PyDict_SetItem(r, pyname, v);
+        Py_DECREF(v);
+        if (err) {
+            goto error;
+        }
+    }
+    return r;
+  error:
+    Py_XDECREF(r);
+    return NULL;
+}
+
+
+/* Column names as the keys of _mysql_row_to_dict(): name, or table.name
+ * if the name is duplicated. */
+static PyObject *
+_mysql_field_names(
+    _mysql_ResultObject *self)
+{
+    unsigned int n = mysql_num_fields(self->result);
+    MYSQL_FIELD *fields = mysql_fetch_fields(self->result);
+    PyObject *names = PyTuple_New(n);
+    PyObject *seen = PySet_New(NULL);
+    if (!names || !seen) {
+        goto error;
+    }
+
+    for (unsigned int i=0; i<n; i++) {
+        PyObject *pyname = PyUnicode_FromString(fields[i].name);
+        if (!pyname) {
+            goto error;
+        }
+        int err = PySet_Contains(seen, pyname);
+        if (err < 0) {
+            Py_DECREF(pyname);
+            goto error;
+        }
+        if (err) { // duplicate
+            Py_DECREF(pyname);
+            pyname = PyUnicode_FromFormat("%s.%s", fields[i].table, fields[i].name);
+            if (!pyname) {
+                goto error;
+            }
+        }
+        PyTuple_SET_ITEM(names, i, pyname);
+        if (PySet_Add(seen, pyname)) {
+            goto error;
+        }
+    }
+    Py_DECREF(seen);
+    return names;
+  error:
+    Py_XDECREF(names);
+    Py_XDECREF(seen);
+    return NULL;
+}
+
+static PyObject *
+_mysql_lazy_row_names(
+    _mysql_ResultObject *self)
+{
+    PyObject *fieldnames = _mysql_field_names(self);
+    if (!fieldnames) {
+        return NULL;
+    }
+    PyObject *names = PyDict_New();
+    if (!names) {
+        goto error;
+    }
+    for (Py_ssize_t i = 0; i < PyTuple_GET_SIZE(fieldnames); i++) {
+        PyObject *index = PyLong_FromSsize_t(i);
+        if (!index) {
+            goto error;
+        }
+        int err = PyDict_SetItem(names, PyTuple_GET_ITEM(fieldnames, i), index);
+        Py_DECREF(index);
+        if (err) {
+            goto error;
+        }
+    }
+    Py_DECREF(fieldnames);
+    return names;
+  error:
+    Py_DECREF(fieldnames);
+    Py_XDECREF(names);
+    return NULL;
+}
+
+static const char _mysql_named_row__doc__[] =
+"Row of a result, see fetch_row(how=4).";
+
+/* Struct sequence type for the column names of the result. Types are
+ * cached by the names, so results of the same shape share a type. */
+static PyObject *
+_mysql_named_row_type(
+    _mysql_ResultObject *self)
+{
+    PyStructSequence_Field *fields = NULL;
+    PyObject *type = NULL;
+    PyObject *names = _mysql_field_names(self);
+    if (!names) {
+        return NULL;
+    }
+    type = PyDict_GetItemWithError(_mysql_named_row_types, names);
+    if (type) {
+        Py_INCREF(type);
+        Py_DECREF(names);
+        return type;
+    }
+    if (PyErr_Occurred()) {
+        goto error;
+    }
+
+    Py_ssize_t n = PyTuple_GET_SIZE(names);
+    if (!(fields = PyMem_New(PyStructSequence_Field, n + 1))) {
+        PyErr_NoMemory();
+        goto error;
+    }
+    for (Py_ssize_t i = 0; i < n; i++) {
+        // The type refers to the UTF-8 buffers of names, kept in _fields.
+        if (!(fields[i].name = PyUnicode_AsUTF8(PyTuple_GET_ITEM(names, i)))) {
+            goto error;
+        }
+        fields[i].doc = NULL;
+    }
+    fields[n].name = NULL;
+    fields[n].doc = NULL;
+    PyStructSequence_Desc desc = {
+        "_mysql.named_row", _mysql_named_row__doc__, fields, (int)n
+    };
+    if (!(type = (PyObject *)PyStructSequence_NewType(&desc))) {
+        goto error;
+    }
+    if (PyObject_SetAttrString(type, "_fields", names)) {
+        goto error;
+    }
+    if (PyDict_GET_SIZE(_mysql_named_row_types) >= NAMED_ROW_CACHE_SIZE) {
+        PyDict_Clear(_mysql_named_row_types);
+    }
+    if (PyDict_SetItem(_mysql_named_row_types, names, type)) {
+        goto error;
+    }
+    PyMem_Free(fields);
+    Py_DECREF(names);
+    return type;
+  error:
+    PyMem_Free(fields);
+    Py_XDECREF(type);
+    Py_DECREF(names);
+    return NULL;
+}
+
+static PyObject *
+_mysql_row_to_named(
+    _mysql_ResultObject *self,
+    MYSQL_ROW row,
+    unsigned long *length,
+    PyObject *type)
+{
+    unsigned int n = mysql_num_fields(self->result);
+    PyObject *r = PyStructSequence_New((PyTypeObject *)type);
+    if (!r) {
+        return NULL;
+    }
+    for (unsigned int i=0; i<n; i++) {
+        PyObject *v = _mysql_decode_column(&self->decoders[i], row[i], length[i], self->encoding);
+        if (!v) {
+            Py_DECREF(r);
+            return NULL;
+        }
+        PyStructSequence_SET_ITEM(r, i, v);
+    }
+    return r;
+}
+
+static PyObject *
+_mysql_row_to_lazy(
+    _mysql_ResultObject *self,
+    MYSQL_ROW row,
+    unsigned long *length,
+    PyObject *names)
+{
+    unsigned int n = mysql_num_fields(self->result);
+    _mysql_LazyRowObject *r = (_mysql_LazyRowObject *)
+        _mysql_LazyRowObject_Type.tp_alloc(&_mysql_LazyRowObject_Type, n);
+    if (!r) {
+        return NULL;
+    }
+    // mysql_fetch_lengths() returns a buffer reused for the next row.
+    if (!(r->lengths = PyMem_New(unsigned long, n ? n : 1))) {
+        Py_DECREF(r);
+        return PyErr_NoMemory();
+    }
+    memcpy(r->lengths, length, n * sizeof(unsigned long));
+    Py_INCREF(self);
+    r->result = self;
+    Py_XINCREF(names);
+    r->names = names;
+    r->row = row;
+    return (PyObject *)r;
+}
+
+typedef PyObject *_convertfunc(_mysql_ResultObject *, MYSQL_ROW, unsigned long *, PyObject *);
+static _convertfunc * const row_converters[] = {
+    [ROW_TUPLE] = _mysql_row_to_tuple,
+    [ROW_DICT] = _mysql_row_to_dict,
+    [ROW_DICT_OLD] = _mysql_row_to_dict_old,
+    [ROW_LAZY] = _mysql_row_to_lazy,
+    [ROW_NAMED] = _mysql_row_to_named,
+};
+
+/* State shared by the rows converted from a result: keys of dict rows
+ * (filled by the first row), column indexes of lazy rows or the type of
+ * named rows. */
+static PyObject *
+_mysql_row_cache_new(
+    _mysql_ResultObject *self,
+    int how)
+{
+    switch (how) {
+    case ROW_LAZY:
+        return _mysql_lazy_row_names(self);
+    case ROW_NAMED:
+        return _mysql_named_row_type(self);
+    }
+    return PyTuple_New(self->nfields);
+}
+
+/* Reads up to maxrows rows (and about ROW_BATCH_BYTES bytes). It is
+ * called without the GIL. Returns -1 when out of memory. */
+static int
+_mysql_RowBatch_fill(
+    _mysql_RowBatch *b,
+    MYSQL_RES *result,
+    Py_ssize_t maxrows)
+{
+    unsigned int n = b->nfields;
+    b->nrows = 0;
+    b->pos = b->start = 0;
+    b->size = 0;
+    while (b->nrows < maxrows && b->size < ROW_BATCH_BYTES) {
+        MYSQL_ROW row = mysql_fetch_row(result);
+        if (!row) {
+            b->eof = true;
+            break;
+        }
+        unsigned long *length = mysql_fetch_lengths(result);
+        size_t rowsize = 0;
+        for (unsigned int i = 0; i < n; i++) {
+            if (row[i]) rowsize += length[i] + 1;
+        }
+        if (b->size + rowsize > b->capacity) {
+            size_t capacity = b->capacity ? b->capacity * 2 : 65536;
+            while (capacity < b->size + rowsize) capacity *= 2;
+            char *data = PyMem_RawRealloc(b->data, capacity);
+            if (!data) {
+                // values holds offsets, not pointers, so drop the rows.
+                b->nrows = 0;
+                return -1;
+            }
+            b->data = data;
+            b->capacity = capacity;
+        }
+        char **values = b->values + b->nrows * n;
+        unsigned long *lengths = b->lengths + b->nrows * n;
+        for (unsigned int i = 0; i < n; i++) {
+            lengths[i] = length[i];
+            if (!row[i]) {
+                values[i] = NULL;
+                continue;
+            }
+            // Keep offset + 1 until data is not moved anymore.
+            memcpy(b->data + b->size, row[i], length[i]);
+            b->data[b->size + length[i]] = '\0';
+            values[i] = (char *)(uintptr_t)(b->size + 1);
+            b->size += length[i] + 1;
+        }
+        b->nrows++;
+    }
+    for (Py_ssize_t i = 0; i < b->nrows * n; i++) {
+        if (b->values[i]) {
+            b->values[i] = b->data + ((uintptr_t)b->values[i] - 1);
+        }
+    }
+    return 0;
+}
+
+/* Returns the next row of a use result and its lengths in *length, first
+ * the rows given back by unread(). It is called with the connection
+ * locked, maybe without the GIL. */
+static MYSQL_ROW
+_mysql_ResultObject_next_row(
+    _mysql_ResultObject *self,
+    unsigned long **length)
+{
+    _mysql_RowBatch *b = &self->batch;
+    if (b->pos < b->nrows) {
+        Py_ssize_t k = b->pos++ * b->nfields;
+        b->start = b->pos;
+        *length = b->lengths + k;
+        return b->values + k;
+    }
+    // The kept rows can't be given back after other rows were read.
+    b->nrows = b->pos = b->start = 0;
+    MYSQL_ROW row = mysql_fetch_row(self->result);
+    *length = row ? mysql_fetch_lengths(self->result) : NULL;
+    return row;
+}
+
+Py_ssize_t
+_mysql__fetch_row(
+    _mysql_ResultObject *self,
+    PyObject *r, /* list object */
+    Py_ssize_t maxrows,
+    int how)
+{
+    _convertfunc *convert_row = row_converters[how];
+    _mysql_RowBatch *batch = &self->batch;
+    Py_ssize_t i;
+
+    PyObject *cache = NULL;
+    if (maxrows > 0 && how != ROW_TUPLE) {
+        cache = _mysql_row_cache_new(self, how);
+        if (!cache) {
+            return -1;
+        }
+    }
+    if (maxrows > 0 && self->use && batch->allocated < Py_MIN(maxrows, ROW_BATCH_SIZE)) {
+        // Rows given back by unread() stay in place.
+        Py_ssize_t rows = Py_MIN(maxrows, ROW_BATCH_SIZE);
+        Py_ssize_t size = rows * (self->nfields ? self->nfields : 1);
+        MYSQL_ROW values = PyMem_RawRealloc(batch->values, size * sizeof(char *));
+        if (values) {
+            batch->values = values;
+        }
+        unsigned long *lengths = PyMem_RawRealloc(batch->lengths, size * sizeof(unsigned long));
+        if (lengths) {
+            batch->lengths = lengths;
+        }
+        if (!values || !lengths) {
+            PyErr_NoMemory();
+            goto error;
+        }
+        batch->nfields = self->nfields;
+        batch->allocated = rows;
+    }
+
+    for (i = 0; i < maxrows; i++) {
+        MYSQL_ROW row;
+        unsigned long *length;
+        if (!self->use) {
+            row = mysql_fetch_row(self->result);
+            length = row ? mysql_fetch_lengths(self->result) : NULL;
+        } else {
+            if (batch->pos == batch->nrows && !batch->eof) {
+                int err;
+                Py_BEGIN_ALLOW_THREADS
+                err = _mysql_RowBatch_fill(batch, self->result,
+                                           Py_MIN(maxrows - i, ROW_BATCH_SIZE));
+                Py_END_ALLOW_THREADS
+                if (err) {
+                    PyErr_NoMemory();
+                    goto error;
+                }
+            }
+            if (batch->pos < batch->nrows) {
+                row = batch->values + batch->pos * batch->nfields;
+                length = batch->lengths + batch->pos * batch->nfields;
+                batch->pos++;
+            } else {
+                row = NULL;
+                length = NULL;
+            }
+        }
+        if (!row && mysql_errno(&(((_mysql_ConnectionObject *)(self->conn))->connection))) {
+            _mysql_Exception((_mysql_ConnectionObject *)self->conn);
+            goto error;
+        }
+        if (!row) {
+            break;
+        }
+        PyObject *v = convert_row(self, row, length, cache);
+        if (!v) {
+            goto error;
+        }
+        if (how == ROW_DICT || how == ROW_DICT_OLD) {
+            convert_row = _mysql_row_to_dict_cached;
+        }
+        if (PyList_Append(r, v)) {
+            Py_DECREF(v);
+            goto error;
+        }
+        Py_DECREF(v);
+    }
+    Py_XDECREF(cache);
+    return i;
+error:
+    Py_XDECREF(cache);
+    return -1;
+}
+
+static const char _mysql_ResultObject_fetch_row__doc__[] =
+"fetch_row([maxrows, how]) -- Fetches up to maxrows as a tuple.\n\
+The rows are formatted according to how:\n\
+\n\
+    0 -- tuples (default)\n\
+    1 -- dictionaries, key=column or table.column if duplicated\n\
+    2 -- dictionaries, key=table.column\n\
+    3 -- lazy rows, converted when a column is accessed by index\n\
+         or by name (the keys of 1). Stored results only.\n\
+    4 -- named tuples (struct sequences), attribute=the keys of 1\n\
+";
+
+static PyObject *
+_mysql_ResultObject_fetch_row(
+    _mysql_ResultObject *self,
+    PyObject *args,
+    PyObject *kwargs)
+{
+    static char *kwlist[] = {"maxrows", "how", NULL };
+    int maxrows=1, how=0;
+    PyObject *r=NULL;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|ii:fetch_row", kwlist,
+                     &maxrows, &how))
+        return NULL;
+    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+    if (how < 0 || how >= (int)(sizeof(row_converters) / sizeof(row_converters[0]))) {
+        END_RESULT_CONNECTION_LOCK(self);
+        PyErr_SetString(PyExc_ValueError, "how out of range");
+        return NULL;
+    }
+    if (how == ROW_LAZY && self->use) {
+        END_RESULT_CONNECTION_LOCK(self);
+        PyErr_SetString(_mysql_ProgrammingError,
+                        "lazy rows are not available for use_result()");
+        return NULL;
+    }
+    if (!maxrows) {
+        if (self->use) {
+            maxrows = INT_MAX;
+        } else {
+            // todo: preallocate.
+            maxrows = (Py_ssize_t) mysql_num_rows(self->result);
+        }
+    }
+    if (!(r = PyList_New(0))) goto error;
+    Py_ssize_t rowsadded = _mysql__fetch_row(self, r, maxrows, how);
+    if (rowsadded == -1) goto error;
+
+    /* DB-API allows return rows as list.
+     * But we need to return list because Django expecting tuple.
+     */
+    PyObject *t = PyList_AsTuple(r);
+    Py_DECREF(r);
+    END_RESULT_CONNECTION_LOCK(self);
+    return t;
+  error:
+    END_RESULT_CONNECTION_LOCK(self);
+    Py_XDECREF(r);
+    return NULL;
+}
+
+static const char _mysql_ResultObject_rows__doc__[] =
+"rows([how]) -- Returns a sequence of all rows of a stored result.\n\
+Rows are formatted according to how, as fetch_row() does, but\n\
+they are converted only when they are accessed. The sequence\n\
+supports len(), indexing and slicing (slices are tuples).\n\
+It moves the row cursor of the result. Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ResultObject_rows(
+    _mysql_ResultObject *self,
+    PyObject *args,
+    PyObject *kwargs)
+{
+    static char *kwlist[] = {"how", NULL};
+    int how=0;
+    _mysql_RowsObject *r=NULL;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|i:rows", kwlist, &how))
+        return NULL;
+    if (how < 0 || how >= (int)(sizeof(row_converters) / sizeof(row_converters[0]))) {
+        PyErr_SetString(PyExc_ValueError, "how out of range");
+        return NULL;
+    }
+    if (self->use) {
+        PyErr_SetString(_mysql_ProgrammingError,
+                        "rows() is not available for use_result()");
+        return NULL;
+    }
+    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+    if (!(r = MyAlloc(_mysql_RowsObject, _mysql_RowsObject_Type))) goto error;
+    Py_INCREF(self);
+    r->result = self;
+    r->how = how;
+    r->nrows = (Py_ssize_t)mysql_num_rows(self->result);
+    if (!(r->offsets = PyMem_New(MYSQL_ROW_OFFSET, r->nrows ? r->nrows : 1))) {
+        PyErr_NoMemory();
+        goto error;
+    }
+    mysql_data_seek(self->result, 0);
+    for (Py_ssize_t i = 0; i < r->nrows; i++) {
+        r->offsets[i] = mysql_row_tell(self->result);
+        mysql_fetch_row(self->result);
+    }
+    if (how != ROW_TUPLE && !(r->cache = _mysql_row_cache_new(self, how))) goto error;
+    END_RESULT_CONNECTION_LOCK(self);
+    return (PyObject *)r;
+  error:
+    END_RESULT_CONNECTION_LOCK(self);
+    Py_XDECREF(r);
+    return NULL;
+}
+
+/* Column being built by fetch_columns(). Integer and float columns are
+ * written as C values into a bytearray with a NULL bitmap, other columns
+ * are lists of converted values. */
+typedef struct {
+    char typecode; // array typecode, 0 for list columns
+    PyObject *values;
+    PyObject *nulls; // bitmap, bit i is set when row i is NULL
+    bool has_null;
+} _mysql_ColumnBuilder;
+
+static int
+_mysql_ColumnBuilder_append(
+    _mysql_ColumnBuilder *col,
+    _mysql_ColumnDecoder *dec,
+    Py_ssize_t rownum,
+    const char *rowitem,
+    unsigned long length,
+    const char *encoding)
+{
+    if (!col->typecode) {
+        PyObject *v = _mysql_decode_column(dec, rowitem, length, encoding);
+        if (!v) {
+            return -1;
+        }
+        int err = PyList_Append(col->values, v);
+        Py_DECREF(v);
+        return err;
+    }
+
+    if (rownum % 8 == 0) {
+        if (PyByteArray_Resize(col->nulls, rownum / 8 + 1)) {
+            return -1;
+        }
+        PyByteArray_AS_STRING(col->nulls)[rownum / 8] = 0;
+    }
+    if (PyByteArray_Resize(col->values, (rownum + 1) * 8)) {
+        return -1;
+    }
+    char *p = PyByteArray_AS_STRING(col->values) + rownum * 8;
+    if (!rowitem) {
+        PyByteArray_AS_STRING(col->nulls)[rownum / 8] |= 1 << (rownum % 8);
+        col->has_null = true;
+        memset(p, 0, 8);
+        return 0;
+    }
+
+    // rowitem is NUL terminated.
+    char *end;
+    bool overflow = false;
+    switch (col->typecode) {
+    case 'q': {
+        errno = 0;
+        long long x = strtoll(rowitem, &end, 10);
+        overflow = errno == ERANGE;
+        memcpy(p, &x, sizeof(x));
+        break;
+    }
+    case 'Q': {
+        errno = 0;
+        unsigned long long x = strtoull(rowitem, &end, 10);
+        overflow = errno == ERANGE || *rowitem == '-';
+        memcpy(p, &x, sizeof(x));
+        break;
+    }
+    default: { // 'd'
+        double x = PyOS_string_to_double(rowitem, &end, NULL);
+        if (x == -1.0 && PyErr_Occurred()) {
+            return -1;
+        }
+        memcpy(p, &x, sizeof(x));
+        break;
+    }
+    }
+    if (overflow || end != rowitem + length) {
+        PyErr_Format(PyExc_ValueError, "invalid numeric value: %.*s",
+                     (int)length, rowitem);
+        return -1;
+    }
+    return 0;
+}
+
+static const char _mysql_ResultObject_fetch_columns__doc__[] =
+"fetch_columns([maxrows]) -- Fetches up to maxrows as columns.\n\
+If maxrows is 0 (default), all remaining rows are fetched.\n\
+\n\
+Returns (columns, nulls). Columns converted by int or float are\n\
+array.array ('q', 'Q' for unsigned or 'd') and NULL is stored as 0;\n\
+nulls has a bitmap (bytearray, bit i of byte i//8 is set when row i\n\
+is NULL) for them, or None if there is no NULL. Other columns are\n\
+lists of converted values and their nulls item is None. Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ResultObject_fetch_columns(
+    _mysql_ResultObject *self,
+    PyObject *args,
+    PyObject *kwargs)
+{
+    static char *kwlist[] = {"maxrows", NULL};
+    Py_ssize_t maxrows=0, rownum=0;
+    _mysql_ColumnBuilder *cols=NULL;
+    PyObject *columns=NULL, *nulls=NULL, *r=NULL;
+    unsigned int n, i;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|n:fetch_columns", kwlist,
+                                     &maxrows))
+        return NULL;
+    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+    if (maxrows <= 0) {
+        maxrows = PY_SSIZE_T_MAX;
+    }
+    n = self->nfields;
+    MYSQL_FIELD *fields = mysql_fetch_fields(self->result);
+    if (!(cols = PyMem_Calloc(n ? n : 1, sizeof(_mysql_ColumnBuilder)))) {
+        PyErr_NoMemory();
+        goto error;
+    }
+    for (i=0; i<n; i++) {
+        switch (self->decoders[i].kind) {
+        case DECODE_INT:
+            cols[i].typecode = (fields[i].flags & UNSIGNED_FLAG) ? 'Q' : 'q';
+            break;
+        case DECODE_FLOAT:
+            cols[i].typecode = 'd';
+            break;
+        }
+        if (cols[i].typecode) {
+            cols[i].values = PyByteArray_FromStringAndSize(NULL, 0);
+            cols[i].nulls = PyByteArray_FromStringAndSize(NULL, 0);
+            if (!cols[i].values || !cols[i].nulls) goto error;
+        } else {
+            if (!(cols[i].values = PyList_New(0))) goto error;
+        }
+    }
+
+    for (rownum = 0; rownum < maxrows; rownum++) {
+        MYSQL_ROW row;
+        unsigned long *length;
+        if (!self->use)
+            row = _mysql_ResultObject_next_row(self, &length);
+        else {
+            Py_BEGIN_ALLOW_THREADS
+            row = _mysql_ResultObject_next_row(self, &length);
+            Py_END_ALLOW_THREADS
+        }
+        if (!row && mysql_errno(&(result_connection(self)->connection))) {
+            _mysql_Exception(result_connection(self));
+            goto error;
+        }
+        if (!row) {
+            break;
+        }
+        for (i=0; i<n; i++) {
+            if (_mysql_ColumnBuilder_append(&cols[i], &self->decoders[i], rownum,
+                                            row[i], length[i], self->encoding)) {
+                goto error;
+            }
+        }
+    }
+
+    if (!(columns = PyTuple_New(n)) || !(nulls = PyTuple_New(n))) goto error;
+    for (i=0; i<n; i++) {
+        PyObject *values, *mask;
+        if (cols[i].typecode) {
+            values = PyObject_CallFunction(_mysql_array_type, "CO",
+                                           cols[i].typecode, cols[i].values);
+            if (!values) goto error;
+            if (cols[i].has_null) {
+                mask = Py_NewRef(cols[i].nulls);
+            } else {
+                mask = Py_NewRef(Py_None);
+            }
+        } else {
+            values = Py_NewRef(cols[i].values);
+            mask = Py_NewRef(Py_None);
+        }
+        PyTuple_SET_ITEM(columns, i, values);
+        PyTuple_SET_ITEM(nulls, i, mask);
+    }
+    r = PyTuple_Pack(2, columns, nulls);
+  error:
+    END_RESULT_CONNECTION_LOCK(self);
+    if (cols) {
+        for (i=0; i<n; i++) {
+            Py_XDECREF(cols[i].values);
+            Py_XDECREF(cols[i].nulls);
+        }
+        PyMem_Free(cols);
+    }
+    Py_XDECREF(columns);
+    Py_XDECREF(nulls);
+    return r;
+}
+
+/* Text export of result sets (copy_to). Rows are formatted from the raw
+ * column bytes without the GIL and written in chunks of COPY_CHUNK_SIZE. */
+#define COPY_CHUNK_SIZE (1024 * 1024)
+
+enum {
+    COPY_CSV,
+    COPY_TSV,
+    COPY_NDJSON,
+};
+
+/* How a column is written in NDJSON. */
+enum {
+    COPY_STRING,
+    COPY_NUMBER,
+    COPY_JSON,
+    COPY_BINARY, // base64 string
+};
+
+/* RFC 4180: quoted when it contains a separator, quote or line break.
+ * The empty string is quoted to distinguish it from NULL. */
+static void
+_mysql_copy_csv(
+    _mysql_Buffer *b,
+    const char *s,
+    unsigned long len)
+{
+    bool quote = len == 0 || memchr(s, '"', len) || memchr(s, ',', len) ||
+                 memchr(s, '\n', len) || memchr(s, '\r', len);
+    char *p = b->data + b->size;
+    if (!quote) {
+        memcpy(p, s, len);
+        b->size += len;
+        return;
+    }
+    *p++ = '"';
+    for (unsigned long i = 0; i < len; i++) {
+        if (s[i] == '"') *p++ = '"';
+        *p++ = s[i];
+    }
+    *p++ = '"';
+    b->size = p - b->data;
+}
+
+/* The default format of LOAD DATA and SELECT ... INTO OUTFILE. */
+static void
+_mysql_copy_tsv(
+    _mysql_Buffer *b,
+    const char *s,
+    unsigned long len)
+{
+    char *p = b->data + b->size;
+    for (unsigned long i = 0; i < len; i++) {
+        switch (s[i]) {
+        case '\\': *p++ = '\\'; *p++ = '\\'; break;
+        case '\t': *p++ = '\\'; *p++ = 't'; break;
+        case '\n': *p++ = '\\'; *p++ = 'n'; break;
+        case '\r': *p++ = '\\'; *p++ = 'r'; break;
+        case '\0': *p++ = '\\'; *p++ = '0'; break;
+        default: *p++ = s[i];
+        }
+    }
+    b->size = p - b->data;
+}
+
+static void
+_mysql_copy_json_string(
+    _mysql_Buffer *b,
+    const char *s,
+    unsigned long len)
+{
+    static const char hex[] = "0123456789abcdef";
+    char *p = b->data + b->size;
+    *p++ = '"';
+    for (unsigned long i = 0; i < len; i++) {
+        unsigned char c = s[i];
+        switch (c) {
+        case '"': *p++ = '\\'; *p++ = '"'; break;
+        case '\\': *p++ = '\\'; *p++ = '\\'; break;
+        case '\n': *p++ = '\\'; *p++ = 'n'; break;
+        case '\r': *p++ = '\\'; *p++ = 'r'; break;
+        case '\t': *p++ = '\\'; *p++ = 't'; break;
+        default:
+            if (c < 0x20) {
+                memcpy(p, "\\u00", 4);
+                p[4] = hex[c >> 4];
+                p[5] = hex[c & 15];
+                p += 6;
+            } else {
+                *p++ = c;
+            }
+        }
+    }
+    *p++ = '"';
+    b->size = p - b->data;
+}
+
+static void
+_mysql_copy_base64(
+    _mysql_Buffer *b,
+    const char *s,
+    unsigned long len)
+{
+    static const char alphabet[] =
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+    const unsigned char *u = (const unsigned char *)s;
+    char *p = b->data + b->size;
+    unsigned long i;
+    *p++ = '"';
+    for (i = 0; i + 2 < len; i += 3) {
+        *p++ = alphabet[u[i] >> 2];
+        *p++ = alphabet[((u[i] & 3) << 4) | (u[i + 1] >> 4)];
+        *p++ = alphabet[((u[i + 1] & 15) << 2) | (u[i + 2] >> 6)];
+        *p++ = alphabet[u[i + 2] & 63];
+    }
+    if (i < len) {
+        *p++ = alphabet[u[i] >> 2];
+        if (i + 1 < len) {
+            *p++ = alphabet[((u[i] & 3) << 4) | (u[i + 1] >> 4)];
+            *p++ = alphabet[(u[i + 1] & 15) << 2];
+        } else {
+            *p++ = alphabet[(u[i] & 3) << 4];
+            *p++ = '=';
+        }
+        *p++ = '=';
+    }
+    *p++ = '"';
+    b->size = p - b->data;
+}
+
+/* Appends a value formatted as the column kind of NDJSON or a CSV/TSV
+ * field. It may be called without the GIL. */
+static int
+_mysql_copy_value(
+    _mysql_Buffer *b,
+    int format,
+    int kind,
+    const char *s,
+    unsigned long len)
+{
+    // The worst case of each format, and a byte for the separator or ':'
+    // the caller writes after it.
+    size_t need;
+    if (format != COPY_NDJSON) {
+        need = (size_t)len * 2 + 2;
+    } else if (!s) {
+        need = 4;
+    } else if (kind == COPY_NUMBER || kind == COPY_JSON) {
+        need = len;
+    } else if (kind == COPY_BINARY) {
+        need = ((size_t)len + 2) / 3 * 4 + 2;
+    } else {
+        need = (size_t)len * 6 + 2;
+    }
+    if (_mysql_Buffer_reserve(b, need + 1)) {
+        return -1;
+    }
+    switch (format) {
+    case COPY_CSV:
+        if (s) _mysql_copy_csv(b, s, len);
+        break;
+    case COPY_TSV:
+        if (s) {
+            _mysql_copy_tsv(b, s, len);
+        } else {
+            memcpy(b->data + b->size, "\\N", 2);
+            b->size += 2;
+        }
+        break;
+    default:
+        if (!s) {
+            memcpy(b->data + b->size, "null", 4);
+            b->size += 4;
+        } else if (kind == COPY_NUMBER || kind == COPY_JSON) {
+            memcpy(b->data + b->size, s, len);
+            b->size += len;
+        } else if (kind == COPY_BINARY) {
+            _mysql_copy_base64(b, s, len);
+        } else {
+            _mysql_copy_json_string(b, s, len);
+        }
+    }
+    return 0;
+}
+
+static int
+_mysql_copy_kind(
+    MYSQL_FIELD *field)
+{
+    switch (field->type) {
+    case MYSQL_TYPE_TINY:
+    case MYSQL_TYPE_SHORT:
+    case MYSQL_TYPE_LONG:
+    case MYSQL_TYPE_INT24:
+    case MYSQL_TYPE_LONGLONG:
+    case MYSQL_TYPE_YEAR:
+    case MYSQL_TYPE_FLOAT:
+    case MYSQL_TYPE_DOUBLE:
+    case MYSQL_TYPE_DECIMAL:
+    case MYSQL_TYPE_NEWDECIMAL:
+        return COPY_NUMBER;
+    case MYSQL_TYPE_JSON:
+        return COPY_JSON;
+    case MYSQL_TYPE_BIT:
+    case MYSQL_TYPE_GEOMETRY:
+        return COPY_BINARY;
+    case MYSQL_TYPE_VARCHAR:
+    case MYSQL_TYPE_VAR_STRING:
+    case MYSQL_TYPE_STRING:
+    case MYSQL_TYPE_TINY_BLOB:
+    case MYSQL_TYPE_MEDIUM_BLOB:
+    case MYSQL_TYPE_LONG_BLOB:
+    case MYSQL_TYPE_BLOB:
+        return field->charsetnr == 63 ? COPY_BINARY : COPY_STRING;
+    default:
+        return COPY_STRING;
+    }
+}
+
+static const char _mysql_ResultObject_copy_to__doc__[] =
+"copy_to(write, format='csv', header=False, text=False) -- Writes the remaining\n\
+rows as text, calling write() with bytes of about 1MB. Returns the\n\
+number of rows. Values are not converted; they are written as sent\n\
+by the server, in the character set of the connection.\n\
+\n\
+    csv    -- RFC 4180 (\\r\\n line ends). NULL is an empty field, the\n\
+              empty string is \"\".\n\
+    tsv    -- the default format of LOAD DATA: tab separated, \\n line\n\
+              ends, \\\\, \\t, \\n, \\r and \\0 escaped, NULL is \\N.\n\
+    ndjson -- one JSON object per row, keyed by the column names (the\n\
+              keys of fetch_row(how=1)). Numbers and JSON columns are\n\
+              written as is, binary columns as base64 strings. It needs\n\
+              a UTF-8 connection.\n\
+\n\
+header writes the column names as the first line of csv and tsv.\n\
+If text is true, the chunks are going to be decoded, and csv or tsv\n\
+of a binary column raises ProgrammingError instead of writing bytes\n\
+that may not decode. Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ResultObject_copy_to(
+    _mysql_ResultObject *self,
+    PyObject *args,
+    PyObject *kwargs)
+{
+    static char *kwlist[] = {"write", "format", "header", "text", NULL};
+    PyObject *write, *names=NULL, *r=NULL;
+    const char *formatname = "csv";
+    int header = 0, text = 0, format;
+    int *kinds = NULL;
+    _mysql_Buffer buf = {0}, keys = {0};
+    size_t *keyends = NULL;
+    Py_ssize_t rownum = 0;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|spp:copy_to", kwlist,
+                                     &write, &formatname, &header, &text))
+        return NULL;
+    if (strcmp(formatname, "csv") == 0) {
+        format = COPY_CSV;
+    } else if (strcmp(formatname, "tsv") == 0) {
+        format = COPY_TSV;
+    } else if (strcmp(formatname, "ndjson") == 0) {
+        format = COPY_NDJSON;
+    } else {
+        PyErr_Format(PyExc_ValueError, "Unknown format: %s", formatname);
+        return NULL;
+    }
+    if (format == COPY_NDJSON && self->encoding != utf8 &&
+            strcmp(self->encoding, "ascii") != 0) {
+        PyErr_Format(_mysql_NotSupportedError,
+                     "ndjson needs a UTF-8 connection, not %s", self->encoding);
+        return NULL;
+    }
+    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+
+    unsigned int n = self->nfields;
+    MYSQL_FIELD *fields = mysql_fetch_fields(self->result);
+    if (!(names = _mysql_field_names(self))) goto error;
+    if (!(kinds = PyMem_New(int, n ? n : 1)) ||
+            !(keyends = PyMem_New(size_t, n ? n : 1))) {
+        PyErr_NoMemory();
+        goto error;
+    }
+    // The names are written as the header of csv/tsv or the keys of ndjson.
+    for (unsigned int i = 0; i < n; i++) {
+        Py_ssize_t len;
+        const char *name = PyUnicode_AsUTF8AndSize(PyTuple_GET_ITEM(names, i), &len);
+        if (!name) goto error;
+        kinds[i] = _mysql_copy_kind(&fields[i]);
+        if (text && format != COPY_NDJSON && kinds[i] == COPY_BINARY) {
+            PyErr_Format(_mysql_ProgrammingError,
+                         "column %s is binary; copy it to a binary file "
+                         "or as ndjson", name);
+            goto error;
+        }
+        if (format == COPY_NDJSON) {
+            if (_mysql_copy_value(&keys, format, COPY_STRING, name, len)) {
+                PyErr_NoMemory();
+                goto error;
+            }
+            keys.data[keys.size++] = ':';
+            keyends[i] = keys.size;
+        } else if (header) {
+            if (_mysql_copy_value(&buf, format, COPY_STRING, name, len)) {
+                PyErr_NoMemory();
+                goto error;
+            }
+            if (i + 1 < n) {
+                buf.data[buf.size++] = format == COPY_CSV ? ',' : '\t';
+            }
+        }
+    }
+    if (header && format != COPY_NDJSON) {
+        if (_mysql_Buffer_reserve(&buf, 2)) {
+            PyErr_NoMemory();
+            goto error;
+        }
+        if (format == COPY_CSV) buf.data[buf.size++] = '\r';
+        buf.data[buf.size++] = '\n';
+    }
+
+    bool end = false;
+    while (!end) {
+        int err = 0;
+        Py_BEGIN_ALLOW_THREADS
+        while (buf.size < COPY_CHUNK_SIZE) {
+            unsigned long *length;
+            MYSQL_ROW row = _mysql_ResultObject_next_row(self, &length);
+            if (!row) {
+                end = true;
+                break;
+            }
+            if ((err = _mysql_Buffer_reserve(&buf, 3))) break;
+            if (format == COPY_NDJSON) buf.data[buf.size++] = '{';
+            for (unsigned int i = 0; i < n && !err; i++) {
+                if (format == COPY_NDJSON) {
+                    size_t start = i ? keyends[i - 1] : 0;
+                    if ((err = _mysql_Buffer_reserve(&buf, keyends[i] - start + 1))) break;
+                    if (i) buf.data[buf.size++] = ',';
+                    memcpy(buf.data + buf.size, keys.data + start, keyends[i] - start);
+                    buf.size += keyends[i] - start;
+                } else if (i) {
+                    // _mysql_copy_value() reserved room for it.
+                    buf.data[buf.size++] = format == COPY_CSV ? ',' : '\t';
+                }
+                err = _mysql_copy_value(&buf, format, kinds[i], row[i], length[i]);
+            }
+            if (err || (err = _mysql_Buffer_reserve(&buf, 3))) break;
+            if (format == COPY_NDJSON) buf.data[buf.size++] = '}';
+            if (format == COPY_CSV) buf.data[buf.size++] = '\r';
+            buf.data[buf.size++] = '\n';
+            rownum++;
+        }
+        Py_END_ALLOW_THREADS
+        if (err) {
+            PyErr_NoMemory();
+            goto error;
+        }
+        if (end && mysql_errno(&(result_connection(self)->connection))) {
+            _mysql_Exception(result_connection(self));
+            goto error;
+        }
+        if (buf.size) {
+            PyObject *chunk = PyBytes_FromStringAndSize(buf.data, buf.size);
+            if (!chunk) goto error;
+            PyObject *res = PyObject_CallOneArg(write, chunk);
+            Py_DECREF(chunk);
+            if (!res) goto error;
+            Py_DECREF(res);
+            buf.size = 0;
+        }
+    }
+    r = PyLong_FromSsize_t(rownum);
+  error:
+    END_RESULT_CONNECTION_LOCK(self);
+    PyMem_RawFree(buf.data);
+    PyMem_RawFree(keys.data);
+    PyMem_Free(kinds);
+    PyMem_Free(keyends);
+    Py_XDECREF(names);
+    return r;
+}
+
+/* Arrow C data interface, see
+ * https://arrow.apache.org/docs/format/CDataInterface.html
+ * https://arrow.apache.org/docs/format/CStreamInterface.html */
+#ifndef ARROW_C_DATA_INTERFACE
+#define ARROW_C_DATA_INTERFACE
+
+#define ARROW_FLAG_DICTIONARY_ORDERED 1
+#define ARROW_FLAG_NULLABLE 2
+#define ARROW_FLAG_MAP_KEYS_SORTED 4
+
+struct ArrowSchema {
+    // Array type description
+    const char* format;
+    const char* name;
+    const char* metadata;
+    int64_t flags;
+    int64_t n_children;
+    struct ArrowSchema** children;
+    struct ArrowSchema* dictionary;
+
+    // Release callback
+    void (*release)(struct ArrowSchema*);
+    // Opaque producer-specific data
+    void* private_data;
+};
+
+struct ArrowArray {
+    // Array data description
+    int64_t length;
+    int64_t null_count;
+    int64_t offset;
+    int64_t n_buffers;
+    int64_t n_children;
+    const void** buffers;
+    struct ArrowArray** children;
+    struct ArrowArray* dictionary;
+
+    // Release callback
+    void (*release)(struct ArrowArray*);
+    // Opaque producer-specific data
+    void* private_data;
+};
+
+#endif  // ARROW_C_DATA_INTERFACE
+
+#ifndef ARROW_C_STREAM_INTERFACE
+#define ARROW_C_STREAM_INTERFACE
+
+struct ArrowArrayStream {
+    // Callbacks providing stream functionality
+    int (*get_schema)(struct ArrowArrayStream*, struct ArrowSchema* out);
+    int (*get_next)(struct ArrowArrayStream*, struct ArrowArray* out);
+    const char* (*get_last_error)(struct ArrowArrayStream*);
+
+    // Release callback
+    void (*release)(struct ArrowArrayStream*);
+
+    // Opaque producer-specific data
+    void* private_data;
+};
+
+#endif  // ARROW_C_STREAM_INTERFACE
+
+/* Arrow types of the exported columns. */
+enum {
+    ARROW_INT64,
+    ARROW_UINT64,
+    ARROW_FLOAT64,
+    ARROW_DATE32,
+    ARROW_TIMESTAMP, // microseconds, no time zone
+    ARROW_DURATION,  // microseconds
+    ARROW_DECIMAL128,
+    ARROW_UTF8,      // large_utf8
+    ARROW_BINARY,    // large_binary
+};
+
+#define ARROW_DEFAULT_BATCH_SIZE 65536
+
+typedef struct {
+    int type;
+    int scale;          // for ARROW_DECIMAL128
+    bool transcode;     // ARROW_UTF8 in the connection encoding
+    bool nullable;
+    char format[24];
+    char *name;
+} _mysql_ArrowField;
+
+/* Buffers are allocated with the raw allocator, because consumers may
+ * release arrays without holding the GIL. */
+typedef struct {
+    char *data;
+    size_t size;
+    size_t capacity;
+} _mysql_ArrowBuffer;
+
+typedef struct {
+    _mysql_ArrowBuffer validity;
+    _mysql_ArrowBuffer values; // values, or int64 offsets of variable size types
+    _mysql_ArrowBuffer data;   // data of variable size types
+    int64_t null_count;
+} _mysql_ArrowColumn;
+
+typedef struct {
+    PyObject *result;
+    int64_t batch_size;
+    bool done;
+    MYSQL_ROW_OFFSET offset; // next row of a stored result
+    int nfields;
+    _mysql_ArrowField *fields;
+    _mysql_ArrowColumn *columns;
+    char *last_error;
+} _mysql_ArrowStream;
+
+static int
+_mysql_ArrowBuffer_reserve(
+    _mysql_ArrowBuffer *b,
+    size_t extra)
+{
+    if (b->size + extra <= b->capacity) {
+        return 0;
+    }
+    size_t capacity = b->capacity ? b->capacity : 64;
+    while (capacity < b->size + extra) {
+        capacity *= 2;
+    }
+    char *p = PyMem_RawRealloc(b->data, capacity);
+    if (!p) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    b->data = p;
+    b->capacity = capacity;
+    return 0;
+}
+
+static int
+_mysql_ArrowBuffer_append(
+    _mysql_ArrowBuffer *b,
+    const void *data,
+    size_t size)
+{
+    if (_mysql_ArrowBuffer_reserve(b, size) < 0) {
+        return -1;
+    }
+    memcpy(b->data + b->size, data, size);
+    b->size += size;
+    return 0;
+}
+
+static bool
+_is_leap_year(int year)
+{
+    return year % 4 == 0 && (year % 100 != 0 || year % 400 == 0);
+}
+
+/* Days since 1970-01-01. Returns false for dates which are rejected by
+ * the datetime module, like 0000-00-00. */
+static bool
+_days_from_civil(int year, int month, int day, int32_t *days)
+{
+    static const int mdays[] = {31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31};
+    if (year < 1 || month < 1 || month > 12 || day < 1 ||
+            day > mdays[month-1] + (month == 2 && _is_leap_year(year))) {
+        return false;
+    }
+    year -= month <= 2;
+    int era = year / 400;
+    int yoe = year - era * 400;
+    int doy = (153 * (month + (month > 2 ? -3 : 9)) + 2) / 5 + day - 1;
+    int doe = yoe * 365 + yoe / 4 - yoe / 100 + doy;
+    *days = era * 146097 + doe - 719468;
+    return true;
+}
+
+/* DECIMAL text to a 128 bit little endian two's complement integer
+ * scaled by 10**scale. */
+static int
+_mysql_arrow_parse_decimal(
+    const char *s,
+    unsigned long length,
+    int scale,
+    unsigned char *out)
+{
+    uint32_t limbs[4] = {0, 0, 0, 0};
+    const char *end = s + length;
+    bool negative = false;
+    int frac = -1, ndigits = 0;
+
+    if (s < end && *s == '-') {
+        negative = true;
+        s++;
+    }
+    for (;;) {
+        uint64_t carry = 0;
+        if (s < end) {
+            if (*s == '.' && frac < 0) {
+                frac = 0;
+                s++;
+                continue;
+            }
+            if (*s < '0' || *s > '9') {
+                return -1;
+            }
+            carry = *s++ - '0';
+        } else if (frac < scale) { // pad with zeros up to scale
+            frac = frac < 0 ? 0 : frac;
+        } else {
+            break;
+        }
+        if ((frac >= 0 && ++frac > scale) || ++ndigits > 38) {
+            return -1;
+        }
+        for (int k = 0; k < 4; k++) {
+            uint64_t t = (uint64_t)limbs[k] * 10 + carry;
+            limbs[k] = (uint32_t)t;
+            carry = t >> 32;
+        }
+    }
+    if (ndigits == 0) {
+        return -1;
+    }
+    if (negative) {
+        uint64_t carry = 1;
+        for (int k = 0; k < 4; k++) {
+            uint64_t t = (uint64_t)(uint32_t)~limbs[k] + carry;
+            limbs[k] = (uint32_t)t;
+            carry = t >> 32;
+        }
+    }
+    for (int k = 0; k < 16; k++) {
+        out[k] = (unsigned char)(limbs[k / 4] >> (8 * (k % 4)));
+    }
+    return 0;
+}
+
+static void
+_mysql_arrow_field_init(
+    _mysql_ArrowField *af,
+    MYSQL_FIELD *field,
+    _mysql_ColumnDecoder *dec)
+{
+    const char *format;
+
+    af->transcode = false;
+    af->nullable = !(field->flags & NOT_NULL_FLAG);
+    switch (dec->kind) {
+    case DECODE_INT:
+        if (field->flags & UNSIGNED_FLAG) {
+            af->type = ARROW_UINT64;
+            format = "L";
+        } else {
+            af->type = ARROW_INT64;
+            format = "l";
+        }
+        break;
+    case DECODE_FLOAT:
+        af->type = ARROW_FLOAT64;
+        format = "g";
+        break;
+    // Zero and invalid temporal values are exported as null, even in NOT
+    // NULL columns.
+    case DECODE_DATE:
+        af->type = ARROW_DATE32;
+        af->nullable = true;
+        format = "tdD";
+        break;
+    case DECODE_DATETIME:
+        af->type = ARROW_TIMESTAMP;
+        af->nullable = true;
+        format = "tsu:";
+        break;
+    case DECODE_TIMEDELTA:
+        af->type = ARROW_DURATION;
+        af->nullable = true;
+        format = "tDu";
+        break;
+    case DECODE_BYTES:
+        af->type = ARROW_BINARY;
+        format = "Z";
+        break;
+    case DECODE_STR:
+        af->type = ARROW_UTF8;
+        af->transcode = true;
+        format = "U";
+        break;
+    default:
+        if (field->type == FIELD_TYPE_DECIMAL || field->type == FIELD_TYPE_NEWDECIMAL) {
+            // length counts the sign and the decimal point.
+            int precision = (int)field->length - (field->decimals > 0) -
+                            !(field->flags & UNSIGNED_FLAG);
+            if (precision >= 1 && precision <= 38 && (int)field->decimals <= precision) {
+                af->type = ARROW_DECIMAL128;
+                af->scale = field->decimals;
+                snprintf(af->format, sizeof(af->format), "d:%d,%d",
+                         precision, af->scale);
+                return;
+            }
+            af->type = ARROW_UTF8;
+            format = "U";
+        } else if (field->type == MYSQL_TYPE_JSON) {
+            af->type = ARROW_UTF8;
+            format = "U";
+        } else if (field->charsetnr == 63) { // binary
+            af->type = ARROW_BINARY;
+            format = "Z";
+        } else {
+            af->type = ARROW_UTF8;
+            af->transcode = true;
+            format = "U";
+        }
+    }
+    strcpy(af->format, format);
+}
+
+static int
+_mysql_ArrowColumn_append(
+    _mysql_ArrowColumn *col,
+    _mysql_ArrowField *af,
+    int64_t rownum,
+    const char *rowitem,
+    unsigned long length,
+    const char *encoding)
+{
+    unsigned char value[16];
+    size_t width = 8;
+    bool valid = rowitem != NULL;
+
+    if (rownum == 0 && (af->type == ARROW_UTF8 || af->type == ARROW_BINARY)) {
+        int64_t zero = 0;
+        if (_mysql_ArrowBuffer_append(&col->values, &zero, sizeof(zero)) < 0) {
+            return -1;
+        }
+    }
+    if (rownum % 8 == 0) {
+        if (_mysql_ArrowBuffer_reserve(&col->validity, 1) < 0) {
+            return -1;
+        }
+        col->validity.data[col->validity.size++] = 0;
+    }
+
+    memset(value, 0, sizeof(value));
+    // rowitem is NUL terminated.
+    if (valid) {
+        char *end = NULL;
+        switch (af->type) {
+        case ARROW_INT64: {
+            errno = 0;
+            long long x = strtoll(rowitem, &end, 10);
+            if (errno || end != rowitem + length) goto invalid;
+            memcpy(value, &x, sizeof(x));
+            break;
+        }
+        case ARROW_UINT64: {
+            errno = 0;
+            unsigned long long x = strtoull(rowitem, &end, 10);
+            if (errno || *rowitem == '-' || end != rowitem + length) goto invalid;
+            memcpy(value, &x, sizeof(x));
+            break;
+        }
+        case ARROW_FLOAT64: {
+            double x = PyOS_string_to_double(rowitem, &end, NULL);
+            if (x == -1.0 && PyErr_Occurred()) {
+                return -1;
+            }
+            if (end != rowitem + length) goto invalid;
+            memcpy(value, &x, sizeof(x));
+            break;
+        }
+        case ARROW_DATE32: {
+            int f[3];
+            int32_t days;
+            width = 4;
+            // Like Date_or_None, invalid dates are NULL.
+            valid = _scan_date(rowitem, length, f) == 0 &&
+                    _days_from_civil(f[0], f[1], f[2], &days);
+            if (valid) {
+                memcpy(value, &days, sizeof(days));
+            }
+            break;
+        }
+        case ARROW_TIMESTAMP: {
+            int f[7] = {0, 0, 0, 0, 0, 0, 0};
+            int32_t days;
+            valid = (length < 11 ? _scan_date(rowitem, length, f) :
+                                   _scan_datetime(rowitem, length, f)) == 0 &&
+                    _days_from_civil(f[0], f[1], f[2], &days) &&
+                    f[3] < 24 && f[4] < 60 && f[5] < 60;
+            if (valid) {
+                int64_t x = (((int64_t)days * 24 + f[3]) * 60 + f[4]) * 60 + f[5];
+                x = x * 1000000 + f[6];
+                memcpy(value, &x, sizeof(x));
+            }
+            break;
+        }
+        case ARROW_DURATION: {
+            int negative, usec;
+            long long seconds;
+            valid = _scan_timedelta(rowitem, length, &negative, &seconds, &usec) == 0;
+            if (valid) {
+                int64_t x = (int64_t)seconds * 1000000 + usec;
+                if (negative) {
+                    x = -x;
+                }
+                memcpy(value, &x, sizeof(x));
+            }
+            break;
+        }
+        case ARROW_DECIMAL128:
+            width = 16;
+            if (_mysql_arrow_parse_decimal(rowitem, length, af->scale, value) < 0) {
+                goto invalid;
+            }
+            break;
+        case ARROW_UTF8:
+        case ARROW_BINARY:
+            width = 0;
+            if (af->transcode && encoding != utf8) {
+                PyObject *u = PyUnicode_Decode(rowitem, length, encoding, NULL);
+                if (!u) {
+                    return -1;
+                }
+                Py_ssize_t size;
+                const char *s = PyUnicode_AsUTF8AndSize(u, &size);
+                int err = !s || _mysql_ArrowBuffer_append(&col->data, s, size) < 0;
+                Py_DECREF(u);
+                if (err) {
+                    return -1;
+                }
+            } else if (_mysql_ArrowBuffer_append(&col->data, rowitem, length) < 0) {
+                return -1;
+            }
+            int64_t offset = col->data.size;
+            if (_mysql_ArrowBuffer_append(&col->values, &offset, sizeof(offset)) < 0) {
+                return -1;
+            }
+            break;
+        }
+    } else if (af->type == ARROW_UTF8 || af->type == ARROW_BINARY) {
+        width = 0;
+        int64_t offset = col->data.size;
+        if (_mysql_ArrowBuffer_append(&col->values, &offset, sizeof(offset)) < 0) {
+            return -1;
+        }
+    } else if (af->type == ARROW_DATE32) {
+        width = 4;
+    } else if (af->type == ARROW_DECIMAL128) {
+        width = 16;
+    }
+
+    if (valid) {
+        col->validity.data[rownum / 8] |= 1 << (rownum % 8);
+    } else {
+        col->null_count++;
+    }
+    if (width && _mysql_ArrowBuffer_append(&col->values, value, width) < 0) {
+        return -1;
+    }
+    return 0;
+  invalid:
+    PyErr_Format(PyExc_ValueError, "invalid value for column %s: %.*s",
+                 af->name, (int)length, rowitem);
+    return -1;
+}
+
+static void
+_mysql_ArrowColumn_reset(
+    _mysql_ArrowColumn *col)
+{
+    col->validity.size = col->values.size = col->data.size = 0;
+    col->null_count = 0;
+}
+
+static void
+_mysql_ArrowColumn_free(
+    _mysql_ArrowColumn *col)
+{
+    PyMem_RawFree(col->validity.data);
+    PyMem_RawFree(col->values.data);
+    PyMem_RawFree(col->data.data);
+    memset(col, 0, sizeof(*col));
+}
+
+typedef struct {
+    struct ArrowArray **children;
+    struct ArrowArray *child_arrays;
+    const void *buffers[1];
+} _mysql_ArrowStructArray;
+
+static void
+_mysql_ArrowChildArray_release(
+    struct ArrowArray *array)
+{
+    void **buffers = (void **)array->buffers;
+    for (int64_t i = 0; i < array->n_buffers; i++) {
+        PyMem_RawFree(buffers[i]);
+    }
+    PyMem_RawFree(buffers);
+    array->release = NULL;
+}
+
+static void
+_mysql_ArrowStructArray_release(
+    struct ArrowArray *array)
+{
+    _mysql_ArrowStructArray *priv = array->private_data;
+    for (int64_t i = 0; i < array->n_children; i++) {
+        if (priv->child_arrays[i].release) {
+            priv->child_arrays[i].release(&priv->child_arrays[i]);
+        }
+    }
+    PyMem_RawFree(priv->child_arrays);
+    PyMem_RawFree(priv->children);
+    PyMem_RawFree(priv);
+    array->release = NULL;
+}
+
+/* Move the built columns into a struct array of nrows rows. */
+static int
+_mysql_ArrowStream_export_batch(
+    _mysql_ArrowStream *st,
+    int64_t nrows,
+    struct ArrowArray *out)
+{
+    int n = st->nfields;
+    _mysql_ArrowStructArray *priv = PyMem_RawCalloc(1, sizeof(*priv));
+    if (!priv ||
+            !(priv->children = PyMem_RawCalloc(n ? n : 1, sizeof(struct ArrowArray *))) ||
+            !(priv->child_arrays = PyMem_RawCalloc(n ? n : 1, sizeof(struct ArrowArray)))) {
+        goto error;
+    }
+    for (int i = 0; i < n; i++) {
+        _mysql_ArrowColumn *col = &st->columns[i];
+        struct ArrowArray *child = &priv->child_arrays[i];
+        bool varsize = (st->fields[i].type == ARROW_UTF8 ||
+                        st->fields[i].type == ARROW_BINARY);
+        void **buffers = PyMem_RawCalloc(3, sizeof(void *));
+        if (!buffers) {
+            goto error;
+        }
+        if (col->null_count) {
+            buffers[0] = col->validity.data;
+        } else {
+            PyMem_RawFree(col->validity.data);
+        }
+        buffers[1] = col->values.data;
+        buffers[2] = col->data.data;
+        if (varsize && !buffers[2]) { // all values are empty or NULL
+            buffers[2] = PyMem_RawMalloc(1);
+        }
+        child->length = nrows;
+        child->null_count = col->null_count;
+        child->offset = 0;
+        child->n_buffers = varsize ? 3 : 2;
+        child->n_children = 0;
+        child->buffers = (const void **)buffers;
+        child->children = NULL;
+        child->dictionary = NULL;
+        child->release = _mysql_ArrowChildArray_release;
+        child->private_data = NULL;
+        priv->children[i] = child;
+        memset(col, 0, sizeof(*col)); // owned by the child now
+        if (varsize && !buffers[2]) {
+            goto error;
+        }
+    }
+    priv->buffers[0] = NULL;
+    out->length = nrows;
+    out->null_count = 0;
+    out->offset = 0;
+    out->n_buffers = 1;
+    out->n_children = n;
+    out->buffers = priv->buffers;
+    out->children = priv->children;
+    out->dictionary = NULL;
+    out->release = _mysql_ArrowStructArray_release;
+    out->private_data = priv;
+    return 0;
+  error:
+    if (priv) {
+        if (priv->child_arrays) {
+            for (int i = 0; i < n; i++) {
+                if (priv->child_arrays[i].release) {
+                    priv->child_arrays[i].release(&priv->child_arrays[i]);
+                }
+            }
+        }
+        PyMem_RawFree(priv->child_arrays);
+        PyMem_RawFree(priv->children);
+        PyMem_RawFree(priv);
+    }
+    PyErr_NoMemory();
+    return -1;
+}
+
+/* Store the current Python exception as the last error. */
+static int
+_mysql_ArrowStream_set_error(
+    _mysql_ArrowStream *st)
+{
+    PyObject *type, *value, *traceback, *msg = NULL;
+    const char *s = NULL;
+
+    PyErr_Fetch(&type, &value, &traceback);
+    if (value && (msg = PyObject_Str(value))) {
+        s = PyUnicode_AsUTF8(msg);
+    }
+    PyErr_Clear();
+    PyMem_RawFree(st->last_error);
+    if ((st->last_error = PyMem_RawMalloc(strlen(s ? s : "unknown error") + 1))) {
+        strcpy(st->last_error, s ? s : "unknown error");
+    }
+    Py_XDECREF(msg);
+    Py_XDECREF(type);
+    Py_XDECREF(value);
+    Py_XDECREF(traceback);
+    return EIO;
+}
+
+static int
+_mysql_ArrowStream_next(
+    _mysql_ArrowStream *st,
+    struct ArrowArray *out)
+{
+    _mysql_ResultObject *res = (_mysql_ResultObject *)st->result;
+    _mysql_ConnectionObject *conn = result_connection(res);
+    int64_t nrows = 0;
+
+    out->release = NULL;
+    if (st->done) {
+        return 0;
+    }
+    if (BEGIN_CONNECTION_LOCK(conn) < 0) {
+        return _mysql_ArrowStream_set_error(st);
+    }
+    if (!conn->open) {
+        _mysql_Exception(conn);
+        goto error;
+    }
+    if (!res->use) {
+        mysql_row_seek(res->result, st->offset);
+    }
+    for (; nrows < st->batch_size; nrows++) {
+        MYSQL_ROW row;
+        unsigned long *length;
+        if (!res->use)
+            row = _mysql_ResultObject_next_row(res, &length);
+        else {
+            Py_BEGIN_ALLOW_THREADS
+            row = _mysql_ResultObject_next_row(res, &length);
+            Py_END_ALLOW_THREADS
+        }
+        if (!row && mysql_errno(&conn->connection)) {
+            _mysql_Exception(conn);
+            goto error;
+        }
+        if (!row) {
+            st->done = true;
+            break;
+        }
+        for (int i = 0; i < st->nfields; i++) {
+            if (_mysql_ArrowColumn_append(&st->columns[i], &st->fields[i], nrows,
+                                          row[i], length[i], res->encoding) < 0) {
+                goto error;
+            }
+        }
+    }
+    if (!res->use) {
+        st->offset = mysql_row_tell(res->result);
+    }
+    END_CONNECTION_LOCK(conn);
+    if (nrows == 0) {
+        return 0; // end of stream
+    }
+    if (_mysql_ArrowStream_export_batch(st, nrows, out) < 0) {
+        goto reset;
+    }
+    return 0;
+  error:
+    END_CONNECTION_LOCK(conn);
+  reset:
+    for (int i = 0; i < st->nfields; i++) {
+        _mysql_ArrowColumn_reset(&st->columns[i]);
+    }
+    st->done = true;
+    return _mysql_ArrowStream_set_error(st);
+}
+
+static int
+_mysql_ArrowStream_get_next(
+    struct ArrowArrayStream *stream,
+    struct ArrowArray *out)
+{
+    PyGILState_STATE gstate = PyGILState_Ensure();
+    int err = _mysql_ArrowStream_next(stream->private_data, out);
+    PyGILState_Release(gstate);
+    return err;
+}
+
+static void
+_mysql_ArrowSchema_release(
+    struct ArrowSchema *schema)
+{
+    for (int64_t i = 0; i < schema->n_children; i++) {
+        struct ArrowSchema *child = schema->children[i];
+        if (child->release) {
+            child->release(child);
+        }
+    }
+    PyMem_RawFree(schema->children);
+    PyMem_RawFree(schema->private_data); // child schemas
+    schema->release = NULL;
+}
+
+static void
+_mysql_ArrowChildSchema_release(
+    struct ArrowSchema *schema)
+{
+    PyMem_RawFree(schema->private_data); // format and name
+    schema->release = NULL;
+}
+
+static int
+_mysql_ArrowStream_get_schema(
+    struct ArrowArrayStream *stream,
+    struct ArrowSchema *out)
+{
+    _mysql_ArrowStream *st = stream->private_data;
+    int n = st->nfields;
+    struct ArrowSchema **children = PyMem_RawCalloc(n ? n : 1, sizeof(struct ArrowSchema *));
+    struct ArrowSchema *child_schemas = PyMem_RawCalloc(n ? n : 1, sizeof(struct ArrowSchema));
+    if (!children || !child_schemas) {
+        goto error;
+    }
+    for (int i = 0; i < n; i++) {
+        _mysql_ArrowField *af = &st->fields[i];
+        size_t format_size = strlen(af->format) + 1;
+        char *buf = PyMem_RawMalloc(format_size + strlen(af->name) + 1);
+        if (!buf) {
+            goto error;
+        }
+        strcpy(buf, af->format);
+        strcpy(buf + format_size, af->name);
+        struct ArrowSchema *child = &child_schemas[i];
+        child->format = buf;
+        child->name = buf + format_size;
+        child->metadata = NULL;
+        child->flags = af->nullable ? ARROW_FLAG_NULLABLE : 0;
+        child->n_children = 0;
+        child->children = NULL;
+        child->dictionary = NULL;
+        child->release = _mysql_ArrowChildSchema_release;
+        child->private_data = buf;
+        children[i] = child;
+    }
+    out->format = "+s";
+    out->name = "";
+    out->metadata = NULL;
+    out->flags = 0;
+    out->n_children = n;
+    out->children = children;
+    out->dictionary = NULL;
+    out->release = _mysql_ArrowSchema_release;
+    out->private_data = child_schemas;
+    return 0;
+  error:
+    if (child_schemas) {
+        for (int i = 0; i < n; i++) {
+            PyMem_RawFree(child_schemas[i].private_data);
+        }
+    }
+    PyMem_RawFree(children);
+    PyMem_RawFree(child_schemas);
+    return ENOMEM;
+}
+
+static const char *
+_mysql_ArrowStream_get_last_error(
+    struct ArrowArrayStream *stream)
+{
+    _mysql_ArrowStream *st = stream->private_data;
+    return st->last_error;
+}
+
+static void
+_mysql_ArrowStream_free(
+    _mysql_ArrowStream *st)
+{
+    if (st->fields) {
+        for (int i = 0; i < st->nfields; i++) {
+            PyMem_RawFree(st->fields[i].name);
+        }
+    }
+    if (st->columns) {
+        for (int i = 0; i < st->nfields; i++) {
+            _mysql_ArrowColumn_free(&st->columns[i]);
+        }
+    }
+    PyMem_RawFree(st->fields);
+    PyMem_RawFree(st->columns);
+    PyMem_RawFree(st->last_error);
+    PyMem_RawFree(st);
+}
+
+static void
+_mysql_ArrowStream_release(
+    struct ArrowArrayStream *stream)
+{
+    _mysql_ArrowStream *st = stream->private_data;
+    if (Py_IsInitialized()) {
+        PyGILState_STATE gstate = PyGILState_Ensure();
+        Py_CLEAR(st->result);
+        PyGILState_Release(gstate);
+    }
+    _mysql_ArrowStream_free(st);
+    stream->release = NULL;
+}
+
+static void
+_mysql_ArrowStream_capsule_destructor(
+    PyObject *capsule)
+{
+    struct ArrowArrayStream *stream =
+        PyCapsule_GetPointer(capsule, "arrow_array_stream");
+    if (stream->release) {
+        stream->release(stream);
+    }
+    PyMem_RawFree(stream);
+}
+
+static const char _mysql_ResultObject___arrow_c_stream____doc__[] =
+"__arrow_c_stream__([requested_schema], *, batch_size=65536)\n\
+-- Exports the remaining rows as an Arrow C stream (PyCapsule).\n\
+\n\
+Rows are read from the result while the stream is consumed, in\n\
+batches of up to batch_size rows. requested_schema is ignored.\n\
+Integer, float, temporal and DECIMAL columns are exported as Arrow\n\
+types, other columns as large_utf8 or large_binary. Invalid dates\n\
+are NULL. Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ResultObject___arrow_c_stream__(
+    _mysql_ResultObject *self,
+    PyObject *args,
+    PyObject *kwargs)
+{
+    static char *kwlist[] = {"requested_schema", "batch_size", NULL};
+    PyObject *requested_schema = NULL;
+    Py_ssize_t batch_size = ARROW_DEFAULT_BATCH_SIZE;
+    _mysql_ArrowStream *st = NULL;
+    struct ArrowArrayStream *stream = NULL;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|O$n:__arrow_c_stream__", kwlist,
+                                     &requested_schema, &batch_size))
+        return NULL;
+    if (batch_size <= 0) {
+        PyErr_SetString(PyExc_ValueError, "batch_size must be positive");
+        return NULL;
+    }
+    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+    int n = self->nfields;
+    MYSQL_FIELD *fields = mysql_fetch_fields(self->result);
+    if (!(st = PyMem_RawCalloc(1, sizeof(*st))) ||
+            !(st->fields = PyMem_RawCalloc(n ? n : 1, sizeof(_mysql_ArrowField))) ||
+            !(st->columns = PyMem_RawCalloc(n ? n : 1, sizeof(_mysql_ArrowColumn))) ||
+            !(stream = PyMem_RawCalloc(1, sizeof(*stream)))) {
+        PyErr_NoMemory();
+        goto error;
+    }
+    st->nfields = n;
+    for (int i = 0; i < n; i++) {
+        _mysql_arrow_field_init(&st->fields[i], &fields[i], &self->decoders[i]);
+        if (!(st->fields[i].name = PyMem_RawMalloc(strlen(fields[i].name) + 1))) {
+            PyErr_NoMemory();
+            goto error;
+        }
+        strcpy(st->fields[i].name, fields[i].name);
+    }
+    st->batch_size = batch_size;
+    if (!self->use) {
+        st->offset = mysql_row_tell(self->result);
+    }
+    Py_INCREF(self);
+    st->result = (PyObject *)self;
+    END_RESULT_CONNECTION_LOCK(self);
+
+    stream->get_schema = _mysql_ArrowStream_get_schema;
+    stream->get_next = _mysql_ArrowStream_get_next;
+    stream->get_last_error = _mysql_ArrowStream_get_last_error;
+    stream->release = _mysql_ArrowStream_release;
+    stream->private_data = st;
+    PyObject *capsule = PyCapsule_New(stream, "arrow_array_stream",
+                                      _mysql_ArrowStream_capsule_destructor);
+    if (!capsule) {
+        stream->release(stream);
+        PyMem_RawFree(stream);
+    }
+    return capsule;
+  error:
+    END_RESULT_CONNECTION_LOCK(self);
+    if (st) {
+        _mysql_ArrowStream_free(st);
+    }
+    PyMem_RawFree(stream);
+    return NULL;
+}
+
+static PyObject *
+_mysql_RowsObject_item(
+    _mysql_RowsObject *self,
+    Py_ssize_t i)
+{
+    _mysql_ResultObject *result = self->result;
+    PyObject *v;
+
+    if (i < 0 || i >= self->nrows) {
+        PyErr_SetString(PyExc_IndexError, "row index out of range");
+        return NULL;
+    }
+    // Stored results don't use the connection, so it need not be locked.
+    mysql_row_seek(result->result, self->offsets[i]);
+    MYSQL_ROW row = mysql_fetch_row(result->result);
+    if (!row) {
+        PyErr_SetString(PyExc_IndexError, "row index out of range");
+        return NULL;
+    }
+    unsigned long *length = mysql_fetch_lengths(result->result);
+    if (self->cache_filled) {
+        return _mysql_row_to_dict_cached(result, row, length, self->cache);
+    }
+    v = row_converters[self->how](result, row, length, self->cache);
+    if (self->how == ROW_DICT || self->how == ROW_DICT_OLD) {
+        if (v) {
+            self->cache_filled = true;
+        } else {
+            // Drop the partially filled keys.
+            Py_SETREF(self->cache, PyTuple_New(result->nfields));
+            if (!self->cache) Py_CLEAR(v);
+        }
+    }
+    return v;
+}
+
+static Py_ssize_t
+_mysql_RowsObject_length(
+    _mysql_RowsObject *self)
+{
+    return self->nrows;
+}
+
+static PyObject *
+_mysql_RowsObject_subscript(
+    _mysql_RowsObject *self,
+    PyObject *key)
+{
+    if (PyIndex_Check(key)) {
+        Py_ssize_t i = PyNumber_AsSsize_t(key, PyExc_IndexError);
+        if (i == -1 && PyErr_Occurred()) {
+            return NULL;
+        }
+        if (i < 0) {
+            i += self->nrows;
+        }
+        return _mysql_RowsObject_item(self, i);
+    }
+    if (PySlice_Check(key)) {
+        Py_ssize_t start, stop, step, slicelength;
+        if (PySlice_Unpack(key, &start, &stop, &step) < 0) {
+            return NULL;
+        }
+        slicelength = PySlice_AdjustIndices(self->nrows, &start, &stop, step);
+        PyObject *t = PyTuple_New(slicelength);
+        if (!t) {
+            return NULL;
+        }
+        for (Py_ssize_t j = 0, i = start; j < slicelength; j++, i += step) {
+            PyObject *v = _mysql_RowsObject_item(self, i);
+            if (!v) {
+                Py_DECREF(t);
+                return NULL;
+            }
+            PyTuple_SET_ITEM(t, j, v);
+        }
+        return t;
+    }
+    PyErr_Format(PyExc_TypeError, "rows indices must be integers or slices, not %.200s",
+                 Py_TYPE(key)->tp_name);
+    return NULL;
+}
+
+static int
+_mysql_RowsObject_traverse(
+    _mysql_RowsObject *self,
+    visitproc visit,
+    void *arg)
+{
+    Py_VISIT(self->result);
+    Py_VISIT(self->cache);
+    return 0;
+}
+
+static int
+_mysql_RowsObject_clear(
+    _mysql_RowsObject *self)
+{
+    Py_CLEAR(self->result);
+    Py_CLEAR(self->cache);
+    return 0;
+}
+
+static void
+_mysql_RowsObject_dealloc(
+    _mysql_RowsObject *self)
+{
+    PyObject_GC_UnTrack((PyObject *)self);
+    _mysql_RowsObject_clear(self);
+    PyMem_Free(self->offsets);
+    MyFree(self);
+}
+
+static PyObject *
+_mysql_RowsObject_repr(
+    _mysql_RowsObject *self)
+{
+    char buf[300];
+    snprintf(buf, 300, "<_mysql.rows object at %p>", self);
+    return PyUnicode_FromString(buf);
+}
+
+static PyObject *
+_mysql_LazyRowObject_item(
+    _mysql_LazyRowObject *self,
+    Py_ssize_t i)
+{
+    if (i < 0 || i >= Py_SIZE(self)) {
+        PyErr_SetString(PyExc_IndexError, "row index out of range");
+        return NULL;
+    }
+    PyObject *v = self->values[i];
+    if (!v) {
+        _mysql_ResultObject *result = self->result;
+        v = _mysql_decode_column(&result->decoders[i], self->row[i],
+                                 self->lengths[i], result->encoding);
+        if (!v) {
+            return NULL;
+        }
+        if (self->values[i]) { // set by the converter
+            Py_SETREF(v, self->values[i]);
+        } else {
+            self->values[i] = v;
+        }
+    }
+    Py_INCREF(v);
+    return v;
+}
+
+static PyObject *
+_mysql_LazyRowObject_to_tuple(
+    _mysql_LazyRowObject *self)
+{
+    PyObject *t = PyTuple_New(Py_SIZE(self));
+    if (!t) {
+        return NULL;
+    }
+    for (Py_ssize_t i = 0; i < Py_SIZE(self); i++) {
+        PyObject *v = _mysql_LazyRowObject_item(self, i);
+        if (!v) {
+            Py_DECREF(t);
+            return NULL;
+        }
+        PyTuple_SET_ITEM(t, i, v);
+    }
+    return t;
+}
+
+static Py_ssize_t
+_mysql_LazyRowObject_length(
+    _mysql_LazyRowObject *self)
+{
+    return Py_SIZE(self);
+}
+
+static PyObject *
+_mysql_LazyRowObject_subscript(
+    _mysql_LazyRowObject *self,
+    PyObject *key)
+{
+    if (PyUnicode_Check(key)) {
+        PyObject *index = NULL;
+        if (self->names) {
+            index = PyDict_GetItemWithError(self->names, key);
+        }
+        if (!index) {
+            if (!PyErr_Occurred()) {
+                PyErr_SetObject(PyExc_KeyError, key);
+            }
+            return NULL;
+        }
+        return _mysql_LazyRowObject_item(self, PyLong_AsSsize_t(index));
+    }
+    if (PyIndex_Check(key)) {
+        Py_ssize_t i = PyNumber_AsSsize_t(key, PyExc_IndexError);
+        if (i == -1 && PyErr_Occurred()) {
+            return NULL;
+        }
+        if (i < 0) {
+            i += Py_SIZE(self);
+        }
+        return _mysql_LazyRowObject_item(self, i);
+    }
+    if (PySlice_Check(key)) {
+        Py_ssize_t start, stop, step, slicelength;
+        if (PySlice_Unpack(key, &start, &stop, &step) < 0) {
+            return NULL;
+        }
+        slicelength = PySlice_AdjustIndices(Py_SIZE(self), &start, &stop, step);
+        PyObject *t = PyTuple_New(slicelength);
+        if (!t) {
+            return NULL;
+        }
+        for (Py_ssize_t j = 0, i = start; j < slicelength; j++, i += step) {
+            PyObject *v = _mysql_LazyRowObject_item(self, i);
+            if (!v) {
+                Py_DECREF(t);
+                return NULL;
+            }
+            PyTuple_SET_ITEM(t, j, v);
+        }
+        return t;
+    }
+    PyErr_Format(PyExc_TypeError,
+                 "row indices must be integers, slices or str, not %.200s",
+                 Py_TYPE(key)->tp_name);
+    return NULL;
+}
+
+static PyObject *
+_mysql_LazyRowObject_richcompare(
+    _mysql_LazyRowObject *self,
+    PyObject *other,
+    int op)
+{
+    PyObject *a, *b, *r;
+
+    if (Py_IS_TYPE(other, &_mysql_LazyRowObject_Type)) {
+        b = _mysql_LazyRowObject_to_tuple((_mysql_LazyRowObject *)other);
+    } else if (PyTuple_Check(other)) {
+        b = Py_NewRef(other);
+    } else {
+        Py_RETURN_NOTIMPLEMENTED;
+    }
+    if (!b) {
+        return NULL;
+    }
+    if (!(a = _mysql_LazyRowObject_to_tuple(self))) {
+        Py_DECREF(b);
+        return NULL;
+    }
+    r = PyObject_RichCompare(a, b, op);
+    Py_DECREF(a);
+    Py_DECREF(b);
+    return r;
+}
+
+static Py_hash_t
+_mysql_LazyRowObject_hash(
+    _mysql_LazyRowObject *self)
+{
+    PyObject *t = _mysql_LazyRowObject_to_tuple(self);
+    if (!t) {
+        return -1;
+    }
+    Py_hash_t h = PyObject_Hash(t);
+    Py_DECREF(t);
+    return h;
+}
+
+static PyObject *
+_mysql_LazyRowObject_repr(
+    _mysql_LazyRowObject *self)
+{
+    PyObject *t = _mysql_LazyRowObject_to_tuple(self);
+    if (!t) {
+        return NULL;
+    }
+    PyObject *r = PyObject_Repr(t);
+    Py_DECREF(t);
+    return r;
+}
+
+static int
+_mysql_LazyRowObject_traverse(
+    _mysql_LazyRowObject *self,
+    visitproc visit,
+    void *arg)
+{
+    Py_VISIT(self->result);
+    Py_VISIT(self->names);
+    for (Py_ssize_t i = 0; i < Py_SIZE(self); i++) {
+        Py_VISIT(self->values[i]);
+    }
+    return 0;
+}
+
+static int
+_mysql_LazyRowObject_clear(
+    _mysql_LazyRowObject *self)
+{
+    for (Py_ssize_t i = 0; i < Py_SIZE(self); i++) {
+        Py_CLEAR(self->values[i]);
+    }
+    Py_CLEAR(self->names);
+    Py_CLEAR(self->result);
+    return 0;
+}
+
+static void
+_mysql_LazyRowObject_dealloc(
+    _mysql_LazyRowObject *self)
+{
+    PyObject_GC_UnTrack((PyObject *)self);
+    _mysql_LazyRowObject_clear(self);
+    PyMem_Free(self->lengths);
+    MyFree(self);
+}
+
+static const char _mysql_ResultObject_unread__doc__[] =
+"unread(n) -- Gives the last n rows returned by fetch_row() back to a\n\
+use result, so that the next fetch_row(), fetch_columns(), copy_to()\n\
+or Arrow stream reads them again. Raises ProgrammingError if other\n\
+rows were read since, or the rows are not kept anymore. Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ResultObject_unread(
+    _mysql_ResultObject *self,
+    PyObject *args)
+{
+    Py_ssize_t n;
+
+    if (!PyArg_ParseTuple(args, "n:unread", &n)) return NULL;
+    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+    if (!self->use || n < 0 || n > self->batch.pos - self->batch.start) {
+        END_RESULT_CONNECTION_LOCK(self);
+        PyErr_SetString(_mysql_ProgrammingError, "the rows can't be read again");
+        return NULL;
+    }
+    self->batch.pos -= n;
+    END_RESULT_CONNECTION_LOCK(self);
+    Py_RETURN_NONE;
+}
+
+static const char _mysql_ResultObject_discard__doc__[] =
+"discard() -- Discard remaining rows in the resultset.";
+
+static PyObject *
+_mysql_ResultObject_discard(
+    _mysql_ResultObject *self,
+    PyObject *noargs)
+{
+    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+
+    MYSQL_ROW row;
+    self->batch.nrows = self->batch.pos = self->batch.start = 0;
+    Py_BEGIN_ALLOW_THREADS
+    while (NULL != (row = mysql_fetch_row(self->result))) {
+        // do nothing
+    }
+    Py_END_ALLOW_THREADS
+    _mysql_ConnectionObject *conn = (_mysql_ConnectionObject *)self->conn;
+    if (mysql_errno(&conn->connection)) {
+        PyObject *ret = _mysql_Exception(conn);
+        END_RESULT_CONNECTION_LOCK(self);
+        return ret;
+    }
+    END_RESULT_CONNECTION_LOCK(self);
+    Py_RETURN_NONE;
+}
+
+static const char _mysql_ConnectionObject_change_user__doc__[] =
+"Changes the user and causes the database specified by db to\n\
+become the default (current) database on the connection\n\
+specified by mysql. In subsequent queries, this database is\n\
+the default for table references that do not include an\n\
+explicit database specifier.\n\
+\n\
+This function was introduced in MySQL Version 3.23.3.\n\
+\n\
+Fails unless the connected user can be authenticated or if he\n\
+doesn't have permission to use the database. In this case the\n\
+user and database are not changed.\n\
+\n\
+The db parameter may be set to None if you don't want to have\n\
+a default database.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_change_user(
+    _mysql_ConnectionObject *self,
+    PyObject *args,
+    PyObject *kwargs)
+{
+    char *user, *pwd=NULL, *db=NULL;
+    int r;
+    static char *kwlist[] = { "user", "passwd", "db", NULL } ;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s|ss:change_user",
+                     kwlist, &user, &pwd, &db))
+        return NULL;
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    Py_BEGIN_ALLOW_THREADS
+        r = mysql_change_user(&(self->connection), user, pwd, db);
+    Py_END_ALLOW_THREADS
+    if (r) {
+        PyObject *ret = _mysql_Exception(self);
+        END_CONNECTION_LOCK(self);
+        return ret;
+    }
+    END_CONNECTION_LOCK(self);
+    Py_RETURN_NONE;
+}
+
+static const char _mysql_ConnectionObject_character_set_name__doc__[] =
+"Returns the default character set for the current connection.\n\
+Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_character_set_name(
+    _mysql_ConnectionObject *self,
+    PyObject *noargs)
+{
+    const char *s;
+    PyObject *ret;
+
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    s = mysql_character_set_name(&(self->connection));
+    ret = PyUnicode_FromString(s);
+    END_CONNECTION_LOCK(self);
+    return ret;
+}
+
+static const char _mysql_ConnectionObject_set_character_set__doc__[] =
+"Sets the default character set for the current connection.\n\
+Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_set_character_set(
+    _mysql_ConnectionObject *self,
+    PyObject *args)
+{
+    const char *s;
+    int err;
+
+    if (!PyArg_ParseTuple(args, "s", &s)) return NULL;
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    Py_BEGIN_ALLOW_THREADS
+    err = mysql_set_character_set(&(self->connection), s);
+    Py_END_ALLOW_THREADS
+    if (err) {
+        PyObject *ret = _mysql_Exception(self);
+        END_CONNECTION_LOCK(self);
+        return ret;
+    }
+    END_CONNECTION_LOCK(self);
+    Py_RETURN_NONE;
+}
+
+#if MYSQL_VERSION_ID >= 50010
+static const char _mysql_ConnectionObject_get_character_set_info__doc__[] =
+"Returns a dict with information about the current character set:\n\
+\n\
+collation\n\
+    collation name\n\
+name\n\
+    character set name\n\
+comment\n\
+    comment or descriptive name\n\
+dir\n\
+    character set directory\n\
+mbminlen\n\
+    min. length for multibyte string\n\
+mbmaxlen\n\
+    max. length for multibyte string\n\
+\n\
+Not all keys may be present, particularly dir.\n\
+\n\
+Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_get_character_set_info(
+    _mysql_ConnectionObject *self,
+    PyObject *noargs)
+{
+    PyObject *result;
+    MY_CHARSET_INFO cs;
+
+
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    mysql_get_character_set_info(&(self->connection), &cs);
+    if (!(result = PyDict_New())) {
+        END_CONNECTION_LOCK(self);
+        return NULL;
+    }
+    if (cs.csname)
+        PyDict_SetItemString(result, "name", PyUnicode_FromString(cs.csname));
+    if (cs.name)
+        PyDict_SetItemString(result, "collation", PyUnicode_FromString(cs.name));
+    if (cs.comment)
+        PyDict_SetItemString(result, "comment", PyUnicode_FromString(cs.comment));
+    if (cs.dir)
+        PyDict_SetItemString(result, "dir", PyUnicode_FromString(cs.dir));
+    PyDict_SetItemString(result, "mbminlen", PyLong_FromLong(cs.mbminlen));
+    PyDict_SetItemString(result, "mbmaxlen", PyLong_FromLong(cs.mbmaxlen));
+    END_CONNECTION_LOCK(self);
+    return result;
+}
+#endif
+
+static const char _mysql_ConnectionObject_get_native_connection__doc__[] =
+"Return the internal MYSQL* wrapped in a PyCapsule object.\n\
+NOTE: this is a private API introduced ONLY for XTA integration,\n\
+      don't use it for different use cases.\n\
+      This method is supported only for XTA integration and support must\n\
+      be asked to LIXA project: http://www.tiian.org/lixa/\n\
+      Please DO NOT ask support to PyMySQL/mysqlclient-python project.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_get_native_connection(
+    _mysql_ConnectionObject *self,
+    PyObject *noargs)
+{
+    PyObject *result;
+
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    result = PyCapsule_New(&(self->connection),
+        "_mysql.connection.native_connection", NULL);
+    END_CONNECTION_LOCK(self);
+    return result;
+}
+
+
+static const char _mysql_get_client_info__doc__[] =
+"get_client_info() -- Returns a string that represents\n\
+the client library version.";
+static PyObject *
+_mysql_get_client_info(
+    PyObject *self,
+    PyObject *noargs)
+{
+    return PyUnicode_FromString(mysql_get_client_info());
+}
+
+static const char _mysql_ConnectionObject_get_host_info__doc__[] =
+"Returns a string that represents the MySQL client library\n\
+version. Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_get_host_info(
+    _mysql_ConnectionObject *self,
+    PyObject *noargs)
+{
+    PyObject *ret;
+
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    ret = PyUnicode_FromString(mysql_get_host_info(&(self->connection)));
+    END_CONNECTION_LOCK(self);
+    return ret;
+}
+
+static const char _mysql_ConnectionObject_get_proto_info__doc__[] =
+"Returns an unsigned integer representing the protocol version\n\
+used by the current connection. Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_get_proto_info(
+    _mysql_ConnectionObject *self,
+    PyObject *noargs)
+{
+    unsigned int proto;
+
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    proto = mysql_get_proto_info(&(self->connection));
+    END_CONNECTION_LOCK(self);
+    return PyLong_FromLong((long)proto);
+}
+
+static const char _mysql_ConnectionObject_get_server_info__doc__[] =
+"Returns a string that represents the server version number.\n\
+Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_get_server_info(
+    _mysql_ConnectionObject *self,
+    PyObject *noargs)
+{
+    PyObject *ret;
+
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    ret = PyUnicode_FromString(mysql_get_server_info(&(self->connection)));
+    END_CONNECTION_LOCK(self);
+    return ret;
+}
+
+static const char _mysql_ConnectionObject_info__doc__[] =
+"Retrieves a string providing information about the most\n\
+recently executed query. Non-standard. Use messages or\n\
+Cursor.messages.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_info(
+    _mysql_ConnectionObject *self,
+    PyObject *noargs)
+{
+    const char *s;
+    PyObject *ret;
+
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    s = mysql_info(&(self->connection));
+    if (s) {
+        ret = PyUnicode_FromString(s);
+        END_CONNECTION_LOCK(self);
+        return ret;
+    }
+    END_CONNECTION_LOCK(self);
+    Py_RETURN_NONE;
+}
+
+static const char _mysql_ConnectionObject_insert_id__doc__[] =
+"Returns the ID generated for an AUTO_INCREMENT column by the previous\n\
+query. Use this function after you have performed an INSERT query into a\n\
+table that contains an AUTO_INCREMENT field.\n\
+\n\
+Note that this returns 0 if the previous query does not\n\
+generate an AUTO_INCREMENT value. If you need to save the value for\n\
+later, be sure to call this immediately after the query\n\
+that generates the value.\n\
+\n\
+The ID is updated after INSERT and UPDATE statements that generate\n\
+an AUTO_INCREMENT value or that set a column value to\n\
+LAST_INSERT_ID(expr). See section 6.3.5.2 Miscellaneous Functions\n\
+in the MySQL documentation.\n\
+\n\
+Also note that the value of the SQL LAST_INSERT_ID() function always\n\
+contains the most recently generated AUTO_INCREMENT value, and is not\n\
+reset between queries because the value of that function is maintained\n\
+in the server.\n\
+" ;
+
+static PyObject *
+_mysql_ConnectionObject_insert_id(
+    _mysql_ConnectionObject *self,
+    PyObject *noargs)
+{
+    my_ulonglong r;
+
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    r = mysql_insert_id(&(self->connection));
+    END_CONNECTION_LOCK(self);
+    return PyLong_FromUnsignedLongLong(r);
+}
+
+static const char _mysql_ConnectionObject_kill__doc__[] =
+"Asks the server to kill the thread specified by pid.\n\
+Non-standard. Deprecated.";
+
+static PyObject *
+_mysql_ConnectionObject_kill(
+    _mysql_ConnectionObject *self,
+    PyObject *args)
+{
+    unsigned long pid;
+    int r;
+    char query[50];
+
+    if (!PyArg_ParseTuple(args, "k:kill", &pid)) return NULL;
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    snprintf(query, 50, "KILL %lu", pid);
+    Py_BEGIN_ALLOW_THREADS
+    r = mysql_query(&(self->connection), query);
+    Py_END_ALLOW_THREADS
+    if (r) {
+        PyObject *ret = _mysql_Exception(self);
+        END_CONNECTION_LOCK(self);
+        return ret;
+    }
+    END_CONNECTION_LOCK(self);
+    Py_RETURN_NONE;
+}
+
+static const char _mysql_ConnectionObject_field_count__doc__[] =
+"Returns the number of columns for the most recent query on the\n\
+connection. Non-standard. Will probably give you bogus results\n\
+on most cursor classes. Use Cursor.rowcount.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_field_count(
+    _mysql_ConnectionObject *self,
+    PyObject *noargs)
+{
+    unsigned int count;
+
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    count = mysql_field_count(&(self->connection));
+    END_CONNECTION_LOCK(self);
+    return PyLong_FromLong((long)count);
+}
+
+static const char _mysql_ConnectionObject_fileno__doc__[] =
+"Return file descriptor of the underlying libmysqlclient connection.\n\
+This provides raw access to the underlying network connection.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_fileno(
+    _mysql_ConnectionObject *self,
+    PyObject *noargs)
+{
+    int fd;
+
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    fd = self->connection.net.fd;
+    END_CONNECTION_LOCK(self);
+    return PyLong_FromLong(fd);
+}
+
+static const char _mysql_ResultObject_num_fields__doc__[] =
+"Returns the number of fields (column) in the result." ;
+
+static PyObject *
+_mysql_ResultObject_num_fields(
+    _mysql_ResultObject *self,
+    PyObject *noargs)
+{
+    unsigned int fields;
+
+    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+    fields = mysql_num_fields(self->result);
+    END_RESULT_CONNECTION_LOCK(self);
+    return PyLong_FromLong((long)fields);
+}
+
+static const char _mysql_ResultObject_num_rows__doc__[] =
+"Returns the number of rows in the result set. Note that if\n\
+use=1, this will not return a valid value until the entire result\n\
+set has been read.\n\
+";
+
+static PyObject *
+_mysql_ResultObject_num_rows(
+    _mysql_ResultObject *self,
+    PyObject *noargs)
+{
+    my_ulonglong rows;
+
+    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
+    rows = mysql_num_rows(self->result);
+    END_RESULT_CONNECTION_LOCK(self);
+    return PyLong_FromUnsignedLongLong(rows);
+}
+
+static const char _mysql_ConnectionObject_ping__doc__[] =
+"Checks whether or not the connection to the server is working.\n\
+\n\
+This function can be used by clients that remain idle for a\n\
+long while, to check whether or not the server has closed the\n\
+connection.\n\
+\n\
+DEPRECATED: Accepts an optional `reconnect` parameter. If True,\n\
+then the client will attempt reconnection. Note that this setting\n\
+is persistent. By default, this is on in MySQL<5.0.3, and off\n\
+thereafter.\n\
+MySQL 8.0.33 deprecated the MYSQL_OPT_RECONNECT option so reconnect\n\
+parameter is also deprecated in mysqlclient 2.2.1.\n\
+\n\
+Non-standard. You should assume that ping() performs an\n\
+implicit rollback; use only when starting a new transaction.\n\
+You have been warned.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_ping(
+    _mysql_ConnectionObject *self,
+    PyObject *args)
+{
+    int reconnect = -1;
+
+    if (!PyArg_ParseTuple(args, "|p", &reconnect)) return NULL;
+    if (reconnect != -1) {
+        if (PyErr_WarnEx(PyExc_DeprecationWarning,
+                "The reconnect parameter of ping() is deprecated.",
+                1) < 0) {
+            return NULL;
+        }
+    } else {
+        reconnect = 0;
+    }
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    if (reconnect != (self->reconnect == true)) {
+        // libmysqlclient show warning to stderr when MYSQL_OPT_RECONNECT is used.
+        // so we avoid using it as possible for now.
+        my_bool recon = (my_bool)reconnect;
+        mysql_options(&self->connection, MYSQL_OPT_RECONNECT, &recon);
+        self->reconnect = (bool)reconnect;
+    }
+    int r;
+    Py_BEGIN_ALLOW_THREADS
+    r = mysql_ping(&(self->connection));
+    Py_END_ALLOW_THREADS
+    if (r) {
+        PyObject *ret = _mysql_Exception(self);
+        END_CONNECTION_LOCK(self);
+        return ret;
+    }
+    END_CONNECTION_LOCK(self);
+    Py_RETURN_NONE;
+}
+
+/* PyArg_Parse converter ("O&") of a query: str, encoded to UTF-8 like
+ * "s#", or an object of the buffer protocol such as bytes, bytearray or
+ * memoryview. The buffer is exported rather than copied, which keeps a
+ * bytearray from being resized while the query is sent without the GIL.
+ * Release it with PyBuffer_Release(). */
+static int
+_mysql_query_converter(
+    PyObject *o,
+    Py_buffer *view)
+{
+    if (!o) {
+        PyBuffer_Release(view);
+        return 1;
+    }
+    if (PyUnicode_Check(o)) {
+        Py_ssize_t size;
+        const char *s = PyUnicode_AsUTF8AndSize(o, &size);
+        if (!s || PyBuffer_FillInfo(view, o, (void *)s, size, 1, PyBUF_SIMPLE)) {
+            return 0;
+        }
+        return Py_CLEANUP_SUPPORTED;
+    }
+    if (PyObject_GetBuffer(o, view, PyBUF_SIMPLE)) {
+        return 0;
+    }
+    return Py_CLEANUP_SUPPORTED;
+}
+
+static const char _mysql_ConnectionObject_query__doc__[] =
+"Execute a query. store_result() or use_result() will get the\n\
+result set, if any. query is str or a bytes-like object, which is\n\
+sent without being copied. Non-standard. Use cursor() to create a\n\
+cursor, then cursor.execute().\n\
+" ;
+
+static PyObject *
+_mysql_ConnectionObject_query(
+    _mysql_ConnectionObject *self,
+    PyObject *args)
+{
+    Py_buffer query;
+    PyObject *ret = NULL;
+    int r;
+
+    if (!PyArg_ParseTuple(args, "O&:query", _mysql_query_converter, &query)) return NULL;
+    if (BEGIN_CONNECTION_LOCK(self) < 0) goto error;
+    if (!self->open) {
+        END_CONNECTION_LOCK(self);
+        _mysql_Exception(self);
+        goto error;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    r = mysql_real_query(&(self->connection), query.buf, query.len);
+    Py_END_ALLOW_THREADS
+    ret = r ? _mysql_Exception(self) : Py_NewRef(Py_None);
+    END_CONNECTION_LOCK(self);
+  error:
+    PyBuffer_Release(&query);
+    return ret;
+}
+
+/* Source of LOAD DATA LOCAL INFILE for query_local_infile(). The handler
+ * is called by mysql_real_query() without the GIL. */
+typedef struct {
+    PyObject *read;   // read(size) -> bytes
+    PyObject *rows;   // iterator of sequences, encoded as TSV
+    PyObject *encode; // called for values of other types
+    const char *encoding;
+    _mysql_Buffer pending;
+    size_t pos;
+    bool eof;
+    PyObject *exc_type, *exc_value, *exc_tb;
+} _mysql_LocalInfile;
+
+static int
+_mysql_LocalInfile_append(
+    _mysql_LocalInfile *f,
+    const char *s,
+    size_t len,
+    bool escape)
+{
+    if (_mysql_Buffer_reserve(&f->pending, len * 2 + 1)) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    if (escape) {
+        _mysql_copy_tsv(&f->pending, s, len);
+    } else {
+        memcpy(f->pending.data + f->pending.size, s, len);
+        f->pending.size += len;
+    }
+    return 0;
+}
+
+static int
+_mysql_LocalInfile_append_value(
+    _mysql_LocalInfile *f,
+    PyObject *v)
+{
+    if (v == Py_None) {
+        return _mysql_LocalInfile_append(f, "\\N", 2, false);
+    }
+    if (PyBool_Check(v)) {
+        return _mysql_LocalInfile_append(f, v == Py_True ? "1" : "0", 1, false);
+    }
+    if (PyBytes_Check(v)) {
+        return _mysql_LocalInfile_append(f, PyBytes_AS_STRING(v), PyBytes_GET_SIZE(v), true);
+    }
+    if (PyByteArray_Check(v)) {
+        return _mysql_LocalInfile_append(f, PyByteArray_AS_STRING(v), PyByteArray_GET_SIZE(v), true);
+    }
+
+    PyObject *s;
+    if (PyUnicode_Check(v) || PyLong_Check(v)) {
+        s = PyObject_Str(v);
+    } else if (PyFloat_Check(v)) {
+        s = PyObject_Repr(v);
+    } else {
+        s = PyObject_CallOneArg(f->encode, v);
+    }
+    if (!s) {
+        return -1;
+    }
+    if (PyBytes_Check(s)) {
+        int r = _mysql_LocalInfile_append(f, PyBytes_AS_STRING(s), PyBytes_GET_SIZE(s), true);
+        Py_DECREF(s);
+        return r;
+    }
+    if (!PyUnicode_Check(s)) {
+        PyErr_Format(PyExc_TypeError, "encode() returned %.200s, not str or bytes",
+                     Py_TYPE(s)->tp_name);
+        Py_DECREF(s);
+        return -1;
+    }
+    int r;
+    if (f->encoding == utf8) {
+        Py_ssize_t len;
+        const char *p = PyUnicode_AsUTF8AndSize(s, &len);
+        r = p ? _mysql_LocalInfile_append(f, p, len, true) : -1;
+    } else {
+        PyObject *b = PyUnicode_AsEncodedString(s, f->encoding, "strict");
+        r = b ? _mysql_LocalInfile_append(f, PyBytes_AS_STRING(b), PyBytes_GET_SIZE(b), true) : -1;
+        Py_XDECREF(b);
+    }
+    Py_DECREF(s);
+    return r;
+}
+
+/* Appends the next chunk of read() or the next row to pending. */
+static int
+_mysql_LocalInfile_fill(
+    _mysql_LocalInfile *f,
+    unsigned int size)
+{
+    if (f->read) {
+        PyObject *chunk = PyObject_CallFunction(f->read, "I", size);
+        if (!chunk) {
+            return -1;
+        }
+        Py_buffer view;
+        if (PyObject_GetBuffer(chunk, &view, PyBUF_SIMPLE)) {
+            Py_DECREF(chunk);
+            return -1;
+        }
+        int r = 0;
+        if (view.len == 0) {
+            f->eof = true;
+        } else {
+            r = _mysql_LocalInfile_append(f, view.buf, view.len, false);
+        }
+        PyBuffer_Release(&view);
+        Py_DECREF(chunk);
+        return r;
+    }
+
+    PyObject *row = PyIter_Next(f->rows);
+    if (!row) {
+        if (PyErr_Occurred()) {
+            return -1;
+        }
+        f->eof = true;
+        return 0;
+    }
+    PyObject *seq = PySequence_Fast(row, "rows must be sequences");
+    Py_DECREF(row);
+    if (!seq) {
+        return -1;
+    }
+    Py_ssize_t n = PySequence_Fast_GET_SIZE(seq);
+    PyObject **items = PySequence_Fast_ITEMS(seq);
+    int r = 0;
+    for (Py_ssize_t i = 0; i < n && !r; i++) {
+        if (i) r = _mysql_LocalInfile_append(f, "\t", 1, false);
+        if (!r) r = _mysql_LocalInfile_append_value(f, items[i]);
+    }
+    if (!r) r = _mysql_LocalInfile_append(f, "\n", 1, false);
+    Py_DECREF(seq);
+    return r;
+}
+
+static int
+_mysql_local_infile_init(
+    void **ptr,
+    const char *filename,
+    void *userdata)
+{
+    *ptr = userdata;
+    return 0;
+}
+
+static int
+_mysql_local_infile_read(
+    void *ptr,
+    char *buf,
+    unsigned int buf_len)
+{
+    _mysql_LocalInfile *f = ptr;
+    int r = 0;
+    PyGILState_STATE gstate = PyGILState_Ensure();
+    if (f->pos) {
+        memmove(f->pending.data, f->pending.data + f->pos, f->pending.size - f->pos);
+        f->pending.size -= f->pos;
+        f->pos = 0;
+    }
+    while (f->pending.size < buf_len && !f->eof) {
+        if (_mysql_LocalInfile_fill(f, buf_len)) {
+            PyErr_Fetch(&f->exc_type, &f->exc_value, &f->exc_tb);
+            r = -1;
+            break;
+        }
+    }
+    PyGILState_Release(gstate);
+    if (r == 0) {
+        r = (int)Py_MIN(f->pending.size, buf_len);
+        memcpy(buf, f->pending.data, r);
+        f->pos = r;
+    }
+    return r;
+}
+
+static void
+_mysql_local_infile_end(
+    void *ptr)
+{
+}
+
+static int
+_mysql_local_infile_error(
+    void *ptr,
+    char *error_msg,
+    unsigned int error_msg_len)
+{
+    snprintf(error_msg, error_msg_len, "LOAD DATA LOCAL INFILE source failed");
+    return CR_UNKNOWN_ERROR;
+}
+
+static const char _mysql_ConnectionObject_query_local_infile__doc__[] =
+"query_local_infile(query, read=None, rows=None, encode=str) --\n\
+Execute a LOAD DATA LOCAL INFILE query which reads the data from\n\
+Python instead of a file. Pass one of:\n\
+\n\
+    read -- callable: read(size) returns bytes, b'' at the end\n\
+    rows -- iterable of sequences, sent in the default format of\n\
+            LOAD DATA (tab separated, \\\\N for None, escaped).\n\
+            str, bytes, int, float and bool are encoded in C,\n\
+            encode(value) must return str or bytes for other types.\n\
+\n\
+An exception of read or rows is raised after the query; the data\n\
+sent before may have been loaded. Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_query_local_infile(
+    _mysql_ConnectionObject *self,
+    PyObject *args,
+    PyObject *kwargs)
+{
+    static char *kwlist[] = {"query", "read", "rows", "encode", NULL};
+    char *query;
+    Py_ssize_t len;
+    PyObject *read = Py_None, *rows = Py_None, *encode = NULL;
+    _mysql_LocalInfile f = {0};
+    int r;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s#|OOO:query_local_infile",
+                                     kwlist, &query, &len, &read, &rows, &encode))
+        return NULL;
+    if ((read == Py_None) == (rows == Py_None)) {
+        PyErr_SetString(PyExc_TypeError, "pass one of read or rows");
+        return NULL;
+    }
+    if (read != Py_None) {
+        f.read = read;
+    } else if (!(f.rows = PyObject_GetIter(rows))) {
+        return NULL;
+    }
+    f.encode = encode ? encode : (PyObject *)&PyUnicode_Type;
+    BEGIN_CONNECTION_OPERATION(self, {
+        Py_XDECREF(f.rows);
+        return _mysql_Exception(self);
+    });
+    f.encoding = _get_encoding(&self->connection);
+
+    mysql_set_local_infile_handler(&(self->connection),
+                                   _mysql_local_infile_init,
+                                   _mysql_local_infile_read,
+                                   _mysql_local_infile_end,
+                                   _mysql_local_infile_error,
+                                   &f);
+    Py_BEGIN_ALLOW_THREADS
+    r = mysql_real_query(&(self->connection), query, len);
+    Py_END_ALLOW_THREADS
+    mysql_set_local_infile_default(&(self->connection));
+
+    PyObject *ret = NULL;
+    if (f.exc_type) {
+        PyErr_Restore(f.exc_type, f.exc_value, f.exc_tb);
+    } else if (r) {
+        _mysql_Exception(self);
+    } else {
+        ret = Py_NewRef(Py_None);
+    }
+    END_CONNECTION_LOCK(self);
+    PyMem_RawFree(f.pending.data);
+    Py_XDECREF(f.rows);
+    return ret;
+}
+
+
+/* Server-side prepared statements. Parameters are sent in the binary
+ * protocol. Integer, DOUBLE and temporal columns whose converter is the
+ * default one are received in binary too; the other columns are received
+ * as strings and decoded like the columns of text protocol results. */
+
+/* How a result column of a statement is bound. */
+enum {
+    STMT_BIND_STRING,
+    STMT_BIND_INT,
+    STMT_BIND_DOUBLE,
+    STMT_BIND_TIME,
+};
+
+typedef union {
+    long long i;
+    double d;
+    MYSQL_TIME t;
+} _mysql_StatementValue;
+
+typedef struct {
+    int bind;
+    _mysql_StatementValue value;
+    char *data;          // buffer of STMT_BIND_STRING columns
+    unsigned long size;  // size of data
+    unsigned long length;
+    my_bool is_null;
+    my_bool error;
+} _mysql_StatementColumn;
+
+typedef struct {
+    PyObject_HEAD
+    _mysql_ConnectionObject *conn;
+    MYSQL_STMT *stmt;
+    unsigned int param_count;
+    MYSQL_BIND *params;
+    _mysql_StatementValue *param_values;
+    unsigned int field_count;  // of the current result
+    unsigned int columns_allocated;
+    MYSQL_RES *metadata;       // of the current result, or NULL
+    MYSQL_BIND *results;
+    _mysql_StatementColumn *columns;
+    PyObject *plan;            // capsule of _mysql_DecodePlan
+    _mysql_ColumnDecoder *decoders;
+    const char *encoding;
+} _mysql_StatementObject;
+
+extern PyTypeObject _mysql_StatementObject_Type;
+
+static PyObject *
+_mysql_StatementException(
+    _mysql_StatementObject *self)
+{
+    if (!self->conn->open) {
+        return _mysql_Exception(self->conn);
+    }
+    return _mysql_SetError(mysql_stmt_errno(self->stmt), mysql_stmt_error(self->stmt));
+}
+
+static int
+_mysql_StatementObject_check(
+    _mysql_StatementObject *self)
+{
+    if (!self->stmt) {
+        PyErr_SetString(_mysql_ProgrammingError, "statement is closed");
+        return -1;
+    }
+    return 0;
+}
+
+static const char _mysql_ConnectionObject_prepare__doc__[] =
+"prepare(query) -- Prepares query, with ? placeholders for the\n\
+parameters, as a server-side statement. Returns a _mysql.statement.\n\
+Non-standard.\n\
+";
+
+static PyObject *
+_mysql_ConnectionObject_prepare(
+    _mysql_ConnectionObject *self,
+    PyObject *args)
+{
+    const char *query;
+    Py_ssize_t len;
+    MYSQL_STMT *stmt;
+    unsigned long param_count;
+    int err;
+    _mysql_StatementObject *s;
+
+    if (!PyArg_ParseTuple(args, "s#:prepare", &query, &len)) return NULL;
+    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    if (!(stmt = mysql_stmt_init(&(self->connection)))) {
+        PyObject *ret = _mysql_Exception(self);
+        END_CONNECTION_LOCK(self);
+        return ret;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    err = mysql_stmt_prepare(stmt, query, len);
+    Py_END_ALLOW_THREADS
+    if (err) {
+        _mysql_SetError(mysql_stmt_errno(stmt), mysql_stmt_error(stmt));
+        mysql_stmt_close(stmt);
+        END_CONNECTION_LOCK(self);
+        return NULL;
+    }
+    param_count = mysql_stmt_param_count(stmt);
+    END_CONNECTION_LOCK(self);
+
+    if (!(s = MyAlloc(_mysql_StatementObject, _mysql_StatementObject_Type))) {
+        _mysql_ConnectionObject_LockWait(self);
+        mysql_stmt_close(stmt);
+        END_CONNECTION_LOCK(self);
+        return NULL;
+    }
+    s->conn = (_mysql_ConnectionObject *)Py_NewRef(self);
+    s->stmt = stmt;
+    s->param_count = param_count;
+    s->params = PyMem_Calloc(param_count ? param_count : 1, sizeof(MYSQL_BIND));
+    s->param_values = PyMem_Calloc(param_count ? param_count : 1,
+                                   sizeof(_mysql_StatementValue));
+    if (!s->params || !s->param_values) {
+        Py_DECREF(s);
+        return PyErr_NoMemory();
+    }
+    return (PyObject *)s;
+}
+
+#define _mysql_is_temporal(o) \
+    (PyDate_Check(o) || PyTime_Check(o) || PyDelta_Check(o))
+
+/* File-like objects and iterators, whose data is streamed to the server
+ * by _mysql_StatementObject_send_long_data(). */
+#define _mysql_is_stream(o) \
+    (PyIter_Check(o) || PyObject_HasAttrString(o, "read"))
+
+/* Size of the chunks of streamed parameters. */
+#define LONG_DATA_CHUNK_SIZE (1 << 20)
+
+/* Stores the date, datetime, time or timedelta o in t and returns the
+ * field type to bind it as. */
+static enum enum_field_types
+_mysql_time_from_python(
+    PyObject *o,
+    MYSQL_TIME *t)
+{
+    memset(t, 0, sizeof(*t));
+    if (PyDateTime_Check(o)) {
+        t->year = PyDateTime_GET_YEAR(o);
+        t->month = PyDateTime_GET_MONTH(o);
+        t->day = PyDateTime_GET_DAY(o);
+        t->hour = PyDateTime_DATE_GET_HOUR(o);
+        t->minute = PyDateTime_DATE_GET_MINUTE(o);
+        t->second = PyDateTime_DATE_GET_SECOND(o);
+        t->second_part = PyDateTime_DATE_GET_MICROSECOND(o);
+        t->time_type = MYSQL_TIMESTAMP_DATETIME;
+        return MYSQL_TYPE_DATETIME;
+    }
+    if (PyDate_Check(o)) {
+        t->year = PyDateTime_GET_YEAR(o);
+        t->month = PyDateTime_GET_MONTH(o);
+        t->day = PyDateTime_GET_DAY(o);
+        t->time_type = MYSQL_TIMESTAMP_DATE;
+        return MYSQL_TYPE_DATE;
+    }
+    t->time_type = MYSQL_TIMESTAMP_TIME;
+    if (PyTime_Check(o)) {
+        t->hour = PyDateTime_TIME_GET_HOUR(o);
+        t->minute = PyDateTime_TIME_GET_MINUTE(o);
+        t->second = PyDateTime_TIME_GET_SECOND(o);
+        t->second_part = PyDateTime_TIME_GET_MICROSECOND(o);
+        return MYSQL_TYPE_TIME;
+    }
+    long long us = ((long long)PyDateTime_DELTA_GET_DAYS(o) * 86400 +
+                    PyDateTime_DELTA_GET_SECONDS(o)) * 1000000 +
+                   PyDateTime_DELTA_GET_MICROSECONDS(o);
+    if (us < 0) {
+        t->neg = 1;
+        us = -us;
+    }
+    t->second_part = us % 1000000;
+    us /= 1000000;
+    t->second = us % 60;
+    t->minute = us / 60 % 60;
+    t->hour = us / 3600;
+    return MYSQL_TYPE_TIME;
+}
+
+/* Binds parameter i to o. Objects whose buffers are sent are added to refs. */
+static int
+_mysql_StatementObject_bind_param(
+    _mysql_StatementObject *self,
+    unsigned int i,
+    PyObject *o,
+    PyObject *refs,
+    const char *encoding)
+{
+    MYSQL_BIND *b = &self->params[i];
+    _mysql_StatementValue *v = &self->param_values[i];
+    PyObject *data = NULL;
+
+    memset(b, 0, sizeof(*b));
+    if (o == Py_None) {
+        b->buffer_type = MYSQL_TYPE_NULL;
+        return 0;
+    }
+    if (PyLong_Check(o)) {
+        int overflow;
+        v->i = PyLong_AsLongLongAndOverflow(o, &overflow);
+        if (v->i == -1 && PyErr_Occurred()) return -1;
+        if (!overflow) {
+            b->buffer_type = MYSQL_TYPE_LONGLONG;
+            b->buffer = &v->i;
+            return 0;
+        }
+        if (overflow > 0) {
+            unsigned long long u = PyLong_AsUnsignedLongLong(o);
+            if (!PyErr_Occurred()) {
+                memcpy(&v->i, &u, sizeof(u));
+                b->buffer_type = MYSQL_TYPE_LONGLONG;
+                b->buffer = &v->i;
+                b->is_unsigned = 1;
+                return 0;
+            }
+            if (!PyErr_ExceptionMatches(PyExc_OverflowError)) return -1;
+            PyErr_Clear();
+        }
+        // Out of the BIGINT range: sent as a DECIMAL string.
+        if (!(data = PyObject_Str(o))) return -1;
+        b->buffer_type = MYSQL_TYPE_NEWDECIMAL;
+    }
+    else if (PyFloat_Check(o)) {
+        v->d = PyFloat_AS_DOUBLE(o);
+        if (!Py_IS_FINITE(v->d)) {
+            PyErr_Format(_mysql_ProgrammingError, "%R can not be used with MySQL", o);
+            return -1;
+        }
+        b->buffer_type = MYSQL_TYPE_DOUBLE;
+        b->buffer = &v->d;
+        return 0;
+    }
+    else if (PyBytes_Check(o)) {
+        b->buffer_type = MYSQL_TYPE_BLOB;
+        data = Py_NewRef(o);
+    }
+    else if (PyByteArray_Check(o)) {
+        b->buffer_type = MYSQL_TYPE_BLOB;
+        if (!(data = PyBytes_FromObject(o))) return -1;
+    }
+    else if (_mysql_is_temporal(o)) {
+        b->buffer_type = _mysql_time_from_python(o, &v->t);
+        b->buffer = &v->t;
+        b->buffer_length = sizeof(MYSQL_TIME);
+        return 0;
+    }
+    else if (_mysql_is_stream(o)) {
+        // No buffer: the data is sent before the statement is executed.
+        b->buffer_type = MYSQL_TYPE_LONG_BLOB;
+        return 0;
+    }
+    else {
+        // str and, like the text protocol, the str() of other objects.
+        PyObject *str = PyUnicode_Check(o) ? Py_NewRef(o) : PyObject_Str(o);
+        if (!str) return -1;
+        b->buffer_type = MYSQL_TYPE_STRING;
+        if (encoding == utf8) {
+            data = str;
+        } else {
+            data = PyUnicode_AsEncodedString(str, encoding, "strict");
+            Py_DECREF(str);
+            if (!data) return -1;
+        }
+    }
+
+    const char *buffer;
+    Py_ssize_t length;
+    if (PyUnicode_Check(data)) {
+        buffer = PyUnicode_AsUTF8AndSize(data, &length);
+    } else {
+        buffer = PyBytes_AsString(data);
+        length = PyBytes_GET_SIZE(data);
+    }
+    if (!buffer || PyList_Append(refs, data) < 0) {
+        Py_DECREF(data);
+        return -1;
+    }
+    Py_DECREF(data);
+    b->buffer = (void *)buffer;
+    b->buffer_length = length;
+    return 0;
+}
+
+/* Sends the data of parameter i, read from the file-like object o with
+ * read(size) until it returns an empty value, or taken from the iterator
+ * o, in chunks with mysql_stmt_send_long_data(). str data is encoded.
+ * Must be called with the connection locked, after the parameters are
+ * bound. */
+static int
+_mysql_StatementObject_send_long_data(
+    _mysql_StatementObject *self,
+    unsigned int i,
+    PyObject *o,
+    const char *encoding)
+{
+    PyObject *read = NULL;
+    bool sent = false;
+    int err;
+
+    // Files are iterators of lines too, so read() comes first.
+    if (!(read = PyObject_GetAttrString(o, "read"))) {
+        if (!PyIter_Check(o) || !PyErr_ExceptionMatches(PyExc_AttributeError)) return -1;
+        PyErr_Clear();
+    }
+    for (;;) {
+        PyObject *chunk = read ?
+            PyObject_CallFunction(read, "n", (Py_ssize_t)LONG_DATA_CHUNK_SIZE) :
+            PyIter_Next(o);
+        if (!chunk) {
+            if (PyErr_Occurred()) goto error;
+            break;
+        }
+        if (PyUnicode_Check(chunk)) {
+            Py_SETREF(chunk, PyUnicode_AsEncodedString(chunk, encoding, "strict"));
+            if (!chunk) goto error;
+        }
+        Py_buffer view;
+        err = PyObject_GetBuffer(chunk, &view, PyBUF_SIMPLE);
+        Py_DECREF(chunk);
+        if (err) goto error;
+        if (read && !view.len) {
+            PyBuffer_Release(&view);
+            break;
+        }
+        // Large chunks of iterators are split too.
+        for (Py_ssize_t pos = 0; !err && pos < view.len; pos += LONG_DATA_CHUNK_SIZE) {
+            unsigned long len = view.len - pos < LONG_DATA_CHUNK_SIZE ?
+                view.len - pos : LONG_DATA_CHUNK_SIZE;
+            Py_BEGIN_ALLOW_THREADS
+            err = mysql_stmt_send_long_data(self->stmt, i, (char *)view.buf + pos, len);
+            Py_END_ALLOW_THREADS
+            sent = true;
+        }
+        PyBuffer_Release(&view);
+        if (err) {
+            _mysql_StatementException(self);
+            goto error;
+        }
+    }
+    // Empty data must be sent too, else the parameter has no value.
+    if (!sent && mysql_stmt_send_long_data(self->stmt, i, "", 0)) {
+        _mysql_StatementException(self);
+        goto error;
+    }
+    Py_XDECREF(read);
+    return 0;
+  error:
+    // Discard the data sent so far.
+    mysql_stmt_reset(self->stmt);
+    Py_XDECREF(read);
+    return -1;
+}
+
+/* Binds the columns of the result of the last execution, which must be
+ * called with the connection locked. */
+static int
+_mysql_StatementObject_bind_result(
+    _mysql_StatementObject *self,
+    int decimal_format)
+{
+    unsigned int n = mysql_stmt_field_count(self->stmt);
+    MYSQL_FIELD *fields;
+
+    mysql_free_result(self->metadata);
+    self->metadata = NULL;
+    self->field_count = 0;
+    if (!n) {
+        return 0;
+    }
+    if (!(self->metadata = mysql_stmt_result_metadata(self->stmt))) {
+        _mysql_StatementException(self);
+        return -1;
+    }
+    fields = mysql_fetch_fields(self->metadata);
+    Py_XSETREF(self->plan, _mysql_get_decode_plan(self->conn, self->conn->converter,
+                                                  fields, n, decimal_format));
+    if (!self->plan) {
+        return -1;
+    }
+    self->decoders = ((_mysql_DecodePlan *)PyCapsule_GetPointer(
+            self->plan, DECODE_PLAN_CAPSULE))->columns;
+    self->encoding = _get_encoding(&(self->conn->connection));
+
+    if (n > self->columns_allocated) {
+        MYSQL_BIND *results = PyMem_Realloc(self->results, n * sizeof(MYSQL_BIND));
+        if (results) self->results = results;
+        _mysql_StatementColumn *columns = PyMem_Realloc(self->columns,
+                                                        n * sizeof(_mysql_StatementColumn));
+        if (columns) self->columns = columns;
+        if (!results || !columns) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        memset(self->columns + self->columns_allocated, 0,
+               (n - self->columns_allocated) * sizeof(_mysql_StatementColumn));
+        self->columns_allocated = n;
+    }
+    for (unsigned int i = 0; i < n; i++) {
+        _mysql_StatementColumn *col = &self->columns[i];
+        MYSQL_BIND *b = &self->results[i];
+        enum enum_field_types type = fields[i].type;
+
+        col->bind = STMT_BIND_STRING;
+        switch (self->decoders[i].kind) {
+        case DECODE_INT:
+            if (type == MYSQL_TYPE_TINY || type == MYSQL_TYPE_SHORT ||
+                    type == MYSQL_TYPE_LONG || type == MYSQL_TYPE_INT24 ||
+                    type == MYSQL_TYPE_LONGLONG || type == MYSQL_TYPE_YEAR) {
+                col->bind = STMT_BIND_INT;
+            }
+            break;
+        case DECODE_FLOAT:
+            // FLOAT columns are received as text, like the text protocol.
+            if (type == MYSQL_TYPE_DOUBLE) col->bind = STMT_BIND_DOUBLE;
+            break;
+        case DECODE_DATETIME:
+            if (type == MYSQL_TYPE_DATETIME || type == MYSQL_TYPE_TIMESTAMP) {
+                col->bind = STMT_BIND_TIME;
+            }
+            break;
+        case DECODE_DATE:
+            if (type == MYSQL_TYPE_DATE) col->bind = STMT_BIND_TIME;
+            break;
+        case DECODE_TIMEDELTA:
+            if (type == MYSQL_TYPE_TIME) col->bind = STMT_BIND_TIME;
+            break;
+        }
+
+        memset(b, 0, sizeof(*b));
+        b->length = &col->length;
+        b->is_null = &col->is_null;
+        b->error = &col->error;
+        switch (col->bind) {
+        case STMT_BIND_INT:
+            b->buffer_type = MYSQL_TYPE_LONGLONG;
+            b->buffer = &col->value.i;
+            b->is_unsigned = (fields[i].flags & UNSIGNED_FLAG) != 0;
+            break;
+        case STMT_BIND_DOUBLE:
+            b->buffer_type = MYSQL_TYPE_DOUBLE;
+            b->buffer = &col->value.d;
+            break;
+        case STMT_BIND_TIME:
+            b->buffer_type = type;
+            b->buffer = &col->value.t;
+            b->buffer_length = sizeof(MYSQL_TIME);
+            break;
+        default:
+            if (!col->data) {
+                if (!(col->data = PyMem_Malloc(256))) {
+                    PyErr_NoMemory();
+                    return -1;
+                }
+                col->size = 256;
+            }
+            b->buffer_type = MYSQL_TYPE_STRING;
+            b->buffer = col->data;
+            b->buffer_length = col->size;
+        }
+    }
+    if (mysql_stmt_bind_result(self->stmt, self->results)) {
+        _mysql_StatementException(self);
+        return -1;
+    }
+    self->field_count = n;
+    return 0;
+}
+
+static const char _mysql_StatementObject_execute__doc__[] =
+"execute(args=(), decimal_format=None) -- Executes the statement with\n\
+the sequence args as parameters, and stores its result set, if any.\n\
+None, int, float, str, bytes and datetime values are sent in binary\n\
+form, other values as their str(). The data of file-like objects\n\
+(read until read(size) returns an empty value) and iterators of bytes\n\
+or str is streamed in chunks, without being held in memory.\n\
+";
+
+static PyObject *
+_mysql_StatementObject_execute(
+    _mysql_StatementObject *self,
+    PyObject *args,
+    PyObject *kwargs)
+{
+    static char *kwlist[] = {"args", "decimal_format", NULL};
+    PyObject *params = NULL, *seq = NULL, *refs = NULL;
+    const char *decimal_format = NULL;
+    int decimal_format_num, err;
+    _mysql_ConnectionObject *conn = self->conn;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|Oz:execute", kwlist,
+                                     &params, &decimal_format))
+        return NULL;
+    if ((decimal_format_num = _get_decimal_format_num(decimal_format)) < 0) {
+        PyErr_Format(PyExc_ValueError, "Unknown decimal_format: %s", decimal_format);
+        return NULL;
+    }
+    if (_mysql_StatementObject_check(self) < 0) return NULL;
+    seq = params ? PySequence_Fast(params, "parameters must be a sequence") : PyTuple_New(0);
+    if (!seq) return NULL;
+    if (PySequence_Fast_GET_SIZE(seq) != self->param_count) {
+        PyErr_Format(_mysql_ProgrammingError,
+                     "statement has %u parameters, but %zd were given",
+                     self->param_count, PySequence_Fast_GET_SIZE(seq));
+        goto error;
+    }
+    if (!(refs = PyList_New(0))) goto error;
+    const char *encoding = conn->open ? _get_encoding(&(conn->connection)) : utf8;
+    for (unsigned int i = 0; i < self->param_count; i++) {
+        if (_mysql_StatementObject_bind_param(self, i, PySequence_Fast_GET_ITEM(seq, i),
+                                              refs, encoding) < 0) {
+            goto error;
+        }
+    }
+
+    if (BEGIN_CONNECTION_LOCK(conn) < 0) goto error;
+    if (!conn->open) {
+        END_CONNECTION_LOCK(conn);
+        _mysql_Exception(conn);
+        goto error;
+    }
+    if (self->param_count && mysql_stmt_bind_param(self->stmt, self->params)) {
+        _mysql_StatementException(self);
+        END_CONNECTION_LOCK(conn);
+        goto error;
+    }
+    for (unsigned int i = 0; i < self->param_count; i++) {
+        if (self->params[i].buffer_type == MYSQL_TYPE_LONG_BLOB &&
+                _mysql_StatementObject_send_long_data(self, i, PySequence_Fast_GET_ITEM(seq, i),
+                                                      encoding) < 0) {
+            END_CONNECTION_LOCK(conn);
+            goto error;
+        }
+    }
+    Py_BEGIN_ALLOW_THREADS
+    err = mysql_stmt_execute(self->stmt);
+    Py_END_ALLOW_THREADS
+    if (err) {
+        _mysql_StatementException(self);
+        END_CONNECTION_LOCK(conn);
+        goto error;
+    }
+    if (_mysql_StatementObject_bind_result(self, decimal_format_num) < 0) {
+        mysql_stmt_free_result(self->stmt);
+        END_CONNECTION_LOCK(conn);
+        goto error;
+    }
+    if (self->field_count) {
+        Py_BEGIN_ALLOW_THREADS
+        err = mysql_stmt_store_result(self->stmt);
+        Py_END_ALLOW_THREADS
+        if (err) {
+            _mysql_StatementException(self);
+            mysql_stmt_free_result(self->stmt);
+            END_CONNECTION_LOCK(conn);
+            goto error;
+        }
+    }
+    END_CONNECTION_LOCK(conn);
+    Py_DECREF(refs);
+    Py_DECREF(seq);
+    Py_RETURN_NONE;
+  error:
+    Py_XDECREF(refs);
+    Py_XDECREF(seq);
+    return NULL;
+}
+
+static const char _mysql_StatementObject_execute_many__doc__[] =
+"execute_many(rows) -- Executes the statement with each sequence of\n\
+rows as parameters, in one request with the array binding of MariaDB\n\
+Connector/C. The non-None parameters of a column must be of the same\n\
+kind (int, float, bytes, date, datetime, time, Decimal or str). If\n\
+they are not, or the rows can't be bound for another reason, or the\n\
+client library is not MariaDB Connector/C, NotSupportedError is raised\n\
+before anything is executed. Non-standard.\n\
+";
+
+#ifdef HAVE_STMT_ARRAY_BINDING
+/* Parameters of a column for execute_many(). */
+typedef struct {
+    void *values;
+    unsigned long *lengths;
+    char *indicators;
+} _mysql_ParamArray;
+
+/* Returns the type of the parameter o in execute_many(), or
+ * MYSQL_TYPE_LONG_BLOB if o can't be bound as an array, like streams and
+ * sequences. */
+static enum enum_field_types
+_mysql_param_array_type(
+    PyObject *o)
+{
+    if (o == Py_None) return MYSQL_TYPE_NULL;
+    if (PyLong_Check(o)) return MYSQL_TYPE_LONGLONG;
+    if (PyFloat_Check(o)) return MYSQL_TYPE_DOUBLE;
+    if (PyBytes_Check(o) || PyByteArray_Check(o)) return MYSQL_TYPE_BLOB;
+    if (PyDateTime_Check(o)) return MYSQL_TYPE_DATETIME;
+    if (PyDate_Check(o)) return MYSQL_TYPE_DATE;
+    if (PyTime_Check(o) || PyDelta_Check(o)) return MYSQL_TYPE_TIME;
+    if (PyUnicode_Check(o)) return MYSQL_TYPE_STRING;
+    if (_mysql_Decimal_Type && Py_TYPE(o) == _mysql_Decimal_Type) {
+        return MYSQL_TYPE_NEWDECIMAL;
+    }
+    return MYSQL_TYPE_LONG_BLOB;
+}
+
+static size_t
+_mysql_param_array_size(
+    enum enum_field_types type)
+{
+    switch (type) {
+    case MYSQL_TYPE_LONGLONG:
+        return sizeof(long long);
+    case MYSQL_TYPE_DOUBLE:
+        return sizeof(double);
+    case MYSQL_TYPE_DATETIME:
+    case MYSQL_TYPE_DATE:
+    case MYSQL_TYPE_TIME:
+        return sizeof(MYSQL_TIME);
+    default:
+        return sizeof(char *);
+    }
+}
+
+/* Stores o, which has the type of the column, as the row k of the column. */
+static int
+_mysql_param_array_set(
+    _mysql_ParamArray *a,
+    enum enum_field_types type,
+    Py_ssize_t k,
+    PyObject *o,
+    PyObject *refs,
+    const char *encoding)
+{
+    PyObject *data;
+    const char *buffer;
+    Py_ssize_t length;
+
+    switch (type) {
+    case MYSQL_TYPE_LONGLONG: {
+        int overflow;
+        long long v = PyLong_AsLongLongAndOverflow(o, &overflow);
+        if (v == -1 && PyErr_Occurred()) return -1;
+        if (overflow) {
+            PyErr_Format(_mysql_NotSupportedError, "%R is out of the BIGINT range", o);
+            return -1;
+        }
+        ((long long *)a->values)[k] = v;
+        return 0;
+    }
+    case MYSQL_TYPE_DOUBLE: {
+        double v = PyFloat_AS_DOUBLE(o);
+        if (!Py_IS_FINITE(v)) {
+            PyErr_Format(_mysql_NotSupportedError, "%R can not be used with MySQL", o);
+            return -1;
+        }
+        ((double *)a->values)[k] = v;
+        return 0;
+    }
+    case MYSQL_TYPE_DATETIME:
+    case MYSQL_TYPE_DATE:
+    case MYSQL_TYPE_TIME:
+        _mysql_time_from_python(o, &((MYSQL_TIME *)a->values)[k]);
+        return 0;
+    case MYSQL_TYPE_BLOB:
+        data = PyBytes_Check(o) ? Py_NewRef(o) : PyBytes_FromObject(o);
+        break;
+    case MYSQL_TYPE_NEWDECIMAL:
+        // Like Decimal2Literal().
+        data = PyObject_CallMethod(o, "__format__", "s", "f");
+        break;
+    default:
+        data = encoding == utf8 ? Py_NewRef(o) :
+            PyUnicode_AsEncodedString(o, encoding, "strict");
+    }
+    if (!data) return -1;
+    if (PyUnicode_Check(data)) {
+        buffer = PyUnicode_AsUTF8AndSize(data, &length);
+    } else {
+        buffer = PyBytes_AsString(data);
+        length = PyBytes_GET_SIZE(data);
+    }
+    if (!buffer || PyList_Append(refs, data) < 0) {
+        Py_DECREF(data);
+        return -1;
+    }
+    Py_DECREF(data);
+    ((const char **)a->values)[k] = buffer;
+    a->lengths[k] = length;
+    return 0;
+}
+#endif
 
 static PyObject *
-_mysql_ConnectionObject_info(
-    _mysql_ConnectionObject *self,
-    PyObject *noargs)
+_mysql_StatementObject_execute_many(
+    _mysql_StatementObject *self,
+    PyObject *args)
 {
-    const char *s;
-    PyObject *ret;
+    PyObject *rows;
 
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    s = mysql_info(&(self->connection));
-    if (s) {
-        ret = PyUnicode_FromString(s);
-        END_CONNECTION_LOCK(self);
-        return ret;
+    if (!PyArg_ParseTuple(args, "O:execute_many", &rows)) return NULL;
+    if (_mysql_StatementObject_check(self) < 0) return NULL;
+#ifndef HAVE_STMT_ARRAY_BINDING
+    PyErr_SetString(_mysql_NotSupportedError,
+                    "array binding needs MariaDB Connector/C");
+    return NULL;
+#else
+    _mysql_ConnectionObject *conn = self->conn;
+    PyObject *seq, *refs = NULL, *ret = NULL;
+    _mysql_ParamArray *arrays = NULL;
+    unsigned int n = self->param_count;
+    unsigned int array_size;
+    Py_ssize_t nrows;
+    int err;
+
+    if (!(seq = PySequence_Fast(rows, "rows must be a sequence"))) return NULL;
+    if (!(nrows = PySequence_Fast_GET_SIZE(seq))) {
+        Py_DECREF(seq);
+        Py_RETURN_NONE;
     }
-    END_CONNECTION_LOCK(self);
-    Py_RETURN_NONE;
+    if (!(refs = PyList_New(0))) goto error;
+    if (!(arrays = PyMem_Calloc(n ? n : 1, sizeof(_mysql_ParamArray)))) {
+        PyErr_NoMemory();
+        goto error;
+    }
+    memset(self->params, 0, (n ? n : 1) * sizeof(MYSQL_BIND));
+    for (unsigned int i = 0; i < n; i++) {
+        self->params[i].buffer_type = MYSQL_TYPE_NULL;
+    }
+    const char *encoding = conn->open ? _get_encoding(&(conn->connection)) : utf8;
+
+    for (Py_ssize_t k = 0; k < nrows; k++) {
+        PyObject *row = PySequence_Fast(PySequence_Fast_GET_ITEM(seq, k),
+                                        "rows must be sequences");
+        if (!row) goto error;
+        int r = PyList_Append(refs, row);
+        Py_DECREF(row);
+        if (r < 0) goto error;
+        if (PySequence_Fast_GET_SIZE(row) != n) {
+            PyErr_Format(_mysql_NotSupportedError,
+                         "statement has %u parameters, but %zd were given",
+                         n, PySequence_Fast_GET_SIZE(row));
+            goto error;
+        }
+        for (unsigned int i = 0; i < n; i++) {
+            PyObject *o = PySequence_Fast_GET_ITEM(row, i);
+            _mysql_ParamArray *a = &arrays[i];
+            MYSQL_BIND *b = &self->params[i];
+            enum enum_field_types type = _mysql_param_array_type(o);
+
+            if (type == MYSQL_TYPE_NULL) {
+                if (!a->indicators && !(a->indicators = PyMem_Calloc(nrows, 1))) {
+                    PyErr_NoMemory();
+                    goto error;
+                }
+                a->indicators[k] = STMT_INDICATOR_NULL;
+                continue;
+            }
+            if (type == MYSQL_TYPE_LONG_BLOB) {
+                PyErr_Format(_mysql_NotSupportedError,
+                             "parameter %u is a %.200s, which array binding can't do",
+                             i + 1, Py_TYPE(o)->tp_name);
+                goto error;
+            }
+            if (b->buffer_type == MYSQL_TYPE_NULL) {
+                b->buffer_type = type;
+                a->values = PyMem_Calloc(nrows, _mysql_param_array_size(type));
+                int has_lengths = type == MYSQL_TYPE_STRING || type == MYSQL_TYPE_BLOB ||
+                    type == MYSQL_TYPE_NEWDECIMAL;
+                if (has_lengths) {
+                    a->lengths = PyMem_Calloc(nrows, sizeof(unsigned long));
+                }
+                if (!a->values || (has_lengths && !a->lengths)) {
+                    PyErr_NoMemory();
+                    goto error;
+                }
+            }
+            else if (b->buffer_type != type) {
+                PyErr_Format(_mysql_NotSupportedError,
+                             "parameter %u has values of different types", i + 1);
+                goto error;
+            }
+            if (_mysql_param_array_set(a, type, k, o, refs, encoding) < 0) goto error;
+        }
+    }
+    for (unsigned int i = 0; i < n; i++) {
+        MYSQL_BIND *b = &self->params[i];
+        if (b->buffer_type == MYSQL_TYPE_NULL) {
+            // Only NULLs: bound as strings, all indicated as NULL.
+            b->buffer_type = MYSQL_TYPE_STRING;
+            if (!(arrays[i].values = PyMem_Calloc(nrows, sizeof(char *))) ||
+                    !(arrays[i].lengths = PyMem_Calloc(nrows, sizeof(unsigned long)))) {
+                PyErr_NoMemory();
+                goto error;
+            }
+        }
+        b->buffer = arrays[i].values;
+        b->length = arrays[i].lengths;
+        b->u.indicator = arrays[i].indicators;
+    }
+
+    if (BEGIN_CONNECTION_LOCK(conn) < 0) goto error;
+    if (!conn->open) {
+        END_CONNECTION_LOCK(conn);
+        _mysql_Exception(conn);
+        goto error;
+    }
+    array_size = nrows;
+    if (mysql_stmt_attr_set(self->stmt, STMT_ATTR_ARRAY_SIZE, &array_size) ||
+            (n && mysql_stmt_bind_param(self->stmt, self->params))) {
+        // Nothing was executed.
+        err = 1;
+        PyErr_Format(_mysql_NotSupportedError, "array binding failed: %s",
+                     mysql_stmt_error(self->stmt));
+    } else {
+        Py_BEGIN_ALLOW_THREADS
+        err = mysql_stmt_execute(self->stmt);
+        Py_END_ALLOW_THREADS
+        if (err) {
+            _mysql_StatementException(self);
+        }
+    }
+    // Later execute() calls bind single rows.
+    array_size = 0;
+    mysql_stmt_attr_set(self->stmt, STMT_ATTR_ARRAY_SIZE, &array_size);
+    mysql_free_result(self->metadata);
+    self->metadata = NULL;
+    self->field_count = 0;
+    END_CONNECTION_LOCK(conn);
+    if (!err) {
+        ret = Py_NewRef(Py_None);
+    }
+  error:
+    if (arrays) {
+        for (unsigned int i = 0; i < n; i++) {
+            PyMem_Free(arrays[i].values);
+            PyMem_Free(arrays[i].lengths);
+            PyMem_Free(arrays[i].indicators);
+        }
+        PyMem_Free(arrays);
+    }
+    Py_XDECREF(refs);
+    Py_DECREF(seq);
+    return ret;
+#endif
 }
 
-static const char _mysql_ConnectionObject_insert_id__doc__[] =
-"Returns the ID generated for an AUTO_INCREMENT column by the previous\n\
-query. Use this function after you have performed an INSERT query into a\n\
-table that contains an AUTO_INCREMENT field.\n\
-\n\
-Note that this returns 0 if the previous query does not\n\
-generate an AUTO_INCREMENT value. If you need to save the value for\n\
-later, be sure to call this immediately after the query\n\
-that generates the value.\n\
-\n\
-The ID is updated after INSERT and UPDATE statements that generate\n\
-an AUTO_INCREMENT value or that set a column value to\n\
-LAST_INSERT_ID(expr). See section 6.3.5.2 Miscellaneous Functions\n\
-in the MySQL documentation.\n\
-\n\
-Also note that the value of the SQL LAST_INSERT_ID() function always\n\
-contains the most recently generated AUTO_INCREMENT value, and is not\n\
-reset between queries because the value of that function is maintained\n\
-in the server.\n\
-" ;
+/* Fetches the next row into the column buffers, refetching the string
+ * columns which didn't fit. Returns 1 if there is a row, 0 at the end. */
+static int
+_mysql_StatementObject_fetch(
+    _mysql_StatementObject *self)
+{
+    int r = mysql_stmt_fetch(self->stmt);
+    if (r == MYSQL_NO_DATA) {
+        return 0;
+    }
+    if (r != 0 && r != MYSQL_DATA_TRUNCATED) {
+        _mysql_StatementException(self);
+        return -1;
+    }
+    bool rebind = false;
+    for (unsigned int i = 0; i < self->field_count; i++) {
+        _mysql_StatementColumn *col = &self->columns[i];
+        MYSQL_BIND *b = &self->results[i];
+        // Keep room for the terminating NUL which the decoders expect.
+        if (col->bind != STMT_BIND_STRING || col->is_null || col->length < col->size) {
+            continue;
+        }
+        char *data = PyMem_Realloc(col->data, col->length + 1);
+        if (!data) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        col->data = b->buffer = data;
+        col->size = b->buffer_length = col->length + 1;
+        if (mysql_stmt_fetch_column(self->stmt, b, i, 0)) {
+            _mysql_StatementException(self);
+            return -1;
+        }
+        col->data[col->length] = '\0';
+        rebind = true;
+    }
+    if (rebind && mysql_stmt_bind_result(self->stmt, self->results)) {
+        _mysql_StatementException(self);
+        return -1;
+    }
+    return 1;
+}
 
 static PyObject *
-_mysql_ConnectionObject_insert_id(
-    _mysql_ConnectionObject *self,
-    PyObject *noargs)
+_mysql_time_to_python(
+    MYSQL_TIME *t,
+    int kind)
 {
-    my_ulonglong r;
-
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    r = mysql_insert_id(&(self->connection));
-    END_CONNECTION_LOCK(self);
-    return PyLong_FromUnsignedLongLong(r);
+    PyObject *v;
+    if (kind == DECODE_TIMEDELTA) {
+        int sign = t->neg ? -1 : 1;
+        return PyDelta_FromDSU(0, sign * (int)(t->hour * 3600 + t->minute * 60 + t->second),
+                               sign * (int)t->second_part);
+    }
+    if (kind == DECODE_DATE) {
+        v = PyDate_FromDate(t->year, t->month, t->day);
+    } else {
+        v = PyDateTime_FromDateAndTime(t->year, t->month, t->day, t->hour,
+                                       t->minute, t->second, t->second_part);
+    }
+    // Zero and invalid dates are None, as with DateTime_or_None().
+    if (!v && PyErr_ExceptionMatches(PyExc_ValueError)) {
+        PyErr_Clear();
+        Py_RETURN_NONE;
+    }
+    return v;
 }
 
-static const char _mysql_ConnectionObject_kill__doc__[] =
-"Asks the server to kill the thread specified by pid.\n\
-Non-standard. Deprecated.";
-
 static PyObject *
-_mysql_ConnectionObject_kill(
-    _mysql_ConnectionObject *self,
-    PyObject *args)
+_mysql_StatementObject_row(
+    _mysql_StatementObject *self)
 {
-    unsigned long pid;
-    int r;
-    char query[50];
-
-    if (!PyArg_ParseTuple(args, "k:kill", &pid)) return NULL;
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    snprintf(query, 50, "KILL %lu", pid);
-    Py_BEGIN_ALLOW_THREADS
-    r = mysql_query(&(self->connection), query);
-    Py_END_ALLOW_THREADS
-    if (r) {
-        PyObject *ret = _mysql_Exception(self);
-        END_CONNECTION_LOCK(self);
-        return ret;
+    PyObject *r = PyTuple_New(self->field_count);
+    if (!r) return NULL;
+    for (unsigned int i = 0; i < self->field_count; i++) {
+        _mysql_StatementColumn *col = &self->columns[i];
+        PyObject *v;
+        if (col->is_null) {
+            v = Py_NewRef(Py_None);
+        } else {
+            switch (col->bind) {
+            case STMT_BIND_INT:
+                v = self->results[i].is_unsigned ?
+                    PyLong_FromUnsignedLongLong((unsigned long long)col->value.i) :
+                    PyLong_FromLongLong(col->value.i);
+                break;
+            case STMT_BIND_DOUBLE:
+                v = PyFloat_FromDouble(col->value.d);
+                break;
+            case STMT_BIND_TIME:
+                v = _mysql_time_to_python(&col->value.t, self->decoders[i].kind);
+                break;
+            default:
+                v = _mysql_decode_column(&self->decoders[i], col->data, col->length,
+                                         self->encoding);
+            }
+        }
+        if (!v) {
+            Py_DECREF(r);
+            return NULL;
+        }
+        PyTuple_SET_ITEM(r, i, v);
     }
-    END_CONNECTION_LOCK(self);
-    Py_RETURN_NONE;
+    return r;
 }
 
-static const char _mysql_ConnectionObject_field_count__doc__[] =
-"Returns the number of columns for the most recent query on the\n\
-connection. Non-standard. Will probably give you bogus results\n\
-on most cursor classes. Use Cursor.rowcount.\n\
+static const char _mysql_StatementObject_fetch_row__doc__[] =
+"fetch_row([maxrows]) -- Fetches up to maxrows rows (default 1, 0 for\n\
+all) of the stored result set as a tuple of tuples.\n\
 ";
 
 static PyObject *
-_mysql_ConnectionObject_field_count(
-    _mysql_ConnectionObject *self,
-    PyObject *noargs)
+_mysql_StatementObject_fetch_row(
+    _mysql_StatementObject *self,
+    PyObject *args,
+    PyObject *kwargs)
 {
-    unsigned int count;
+    static char *kwlist[] = {"maxrows", NULL};
+    Py_ssize_t maxrows = 1;
+    PyObject *rows;
 
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    count = mysql_field_count(&(self->connection));
-    END_CONNECTION_LOCK(self);
-    return PyLong_FromLong((long)count);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|n:fetch_row", kwlist, &maxrows))
+        return NULL;
+    if (_mysql_StatementObject_check(self) < 0) return NULL;
+    if (!(rows = PyList_New(0))) return NULL;
+    while (self->field_count && (!maxrows || PyList_GET_SIZE(rows) < maxrows)) {
+        if (BEGIN_CONNECTION_LOCK(self->conn) < 0) goto error;
+        int r = self->conn->open ?
+            _mysql_StatementObject_fetch(self) : (_mysql_Exception(self->conn), -1);
+        END_CONNECTION_LOCK(self->conn);
+        if (r <= 0) {
+            if (r < 0) goto error;
+            break;
+        }
+        // Columns are decoded without the lock, since converters are called.
+        PyObject *row = _mysql_StatementObject_row(self);
+        if (!row) goto error;
+        int err = PyList_Append(rows, row);
+        Py_DECREF(row);
+        if (err < 0) goto error;
+    }
+    Py_SETREF(rows, PyList_AsTuple(rows));
+    return rows;
+  error:
+    Py_DECREF(rows);
+    return NULL;
 }
 
-static const char _mysql_ConnectionObject_fileno__doc__[] =
-"Return file descriptor of the underlying libmysqlclient connection.\n\
-This provides raw access to the underlying network connection.\n\
+static const char _mysql_StatementObject_describe__doc__[] =
+"Returns the DB-API description of the result set of the last\n\
+execution, or None if it has no result set.\n\
 ";
 
 static PyObject *
-_mysql_ConnectionObject_fileno(
-    _mysql_ConnectionObject *self,
+_mysql_StatementObject_describe(
+    _mysql_StatementObject *self,
     PyObject *noargs)
 {
-    int fd;
-
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    fd = self->connection.net.fd;
-    END_CONNECTION_LOCK(self);
-    return PyLong_FromLong(fd);
+    if (_mysql_StatementObject_check(self) < 0) return NULL;
+    if (!self->field_count) {
+        Py_RETURN_NONE;
+    }
+    return _mysql_describe_fields(mysql_fetch_fields(self->metadata), self->field_count,
+                                  self->encoding);
 }
 
-static const char _mysql_ResultObject_num_fields__doc__[] =
-"Returns the number of fields (column) in the result." ;
+static const char _mysql_StatementObject_field_flags__doc__[] =
+"Returns a tuple of field flags, one for each column in the result.\n\
+";
 
 static PyObject *
-_mysql_ResultObject_num_fields(
-    _mysql_ResultObject *self,
+_mysql_StatementObject_field_flags(
+    _mysql_StatementObject *self,
     PyObject *noargs)
 {
-    unsigned int fields;
-
-    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
-    fields = mysql_num_fields(self->result);
-    END_RESULT_CONNECTION_LOCK(self);
-    return PyLong_FromLong((long)fields);
+    if (_mysql_StatementObject_check(self) < 0) return NULL;
+    if (!self->field_count) {
+        Py_RETURN_NONE;
+    }
+    return _mysql_field_flags(mysql_fetch_fields(self->metadata), self->field_count);
 }
 
-static const char _mysql_ResultObject_num_rows__doc__[] =
-"Returns the number of rows in the result set. Note that if\n\
-use=1, this will not return a valid value until the entire result\n\
-set has been read.\n\
+static const char _mysql_StatementObject_affected_rows__doc__[] =
+"Returns the number of rows changed, deleted or inserted by the last\n\
+execution, or the number of rows of its result set.\n\
 ";
 
 static PyObject *
-_mysql_ResultObject_num_rows(
-    _mysql_ResultObject *self,
+_mysql_StatementObject_affected_rows(
+    _mysql_StatementObject *self,
     PyObject *noargs)
 {
-    my_ulonglong rows;
-
-    BEGIN_RESULT_OPERATION(self, return _mysql_Exception(result_connection(self)));
-    rows = mysql_num_rows(self->result);
-    END_RESULT_CONNECTION_LOCK(self);
-    return PyLong_FromUnsignedLongLong(rows);
+    if (_mysql_StatementObject_check(self) < 0) return NULL;
+    my_ulonglong ret = mysql_stmt_affected_rows(self->stmt);
+    if (ret == (my_ulonglong)-1)
+        return PyLong_FromLong(-1);
+    return PyLong_FromUnsignedLongLong(ret);
 }
 
-static const char _mysql_ConnectionObject_ping__doc__[] =
-"Checks whether or not the connection to the server is working.\n\
-\n\
-This function can be used by clients that remain idle for a\n\
-long while, to check whether or not the server has closed the\n\
-connection.\n\
-\n\
-DEPRECATED: Accepts an optional `reconnect` parameter. If True,\n\
-then the client will attempt reconnection. Note that this setting\n\
-is persistent. By default, this is on in MySQL<5.0.3, and off\n\
-thereafter.\n\
-MySQL 8.0.33 deprecated the MYSQL_OPT_RECONNECT option so reconnect\n\
-parameter is also deprecated in mysqlclient 2.2.1.\n\
-\n\
-Non-standard. You should assume that ping() performs an\n\
-implicit rollback; use only when starting a new transaction.\n\
-You have been warned.\n\
+static const char _mysql_StatementObject_insert_id__doc__[] =
+"Returns the AUTO_INCREMENT ID generated by the last execution.\n\
 ";
 
-static PyObject *
-_mysql_ConnectionObject_ping(
-    _mysql_ConnectionObject *self,
-    PyObject *args)
-{
-    int reconnect = -1;
-
-    if (!PyArg_ParseTuple(args, "|p", &reconnect)) return NULL;
-    if (reconnect != -1) {
-        if (PyErr_WarnEx(PyExc_DeprecationWarning,
-                "The reconnect parameter of ping() is deprecated.",
-                1) < 0) {
-            return NULL;
-        }
-    } else {
-        reconnect = 0;
-    }
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
-    if (reconnect != (self->reconnect == true)) {
-        // libmysqlclient show warning to stderr when MYSQL_OPT_RECONNECT is used.
-        // so we avoid using it as possible for now.
-        my_bool recon = (my_bool)reconnect;
-        mysql_options(&self->connection, MYSQL_OPT_RECONNECT, &recon);
-        self->reconnect = (bool)reconnect;
-    }
-    int r;
-    Py_BEGIN_ALLOW_THREADS
-    r = mysql_ping(&(self->connection));
-    Py_END_ALLOW_THREADS
-    if (r) {
-        PyObject *ret = _mysql_Exception(self);
-        END_CONNECTION_LOCK(self);
-        return ret;
-    }
-    END_CONNECTION_LOCK(self);
-    Py_RETURN_NONE;
+static PyObject *
+_mysql_StatementObject_insert_id(
+    _mysql_StatementObject *self,
+    PyObject *noargs)
+{
+    if (_mysql_StatementObject_check(self) < 0) return NULL;
+    return PyLong_FromUnsignedLongLong(mysql_stmt_insert_id(self->stmt));
 }
 
-static const char _mysql_ConnectionObject_query__doc__[] =
-"Execute a query. store_result() or use_result() will get the\n\
-result set, if any. Non-standard. Use cursor() to create a cursor,\n\
-then cursor.execute().\n\
-" ;
+static const char _mysql_StatementObject_free_result__doc__[] =
+"Frees the stored result set of the last execution.\n\
+";
 
 static PyObject *
-_mysql_ConnectionObject_query(
-    _mysql_ConnectionObject *self,
-    PyObject *args)
+_mysql_StatementObject_free_result(
+    _mysql_StatementObject *self,
+    PyObject *noargs)
 {
-    char *query;
-    Py_ssize_t len;
-    int r;
+    if (_mysql_StatementObject_check(self) < 0) return NULL;
+    BEGIN_CONNECTION_OPERATION(self->conn, return _mysql_Exception(self->conn));
+    mysql_stmt_free_result(self->stmt);
+    END_CONNECTION_LOCK(self->conn);
+    self->field_count = 0;
+    Py_RETURN_NONE;
+}
 
-    if (!PyArg_ParseTuple(args, "s#:query", &query, &len)) return NULL;
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+/* Closes the statement handle, waiting for the connection lock. */
+static void
+_mysql_StatementObject_close_stmt(
+    _mysql_StatementObject *self)
+{
+    if (self->stmt) {
+        _mysql_ConnectionObject_LockWait(self->conn);
+        mysql_stmt_close(self->stmt);
+        END_CONNECTION_LOCK(self->conn);
+        self->stmt = NULL;
+    }
+    mysql_free_result(self->metadata);
+    self->metadata = NULL;
+    self->field_count = 0;
+}
 
-    Py_BEGIN_ALLOW_THREADS
-    r = mysql_real_query(&(self->connection), query, len);
-    Py_END_ALLOW_THREADS
-    if (r) {
-        PyObject *ret = _mysql_Exception(self);
-        END_CONNECTION_LOCK(self);
-        return ret;
+static const char _mysql_StatementObject_close__doc__[] =
+"Closes the statement on the server.\n\
+";
+
+static PyObject *
+_mysql_StatementObject_close(
+    _mysql_StatementObject *self,
+    PyObject *noargs)
+{
+    if (self->stmt) {
+        if (BEGIN_CONNECTION_LOCK(self->conn) < 0) return NULL;
+        mysql_stmt_close(self->stmt);
+        END_CONNECTION_LOCK(self->conn);
+        self->stmt = NULL;
     }
-    END_CONNECTION_LOCK(self);
+    _mysql_StatementObject_close_stmt(self);
     Py_RETURN_NONE;
 }
 
+static int
+_mysql_StatementObject_traverse(
+    _mysql_StatementObject *self,
+    visitproc visit,
+    void *arg)
+{
+    Py_VISIT(self->conn);
+    return 0;
+}
+
+static int
+_mysql_StatementObject_clear(
+    _mysql_StatementObject *self)
+{
+    if (self->conn) {
+        _mysql_StatementObject_close_stmt(self);
+    }
+    Py_CLEAR(self->plan);
+    Py_CLEAR(self->conn);
+    return 0;
+}
+
+static void
+_mysql_StatementObject_dealloc(
+    _mysql_StatementObject *self)
+{
+    PyObject_GC_UnTrack((PyObject *)self);
+    _mysql_StatementObject_clear(self);
+    for (unsigned int i = 0; i < self->columns_allocated; i++) {
+        PyMem_Free(self->columns[i].data);
+    }
+    PyMem_Free(self->columns);
+    PyMem_Free(self->results);
+    PyMem_Free(self->params);
+    PyMem_Free(self->param_values);
+    MyFree(self);
+}
 
 static const char _mysql_ConnectionObject_send_query__doc__[] =
 "Send a query. Same to query() except not wait response.\n\n\
@@ -2242,24 +7521,27 @@ _mysql_ConnectionObject_send_query(
     _mysql_ConnectionObject *self,
     PyObject *args)
 {
-    char *query;
-    Py_ssize_t len;
+    Py_buffer query;
+    PyObject *ret = NULL;
     int r;
     MYSQL *mysql = &(self->connection);
 
-    if (!PyArg_ParseTuple(args, "s#:query", &query, &len)) return NULL;
-    BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
+    if (!PyArg_ParseTuple(args, "O&:query", _mysql_query_converter, &query)) return NULL;
+    if (BEGIN_CONNECTION_LOCK(self) < 0) goto error;
+    if (!self->open) {
+        END_CONNECTION_LOCK(self);
+        _mysql_Exception(self);
+        goto error;
+    }
 
     Py_BEGIN_ALLOW_THREADS
-    r = mysql_send_query(mysql, query, len);
+    r = mysql_send_query(mysql, query.buf, query.len);
     Py_END_ALLOW_THREADS
-    if (r) {
-        PyObject *ret = _mysql_Exception(self);
-        END_CONNECTION_LOCK(self);
-        return ret;
-    }
+    ret = r ? _mysql_Exception(self) : Py_NewRef(Py_None);
     END_CONNECTION_LOCK(self);
-    Py_RETURN_NONE;
+  error:
+    PyBuffer_Release(&query);
+    return ret;
 }
 
 
@@ -2380,22 +7662,31 @@ static const char _mysql_ConnectionObject_store_result__doc__[] =
 "Returns a result object acquired by mysql_store_result\n\
 (results stored in the client). If no results are available,\n\
 None is returned. Non-standard.\n\
+\n\
+decimal_format -- representation of DECIMAL columns: 'decimal'\n\
+    (the converter, decimal.Decimal by default), 'float', 'int'\n\
+    (scaled by 10**decimals of the column) or 'str'.\n\
 ";
 
 static PyObject *
 _mysql_ConnectionObject_store_result(
     _mysql_ConnectionObject *self,
-    PyObject *noargs)
+    PyObject *args,
+    PyObject *kwargs)
 {
+    static char *kwlist[] = {"decimal_format", NULL};
     PyObject *arglist=NULL, *kwarglist=NULL, *result=NULL;
     _mysql_ResultObject *r=NULL;
+    const char *decimal_format=NULL;
 
-
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|z:store_result", kwlist,
+                                     &decimal_format))
+        return NULL;
     BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
     arglist = Py_BuildValue("(OiO)", self, 0, self->converter);
     END_CONNECTION_LOCK(self);
     if (!arglist) goto error;
-    kwarglist = PyDict_New();
+    kwarglist = Py_BuildValue("{s:z}", "decimal_format", decimal_format);
     if (!kwarglist) goto error;
     r = MyAlloc(_mysql_ResultObject, _mysql_ResultObject_Type);
     if (!r) goto error;
@@ -2443,22 +7734,31 @@ static const char _mysql_ConnectionObject_use_result__doc__[] =
 "Returns a result object acquired by mysql_use_result\n\
 (results stored in the server). If no results are available,\n\
 None is returned. Non-standard.\n\
+\n\
+decimal_format -- representation of DECIMAL columns: 'decimal'\n\
+    (the converter, decimal.Decimal by default), 'float', 'int'\n\
+    (scaled by 10**decimals of the column) or 'str'.\n\
 ";
 
 static PyObject *
 _mysql_ConnectionObject_use_result(
     _mysql_ConnectionObject *self,
-    PyObject *noargs)
+    PyObject *args,
+    PyObject *kwargs)
 {
+    static char *kwlist[] = {"decimal_format", NULL};
     PyObject *arglist=NULL, *kwarglist=NULL, *result=NULL;
     _mysql_ResultObject *r=NULL;
+    const char *decimal_format=NULL;
 
-
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|z:use_result", kwlist,
+                                     &decimal_format))
+        return NULL;
     BEGIN_CONNECTION_OPERATION(self, return _mysql_Exception(self));
     arglist = Py_BuildValue("(OiO)", self, 1, self->converter);
     END_CONNECTION_LOCK(self);
     if (!arglist) return NULL;
-    kwarglist = PyDict_New();
+    kwarglist = Py_BuildValue("{s:z}", "decimal_format", decimal_format);
     if (!kwarglist) goto error;
     r = MyAlloc(_mysql_ResultObject, _mysql_ResultObject_Type);
     if (!r) goto error;
@@ -2525,6 +7825,7 @@ _mysql_ConnectionObject_dealloc(
         self->open = false;
     }
     Py_CLEAR(self->converter);
+    Py_CLEAR(self->plan_cache);
     if (self->lock != NULL) {
         PyThread_free_lock(self->lock);
         self->lock = NULL;
@@ -2574,6 +7875,9 @@ _mysql_ResultObject_dealloc(
     if (conn != NULL) {
         END_RESULT_CONNECTION_LOCK(self);
     }
+    PyMem_RawFree(self->batch.values);
+    PyMem_RawFree(self->batch.lengths);
+    PyMem_RawFree(self->batch.data);
     _mysql_ResultObject_clear(self);
     MyFree(self);
 }
@@ -2770,6 +8074,42 @@ static PyMethodDef _mysql_ConnectionObject_methods[] = {
         METH_VARARGS,
         _mysql_ConnectionObject_query__doc__
     },
+    {
+        "query_local_infile",
+        (PyCFunction)_mysql_ConnectionObject_query_local_infile,
+        METH_VARARGS | METH_KEYWORDS,
+        _mysql_ConnectionObject_query_local_infile__doc__
+    },
+    {
+        "literal",
+        (PyCFunction)_mysql_ConnectionObject_literal,
+        METH_O,
+        _mysql_ConnectionObject_literal__doc__
+    },
+    {
+        "literal_many",
+        (PyCFunction)_mysql_ConnectionObject_literal_many,
+        METH_O,
+        _mysql_ConnectionObject_literal_many__doc__
+    },
+    {
+        "bind_query",
+        (PyCFunction)_mysql_ConnectionObject_bind_query,
+        METH_VARARGS,
+        _mysql_ConnectionObject_bind_query__doc__
+    },
+    {
+        "bulk_values",
+        (PyCFunction)_mysql_ConnectionObject_bulk_values,
+        METH_VARARGS | METH_KEYWORDS,
+        _mysql_ConnectionObject_bulk_values__doc__
+    },
+    {
+        "prepare",
+        (PyCFunction)_mysql_ConnectionObject_prepare,
+        METH_VARARGS,
+        _mysql_ConnectionObject_prepare__doc__
+    },
     {
         "send_query",
         (PyCFunction)_mysql_ConnectionObject_send_query,
@@ -2803,7 +8143,7 @@ static PyMethodDef _mysql_ConnectionObject_methods[] = {
     {
         "store_result",
         (PyCFunction)_mysql_ConnectionObject_store_result,
-        METH_NOARGS,
+        METH_VARARGS | METH_KEYWORDS,
         _mysql_ConnectionObject_store_result__doc__
     },
     {
@@ -2820,7 +8160,7 @@ static PyMethodDef _mysql_ConnectionObject_methods[] = {
     {
         "use_result",
         (PyCFunction)_mysql_ConnectionObject_use_result,
-        METH_NOARGS,
+        METH_VARARGS | METH_KEYWORDS,
         _mysql_ConnectionObject_use_result__doc__
     },
     {
@@ -2840,13 +8180,6 @@ static struct PyMemberDef _mysql_ConnectionObject_memberlist[] = {
         READONLY,
         "True if connection is open"
     },
-    {
-        "converter",
-        T_OBJECT,
-        offsetof(_mysql_ConnectionObject,converter),
-        0,
-        "Type conversion mapping"
-    },
     {
         "server_capabilities",
         T_ULONG,
@@ -2871,6 +8204,52 @@ static struct PyMemberDef _mysql_ConnectionObject_memberlist[] = {
     {NULL} /* Sentinel */
 };
 
+static PyObject *
+_mysql_ConnectionObject_get_converter(
+    _mysql_ConnectionObject *self,
+    void *closure)
+{
+    if (!self->converter) {
+        Py_RETURN_NONE;
+    }
+    Py_INCREF(self->converter);
+    return self->converter;
+}
+
+static int
+_mysql_ConnectionObject_set_converter(
+    _mysql_ConnectionObject *self,
+    PyObject *value,
+    void *closure)
+{
+    if (value == NULL) {
+        PyErr_SetString(PyExc_AttributeError,
+                "can't delete connection attributes");
+        return -1;
+    }
+    Py_INCREF(value);
+    Py_XSETREF(self->converter, value);
+    // Decode plans are compiled from the old mapping.
+    if (self->plan_cache) {
+        PyDict_Clear(self->plan_cache);
+    }
+    return 0;
+}
+
+static PyGetSetDef _mysql_ConnectionObject_getset[] = {
+    {
+        "converter",
+        (getter)_mysql_ConnectionObject_get_converter,
+        (setter)_mysql_ConnectionObject_set_converter,
+        "Type conversion mapping.\n\n"
+        "Decode plans compiled from the mapping are cached per column\n"
+        "signature. Assign a new mapping instead of modifying it in place\n"
+        "after queries were run.",
+        NULL
+    },
+    {NULL} /* Sentinel */
+};
+
 static PyMethodDef _mysql_ResultObject_methods[] = {
     {
         "data_seek",
@@ -2890,6 +8269,36 @@ static PyMethodDef _mysql_ResultObject_methods[] = {
         METH_VARARGS | METH_KEYWORDS,
         _mysql_ResultObject_fetch_row__doc__
     },
+    {
+        "fetch_columns",
+        (PyCFunction)_mysql_ResultObject_fetch_columns,
+        METH_VARARGS | METH_KEYWORDS,
+        _mysql_ResultObject_fetch_columns__doc__
+    },
+    {
+        "copy_to",
+        (PyCFunction)_mysql_ResultObject_copy_to,
+        METH_VARARGS | METH_KEYWORDS,
+        _mysql_ResultObject_copy_to__doc__
+    },
+    {
+        "__arrow_c_stream__",
+        (PyCFunction)_mysql_ResultObject___arrow_c_stream__,
+        METH_VARARGS | METH_KEYWORDS,
+        _mysql_ResultObject___arrow_c_stream____doc__
+    },
+    {
+        "rows",
+        (PyCFunction)_mysql_ResultObject_rows,
+        METH_VARARGS | METH_KEYWORDS,
+        _mysql_ResultObject_rows__doc__
+    },
+    {
+        "unread",
+        (PyCFunction)_mysql_ResultObject_unread,
+        METH_VARARGS,
+        _mysql_ResultObject_unread__doc__
+    },
     {
         "discard",
         (PyCFunction)_mysql_ResultObject_discard,
@@ -3028,7 +8437,7 @@ PyTypeObject _mysql_ConnectionObject_Type = {
     /* Attribute descriptor and subclassing stuff */
     (struct PyMethodDef *)_mysql_ConnectionObject_methods, /* tp_methods */
     (struct PyMemberDef *)_mysql_ConnectionObject_memberlist, /* tp_members */
-    0, /* (struct getsetlist *) tp_getset; */
+    _mysql_ConnectionObject_getset, /* (struct getsetlist *) tp_getset; */
     0, /* (struct _typeobject *) tp_base; */
     0, /* (PyObject *) tp_dict */
     0, /* (descrgetfunc) tp_descr_get */
@@ -3111,6 +8520,205 @@ PyTypeObject _mysql_ResultObject_Type = {
     0, /* (PyObject *) tp_defined */
 };
 
+static struct PyMemberDef _mysql_RowsObject_memberlist[] = {
+    {
+        "result",
+        T_OBJECT,
+        offsetof(_mysql_RowsObject, result),
+        READONLY,
+        "Result object the rows are read from"
+    },
+    {
+        "how",
+        T_INT,
+        offsetof(_mysql_RowsObject, how),
+        READONLY,
+        "Row format, see fetch_row()"
+    },
+    {NULL} /* Sentinel */
+};
+
+static PySequenceMethods _mysql_RowsObject_as_sequence = {
+    .sq_length = (lenfunc)_mysql_RowsObject_length,
+    .sq_item = (ssizeargfunc)_mysql_RowsObject_item,
+};
+
+static PyMappingMethods _mysql_RowsObject_as_mapping = {
+    .mp_length = (lenfunc)_mysql_RowsObject_length,
+    .mp_subscript = (binaryfunc)_mysql_RowsObject_subscript,
+};
+
+static const char _mysql_RowsObject__doc__[] =
+"Rows of a stored result, see result.rows().";
+
+PyTypeObject _mysql_RowsObject_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "_mysql.rows",
+    .tp_basicsize = sizeof(_mysql_RowsObject),
+    .tp_dealloc = (destructor)_mysql_RowsObject_dealloc,
+    .tp_repr = (reprfunc)_mysql_RowsObject_repr,
+    .tp_as_sequence = &_mysql_RowsObject_as_sequence,
+    .tp_as_mapping = &_mysql_RowsObject_as_mapping,
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_doc = _mysql_RowsObject__doc__,
+    .tp_traverse = (traverseproc)_mysql_RowsObject_traverse,
+    .tp_clear = (inquiry)_mysql_RowsObject_clear,
+    .tp_members = _mysql_RowsObject_memberlist,
+};
+
+static PySequenceMethods _mysql_LazyRowObject_as_sequence = {
+    .sq_length = (lenfunc)_mysql_LazyRowObject_length,
+    .sq_item = (ssizeargfunc)_mysql_LazyRowObject_item,
+};
+
+static PyMappingMethods _mysql_LazyRowObject_as_mapping = {
+    .mp_length = (lenfunc)_mysql_LazyRowObject_length,
+    .mp_subscript = (binaryfunc)_mysql_LazyRowObject_subscript,
+};
+
+static const char _mysql_LazyRowObject__doc__[] =
+"Row of a stored result, see fetch_row(how=3).\n\
+\n\
+Columns are converted when they are accessed by index or by\n\
+name and the values are cached. Rows compare equal to tuples.";
+
+PyTypeObject _mysql_LazyRowObject_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "_mysql.lazy_row",
+    .tp_basicsize = offsetof(_mysql_LazyRowObject, values),
+    .tp_itemsize = sizeof(PyObject *),
+    .tp_dealloc = (destructor)_mysql_LazyRowObject_dealloc,
+    .tp_repr = (reprfunc)_mysql_LazyRowObject_repr,
+    .tp_as_sequence = &_mysql_LazyRowObject_as_sequence,
+    .tp_as_mapping = &_mysql_LazyRowObject_as_mapping,
+    .tp_hash = (hashfunc)_mysql_LazyRowObject_hash,
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_doc = _mysql_LazyRowObject__doc__,
+    .tp_traverse = (traverseproc)_mysql_LazyRowObject_traverse,
+    .tp_clear = (inquiry)_mysql_LazyRowObject_clear,
+    .tp_richcompare = (richcmpfunc)_mysql_LazyRowObject_richcompare,
+};
+
+static struct PyMemberDef _mysql_BulkValuesObject_memberlist[] = {
+    {
+        "max_stmt_length",
+        T_PYSSIZET,
+        offsetof(_mysql_BulkValuesObject, max_stmt_length),
+        0,
+        "Maximum length of the next statements; may be changed while iterating"
+    },
+    {NULL} /* Sentinel */
+};
+
+static const char _mysql_BulkValuesObject__doc__[] =
+"Iterator of INSERT statements, see connection.bulk_values().";
+
+PyTypeObject _mysql_BulkValuesObject_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "_mysql.bulk_values",
+    .tp_basicsize = sizeof(_mysql_BulkValuesObject),
+    .tp_dealloc = (destructor)_mysql_BulkValuesObject_dealloc,
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_doc = _mysql_BulkValuesObject__doc__,
+    .tp_traverse = (traverseproc)_mysql_BulkValuesObject_traverse,
+    .tp_clear = (inquiry)_mysql_BulkValuesObject_clear,
+    .tp_iter = PyObject_SelfIter,
+    .tp_iternext = (iternextfunc)_mysql_BulkValuesObject_iternext,
+    .tp_members = _mysql_BulkValuesObject_memberlist,
+};
+
+static PyMethodDef _mysql_StatementObject_methods[] = {
+    {
+        "execute",
+        (PyCFunction)_mysql_StatementObject_execute,
+        METH_VARARGS | METH_KEYWORDS,
+        _mysql_StatementObject_execute__doc__
+    },
+    {
+        "execute_many",
+        (PyCFunction)_mysql_StatementObject_execute_many,
+        METH_VARARGS,
+        _mysql_StatementObject_execute_many__doc__
+    },
+    {
+        "fetch_row",
+        (PyCFunction)_mysql_StatementObject_fetch_row,
+        METH_VARARGS | METH_KEYWORDS,
+        _mysql_StatementObject_fetch_row__doc__
+    },
+    {
+        "describe",
+        (PyCFunction)_mysql_StatementObject_describe,
+        METH_NOARGS,
+        _mysql_StatementObject_describe__doc__
+    },
+    {
+        "field_flags",
+        (PyCFunction)_mysql_StatementObject_field_flags,
+        METH_NOARGS,
+        _mysql_StatementObject_field_flags__doc__
+    },
+    {
+        "affected_rows",
+        (PyCFunction)_mysql_StatementObject_affected_rows,
+        METH_NOARGS,
+        _mysql_StatementObject_affected_rows__doc__
+    },
+    {
+        "insert_id",
+        (PyCFunction)_mysql_StatementObject_insert_id,
+        METH_NOARGS,
+        _mysql_StatementObject_insert_id__doc__
+    },
+    {
+        "free_result",
+        (PyCFunction)_mysql_StatementObject_free_result,
+        METH_NOARGS,
+        _mysql_StatementObject_free_result__doc__
+    },
+    {
+        "close",
+        (PyCFunction)_mysql_StatementObject_close,
+        METH_NOARGS,
+        _mysql_StatementObject_close__doc__
+    },
+    {NULL, NULL} /* sentinel */
+};
+
+static struct PyMemberDef _mysql_StatementObject_memberlist[] = {
+    {
+        "param_count",
+        T_UINT,
+        offsetof(_mysql_StatementObject, param_count),
+        READONLY,
+        "Number of parameters of the statement"
+    },
+    {
+        "field_count",
+        T_UINT,
+        offsetof(_mysql_StatementObject, field_count),
+        READONLY,
+        "Number of columns of the result set of the last execution"
+    },
+    {NULL} /* Sentinel */
+};
+
+static const char _mysql_StatementObject__doc__[] =
+"Server-side prepared statement, see connection.prepare().";
+
+PyTypeObject _mysql_StatementObject_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "_mysql.statement",
+    .tp_basicsize = sizeof(_mysql_StatementObject),
+    .tp_dealloc = (destructor)_mysql_StatementObject_dealloc,
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_doc = _mysql_StatementObject__doc__,
+    .tp_traverse = (traverseproc)_mysql_StatementObject_traverse,
+    .tp_clear = (inquiry)_mysql_StatementObject_clear,
+    .tp_methods = _mysql_StatementObject_methods,
+    .tp_members = _mysql_StatementObject_memberlist,
+};
+
 static PyMethodDef
 _mysql_methods[] = {
     {
@@ -3203,10 +8811,31 @@ PyInit__mysql(void)
         return NULL;
     }
 
+    PyDateTime_IMPORT;
+    if (!PyDateTimeAPI)
+        return NULL;
+    if (!(_mysql_named_row_types = PyDict_New()))
+        return NULL;
+    PyObject *array = PyImport_ImportModule("array");
+    if (!array)
+        return NULL;
+    _mysql_array_type = PyObject_GetAttrString(array, "array");
+    Py_DECREF(array);
+    if (!_mysql_array_type)
+        return NULL;
+
     if (PyType_Ready(&_mysql_ConnectionObject_Type) < 0)
         return NULL;
     if (PyType_Ready(&_mysql_ResultObject_Type) < 0)
         return NULL;
+    if (PyType_Ready(&_mysql_RowsObject_Type) < 0)
+        return NULL;
+    if (PyType_Ready(&_mysql_LazyRowObject_Type) < 0)
+        return NULL;
+    if (PyType_Ready(&_mysql_BulkValuesObject_Type) < 0)
+        return NULL;
+    if (PyType_Ready(&_mysql_StatementObject_Type) < 0)
+        return NULL;
 
     module = PyModule_Create(&_mysqlmodule);
     if (!module) return module; /* this really should never happen */
@@ -3229,6 +8858,29 @@ PyInit__mysql(void)
                    (PyObject *)&_mysql_ResultObject_Type))
         goto error;
     Py_INCREF(&_mysql_ResultObject_Type);
+    if (PyDict_SetItemString(dict, "rows",
+                   (PyObject *)&_mysql_RowsObject_Type))
+        goto error;
+    Py_INCREF(&_mysql_RowsObject_Type);
+    if (PyDict_SetItemString(dict, "lazy_row",
+                   (PyObject *)&_mysql_LazyRowObject_Type))
+        goto error;
+    Py_INCREF(&_mysql_LazyRowObject_Type);
+    if (PyDict_SetItemString(dict, "bulk_values",
+                   (PyObject *)&_mysql_BulkValuesObject_Type))
+        goto error;
+    Py_INCREF(&_mysql_BulkValuesObject_Type);
+    if (PyDict_SetItemString(dict, "statement",
+                   (PyObject *)&_mysql_StatementObject_Type))
+        goto error;
+    Py_INCREF(&_mysql_StatementObject_Type);
+#ifdef HAVE_STMT_ARRAY_BINDING
+    if (PyDict_SetItemString(dict, "array_binding", Py_True))
+        goto error;
+#else
+    if (PyDict_SetItemString(dict, "array_binding", Py_False))
+        goto error;
+#endif
     if (!(emod = PyImport_ImportModule("MySQLdb._exceptions"))) {
         PyErr_Print();
         goto error;
@@ -5,6 +5,8 @@ want to make your own subclasses. In most cases, you will probably
 override Connection.default_cursor with a non-standard Cursor class.
 """
 
+import datetime
+import decimal
 import re
 
 from . import cursors, _mysql
@@ -160,6 +162,13 @@ class Connection(_mysql.connection):
             If set, the '_binary' prefix will be used for raw byte query
             arguments (e.g. Binary). This is disabled by default.
 
+        :param str decimal_format:
+            Representation of DECIMAL columns. ``"decimal"`` (default)
+            uses the converter (``decimal.Decimal``), ``"float"`` returns
+            float, ``"int"`` returns int scaled by ``10**scale`` of the
+            column and ``"str"`` returns the value as str.
+            Cursors can override it with ``cursor.decimal_format``.
+
         There are a number of undocumented, non-standard methods. See the
         documentation for the MySQL C API for some hints on what they do.
         """
@@ -184,14 +193,34 @@ class Connection(_mysql.connection):
                 conv2[k] = v[:]
             else:
                 conv2[k] = v
+
+        use_unicode = kwargs2.pop("use_unicode", True)
+        if use_unicode:
+            # Set them before connecting. _mysql caches decode plans
+            # compiled from the converter mapping.
+            for t in (
+                FIELD_TYPE.STRING,
+                FIELD_TYPE.VAR_STRING,
+                FIELD_TYPE.VARCHAR,
+                FIELD_TYPE.TINY_BLOB,
+                FIELD_TYPE.MEDIUM_BLOB,
+                FIELD_TYPE.LONG_BLOB,
+                FIELD_TYPE.BLOB,
+            ):
+                conv2[t] = _bytes_or_str
+            # Unlike other string/blob types, JSON is always text.
+            # MySQL may return JSON with charset==binary.
+            conv2[FIELD_TYPE.JSON] = str
         kwargs2["conv"] = conv2
 
         cursorclass = kwargs2.pop("cursorclass", self.default_cursor)
         charset = kwargs2.get("charset", "")
         collation = kwargs2.pop("collation", "")
-        use_unicode = kwargs2.pop("use_unicode", True)
         sql_mode = kwargs2.pop("sql_mode", "")
         self._binary_prefix = kwargs2.pop("binary_prefix", False)
+        self.decimal_format = kwargs2.pop("decimal_format", "decimal")
+        if self.decimal_format not in ("decimal", "float", "int", "str"):
+            raise ValueError(f"Unknown decimal_format: {self.decimal_format!r}")
 
         client_flag = kwargs.get("client_flag", 0)
         client_flag |= CLIENT.MULTI_RESULTS
@@ -199,6 +228,8 @@ class Connection(_mysql.connection):
         if multi_statements:
             client_flag |= CLIENT.MULTI_STATEMENTS
         kwargs2["client_flag"] = client_flag
+        # executemany() sends other statements than INSERT in batches.
+        self._multi_statements = bool(client_flag & CLIENT.MULTI_STATEMENTS)
 
         # PEP-249 requires autocommit to be initially off
         autocommit = kwargs2.pop("autocommit", False)
@@ -215,6 +246,12 @@ class Connection(_mysql.connection):
         self._server_version = tuple(
             [numeric_part(n) for n in self.get_server_info().split(".")[:2]]
         )
+        # executemany() binds arrays of args with MariaDB Connector/C.
+        self._array_binding = (
+            _mysql.array_binding
+            and "MariaDB" in self.get_server_info()
+            and self._server_version >= (10, 2)
+        )
         self.encoding = "ascii"  # overridden in set_character_set()
 
         if not charset:
@@ -224,26 +261,18 @@ class Connection(_mysql.connection):
         if sql_mode:
             self.set_sql_mode(sql_mode)
 
-        if use_unicode:
-            for t in (
-                FIELD_TYPE.STRING,
-                FIELD_TYPE.VAR_STRING,
-                FIELD_TYPE.VARCHAR,
-                FIELD_TYPE.TINY_BLOB,
-                FIELD_TYPE.MEDIUM_BLOB,
-                FIELD_TYPE.LONG_BLOB,
-                FIELD_TYPE.BLOB,
-            ):
-                self.converter[t] = _bytes_or_str
-            # Unlike other string/blob types, JSON is always text.
-            # MySQL may return JSON with charset==binary.
-            self.converter[FIELD_TYPE.JSON] = str
-
         self._transactional = self.server_capabilities & CLIENT.TRANSACTIONS
         if self._transactional:
             if autocommit is not None:
                 self.autocommit(autocommit)
         self.messages = []
+        self._max_allowed_packet = None
+        #: :class:`~MySQLdb.cursors.StatementSizer` of executemany() with
+        #: ``max_stmt_length = None``, created on first use.
+        self.statement_sizer = None
+        #: :class:`~MySQLdb.cursors.StatementCache` of the prepared
+        #: statements of cursors, created on first use.
+        self.statement_cache = None
 
     def _set_attributes(
         self,
@@ -288,44 +317,45 @@ class Connection(_mysql.connection):
         """
         return (cursorclass or self.cursorclass)(self)
 
-    def query(self, query):
-        # Since _mysql releases GIL while querying, we need immutable buffer.
-        if isinstance(query, bytearray):
-            query = bytes(query)
-        _mysql.connection.query(self, query)
-
-    def _bytes_literal(self, bs):
-        assert isinstance(bs, (bytes, bytearray))
-        x = self.string_literal(bs)  # x is escaped and quoted bytes
-        if self._binary_prefix:
-            return b"_binary" + x
-        return x
-
-    def _tuple_literal(self, t):
-        return b"(%s)" % (b",".join(map(self.literal, t)))
-
-    def literal(self, o):
-        """If o is a single object, returns an SQL literal as a string.
-        If o is a non-string sequence, the items of the sequence are
-        converted and returned as a sequence.
-
-        Non-standard. For internal use; do not use this in your
-        applications.
-        """
-        if isinstance(o, str):
-            s = self.string_literal(o.encode(self.encoding))
-        elif isinstance(o, bytearray):
-            s = self._bytes_literal(o)
-        elif isinstance(o, bytes):
-            s = self._bytes_literal(o)
-        elif isinstance(o, (tuple, list)):
-            s = self._tuple_literal(o)
-        else:
-            s = self.escape(o, self.encoders)
-            if isinstance(s, str):
-                s = s.encode(self.encoding)
-        assert isinstance(s, bytes)
-        return s
+    def _literal_types(self):
+        """Types which _mysql encodes in C like literal() does: str, bytes
+        and sequences always, other types only with the default encoder."""
+        if type(self).literal is not Connection.literal:
+            return ()
+        from MySQLdb.converters import conversions
+
+        return (str, bytes, tuple) + tuple(
+            t
+            for t in (
+                int,
+                float,
+                type(None),
+                bool,
+                datetime.date,
+                datetime.datetime,
+                datetime.timedelta,
+                decimal.Decimal,
+            )
+            if self.encoders.get(t) is conversions[t]
+        )
+
+    def _default_encoders(self):
+        """Whether literal() and the encoders are the default ones, so
+        that binding args as they are gives the same values."""
+        if type(self).literal is not Connection.literal:
+            return False
+        from MySQLdb.converters import conversions
+
+        return self.encoders == {
+            k: v for k, v in conversions.items() if type(k) is not int
+        }
+
+    def change_user(self, *args, **kwargs):
+        """Changes the user and the database like ``_mysql`` does, and
+        closes the cached prepared statements, which the server drops."""
+        if self.statement_cache is not None:
+            self.statement_cache.clear()
+        super().change_user(*args, **kwargs)
 
     def begin(self):
         """Explicitly begin a connection.
@@ -342,6 +372,15 @@ class Connection(_mysql.connection):
             self.query(f"SET NAMES {charset} COLLATE {collation}")
             self.store_result()
 
+    def max_allowed_packet(self):
+        """Return the max_allowed_packet of the server, which is
+        read once per connection. Non-standard."""
+        if self._max_allowed_packet is None:
+            self.query(b"SELECT @@max_allowed_packet")
+            r = self.store_result()
+            self._max_allowed_packet = int(r.fetch_row()[0][0])
+        return self._max_allowed_packet
+
     def set_sql_mode(self, sql_mode):
         """Set the connection sql_mode. See MySQL documentation for
         legal values."""
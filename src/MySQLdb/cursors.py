@@ -4,9 +4,24 @@ This module implements Cursors of various types for MySQLdb. By
 default, MySQLdb uses the Cursor class.
 """
 
+import codecs
+import collections
+import contextlib
+import datetime
+import decimal
+import functools
+import io
+import itertools
+import operator
+import queue
 import re
+import threading
+import time
+import weakref
 
-from ._exceptions import ProgrammingError
+from . import times
+from ._exceptions import Error, NotSupportedError, ProgrammingError
+from .constants import CR, ER
 
 #: Regular expression for ``Cursor.executemany```.
 #: executemany only supports simple bulk insert.
@@ -22,11 +37,270 @@ RE_INSERT_VALUES = re.compile(
     re.IGNORECASE | re.DOTALL,
 )
 
+#: Statements which ``Cursor.executemany`` sends in multi-statement batches.
+#: Statements with comments are executed one by one, since a trailing
+#: comment would hide the statements after it.
+RE_BATCH_STATEMENT = re.compile(
+    r"\s*((?:UPDATE|DELETE|INSERT|REPLACE)\b(?:(?!--|#|/\*).)*?)[\s;]*\Z",
+    re.IGNORECASE | re.DOTALL,
+)
+
+#: Placeholders which ``PreparedCursor`` replaces with ``?``.
+RE_PLACEHOLDER = re.compile(rb"%(?:\(([^)]*)\))?s|%%")
+
+
+#: FIELDS and LINES clauses of ``Cursor.load_data``, matching ``Cursor.copy_to``.
+LOAD_DATA_FORMATS = {
+    "tsv": b"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n'",
+    "csv": b"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY ''"
+    b" LINES TERMINATED BY '\\r\\n'",
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _qmark_query(query):
+    """Returns query with its %s and %(name)s placeholders replaced by ?,
+    and the names of the placeholders (None for %s)."""
+    names = []
+
+    def replace(m):
+        if m.group(0) == b"%%":
+            return b"%"
+        names.append(m.group(1))
+        return b"?"
+
+    return RE_PLACEHOLDER.sub(replace, query), tuple(names)
+
+
+class _QueryTemplate:
+    """A query parsed once by :func:`_parse_query`."""
+
+    __slots__ = ("names", "query", "segments")
+
+    def __init__(self, query, segments, names):
+        #: The encoded query.
+        self.query = query
+        #: The parts of query around the placeholders, with %% unescaped,
+        #: or None if the query has other format specifiers.
+        self.segments = segments
+        #: The names of the placeholders as bytes, or None for %s.
+        self.names = names
+
+    def bind(self, db, args):
+        """Returns the query with the literals of args spliced into the
+        placeholders, or None if the placeholders don't match the args like
+        ``bytes % args`` expects. args is a tuple, a list or a dict with
+        bytes keys."""
+        names = self.names
+        if isinstance(args, dict):
+            if not names or None in names:
+                return None
+            args = [args[name] for name in names]
+        elif any(names):
+            return None
+        elif len(args) != len(names):
+            raise ProgrammingError(
+                "not enough arguments for format string"
+                if len(args) < len(names)
+                else "not all arguments converted during bytes formatting"
+            )
+        return db.bind_query(self.segments, args)
+
+
+#: Longer queries are parsed each time instead of being cached.
+_MAX_CACHED_QUERY_LENGTH = 8192
+
+
+def _parse_query(query, encoding):
+    """Returns the :class:`_QueryTemplate` of query (str or bytes)."""
+    if len(query) > _MAX_CACHED_QUERY_LENGTH:
+        return _parse_query_uncached(query, encoding)
+    return _parse_query_cached(query, encoding)
+
+
+def _parse_query_uncached(query, encoding):
+    if isinstance(query, str):
+        query = query.encode(encoding)
+
+    segments = []
+    names = []
+    literal = []
+    pos = 0
+    for m in RE_PLACEHOLDER.finditer(query):
+        literal.append(query[pos : m.start()])
+        pos = m.end()
+        if m.group(0) == b"%%":
+            literal.append(b"%")
+        else:
+            segments.append(b"".join(literal))
+            literal = []
+            names.append(m.group(1))
+    literal.append(query[pos:])
+    segments.append(b"".join(literal))
+    segments = tuple(segments)
+    if b"%" in RE_PLACEHOLDER.sub(b"", query):
+        segments = None
+    return _QueryTemplate(query, segments, tuple(names))
+
+
+_parse_query_cached = functools.lru_cache(maxsize=1024)(_parse_query_uncached)
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_many(query, encoding):
+    """Returns the encoded (prefix, values, postfix) of an INSERT query
+    executemany() can merge, or None, and the encoded statement it can
+    send in batches, or None."""
+    insert = batch = None
+    if isinstance(query, str):
+        m = RE_INSERT_VALUES.match(query)
+        if m:
+            insert = (m.group(1) % (), m.group(2).rstrip(), m.group(3) or "")
+            assert insert[1][0] == "(" and insert[1][-1] == ")"
+            insert = tuple(part.encode(encoding) for part in insert)
+        m = RE_BATCH_STATEMENT.match(query)
+        if m:
+            batch = m.group(1).encode(encoding)
+    return insert, batch
+
+
+class StatementSizer:
+    """Chooses the length of the statements :meth:`BaseCursor.executemany`
+    generates when ``max_stmt_length`` is None. There is one per connection,
+    see ``Connection.statement_sizer``.
+
+    The length starts at :attr:`start_length` and doubles while the
+    throughput of the statements doesn't drop, up to the server's
+    max_allowed_packet. It is halved when the throughput drops, when a
+    statement takes more than :attr:`max_latency` seconds, and after a
+    packet too large, lock wait timeout or deadlock error.
+    """
+
+    start_length = 64 * 1024
+    min_length = 4 * 1024
+    max_latency = 1.0
+
+    def __init__(self, max_allowed_packet):
+        #: Upper bound of :attr:`length`, room is left for the packet header.
+        self.max_length = max(self.min_length, max_allowed_packet - 1024)
+        #: Max length of the next statements.
+        self.length = min(self.start_length, self.max_length)
+        #: (length, seconds) of the last 100 statements.
+        self.stats = collections.deque(maxlen=100)
+        self._throughput = 0.0
+
+    @contextlib.contextmanager
+    def measure(self, statements, sql):
+        """Times the execution of sql, one of statements, and updates the
+        max_stmt_length of statements (a ``_mysql.bulk_values``)."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Error as e:
+            self.failed(e, len(sql))
+            raise
+        self.record(len(sql), time.perf_counter() - start)
+        statements.max_stmt_length = self.length
+
+    def record(self, length, seconds):
+        self.stats.append((length, seconds))
+        if seconds > self.max_latency:
+            self._shrink()
+        elif length >= self.length // 2:
+            # Short statements, like the last one of executemany(), don't
+            # tell much about the throughput.
+            throughput = length / max(seconds, 1e-6)
+            if throughput >= self._throughput * 0.95:
+                self.length = min(self.length * 2, self.max_length)
+            else:
+                self._shrink()
+            self._throughput = throughput
+
+    def failed(self, error, length):
+        code = error.args[0] if error.args else None
+        if code in (ER.NET_PACKET_TOO_LARGE, CR.NET_PACKET_TOO_LARGE):
+            self.max_length = max(self.min_length, min(self.max_length, length // 2))
+            self._shrink()
+        elif code in (ER.LOCK_WAIT_TIMEOUT, ER.LOCK_DEADLOCK):
+            self._shrink()
+
+    def _shrink(self):
+        self.length = max(self.min_length, min(self.length // 2, self.max_length))
+        self._throughput = 0.0
+
+
+_no_sizer = contextlib.nullcontext()
+
+
+class StatementCache:
+    """LRU cache of the prepared statements of a connection, keyed by
+    query. There is one per connection, see ``Connection.statement_cache``.
+
+    Statements are closed when they are evicted, and all statements are
+    dropped when the connection reconnects or changes user, since the
+    server forgets them.
+    """
+
+    #: Max number of cached statements.
+    max_size = 100
+
+    def __init__(self):
+        #: Number of lookups which found a prepared statement.
+        self.hits = 0
+        #: Number of lookups which prepared the statement.
+        self.misses = 0
+        self._statements = collections.OrderedDict()
+        self._thread_id = None
+
+    def __len__(self):
+        return len(self._statements)
+
+    def get(self, db, query):
+        """Returns the statement of query (bytes with ? placeholders),
+        preparing it on db if it isn't cached."""
+        thread_id = db.thread_id()
+        if thread_id != self._thread_id:
+            self.clear()
+            self._thread_id = thread_id
+        stmt = self._statements.get(query)
+        if stmt is not None:
+            self.hits += 1
+            self._statements.move_to_end(query)
+            return stmt
+        self.misses += 1
+        stmt = self._statements[query] = db.prepare(query)
+        while len(self._statements) > self.max_size:
+            self._statements.popitem(last=False)[1].close()
+        return stmt
+
+    def clear(self):
+        """Closes all statements."""
+        statements = self._statements
+        self._statements = collections.OrderedDict()
+        for stmt in statements.values():
+            stmt.close()
+
 
 def _backquote_escape(s):
     return s.replace(b"`", b"``")
 
 
+def _quote_identifier(name, encoding):
+    """Returns name (str or bytes) quoted with backquotes."""
+    if isinstance(name, str):
+        name = name.encode(encoding)
+    return b"`%s`" % _backquote_escape(name)
+
+
+def _load_data_value(value):
+    """Formats values of load_data() rows which are not encoded in C."""
+    if isinstance(value, datetime.timedelta):
+        return times.format_TIMEDELTA(value)
+    if isinstance(value, decimal.Decimal):
+        return format(value, "f")
+    return str(value)
+
+
 class BaseCursor:
     """A base for Cursor classes. Useful attributes:
 
@@ -48,8 +322,24 @@ class BaseCursor:
     #:
     #: Max size of allowed statement is max_allowed_packet - packet_header_size.
     #: Default value of max_allowed_packet is 1048576.
+    #: None lets the :class:`StatementSizer` of the connection choose it.
     max_stmt_length = 64 * 1024
 
+    #: If true, :meth:`executemany` builds the next statement while the
+    #: server executes the previous one.
+    overlapped_executemany = False
+
+    #: If true, :meth:`executemany` binds list args as arrays on MariaDB.
+    array_binding = False
+
+    #: Representation of DECIMAL columns ("decimal", "float", "int" or "str").
+    #:
+    #: None means the ``decimal_format`` of the connection.
+    decimal_format = None
+
+    #: Max number of rows in a record batch of :meth:`__arrow_c_stream__`.
+    arrow_batch_size = 65536
+
     connection = None
 
     def __init__(self, connection):
@@ -139,6 +429,32 @@ class BaseCursor:
     def _post_get_result(self):
         pass
 
+    def copy_to(self, fileobj, format="csv", header=False):
+        """Writes the remaining rows to fileobj as csv, tsv or ndjson,
+        without converting the values to Python objects. Text files
+        should be opened with newline="". Binary columns can only be
+        copied to text files as ndjson; csv and tsv raise
+        ProgrammingError. Returns the number of rows. See
+        ``_mysql.result.copy_to()`` for the formats. Non-standard."""
+        result = self._remaining_result()
+        db = self._get_db()
+        text = isinstance(fileobj, io.TextIOBase)
+        if text:
+            decoder = codecs.getincrementaldecoder(db.encoding)()
+
+            def write(data):
+                fileobj.write(decoder.decode(data))
+
+        else:
+            decoder = None
+            write = fileobj.write
+        n = result.copy_to(write, format, header, text)
+        if decoder is not None:
+            decoder.decode(b"", True)
+        self.rownumber += n
+        self.warning_count = db.warning_count()
+        return n
+
     def setinputsizes(self, *args):
         """Does nothing, required by DB API."""
 
@@ -151,11 +467,13 @@ class BaseCursor:
             raise ProgrammingError("cursor closed")
         return con
 
-    def execute(self, query, args=None):
+    def execute(self, query, args=None, prepared=False):
         """Execute a query.
 
         query -- string, query to execute on server
         args -- optional sequence or mapping, parameters to use with query.
+        prepared -- if true, query is executed as a server-side prepared
+            statement, which is cached by the connection. Non-standard.
 
         Note: If args is a sequence, then %s must be used as the
         parameter placeholder in the query. If a mapping is used,
@@ -163,6 +481,8 @@ class BaseCursor:
 
         Returns integer represents rows affected, if any
         """
+        if prepared:
+            return self._execute_prepared(query, args)
         self._discard()
 
         mogrified_query = self._mogrify(query, args)
@@ -174,24 +494,35 @@ class BaseCursor:
     def _mogrify(self, query, args=None):
         """Return query after binding args."""
         db = self._get_db()
-
-        if isinstance(query, str):
-            query = query.encode(db.encoding)
-
-        if args is not None:
-            if isinstance(args, dict):
-                nargs = {}
-                for key, item in args.items():
-                    if isinstance(key, str):
-                        key = key.encode(db.encoding)
-                    nargs[key] = db.literal(item)
-                args = nargs
-            else:
-                args = tuple(map(db.literal, args))
-            try:
-                query = query % args
-            except TypeError as m:
-                raise ProgrammingError(str(m))
+        if args is None:
+            if isinstance(query, str):
+                query = query.encode(db.encoding)
+            return query
+
+        if isinstance(query, bytearray):
+            query = bytes(query)
+        template = _parse_query(query, db.encoding)
+        query = template.query
+
+        if isinstance(args, dict):
+            args = {
+                key.encode(db.encoding) if isinstance(key, str) else key: item
+                for key, item in args.items()
+            }
+        elif not isinstance(args, (tuple, list)):
+            args = tuple(args)
+        if template.segments is not None:
+            bound = template.bind(db, args)
+            if bound is not None:
+                return bound
+        if isinstance(args, dict):
+            args = dict(zip(args, db.literal_many(args.values())))
+        else:
+            args = tuple(db.literal_many(args))
+        try:
+            query = query % args
+        except TypeError as m:
+            raise ProgrammingError(str(m))
 
         return query
 
@@ -218,30 +549,146 @@ class BaseCursor:
         :return: Number of rows affected, if any.
 
         This method improves performance on multiple-row INSERT and
-        REPLACE. Otherwise it is equivalent to looping over args with
-        execute().
+        REPLACE. UPDATE, DELETE and other INSERT statements are sent in
+        multi-statement batches of up to max_stmt_length bytes when the
+        connection has multi_statements enabled. If a statement of a batch
+        fails, the index of its args is stored in the ``index`` attribute
+        of the exception. Otherwise it is equivalent to looping over args
+        with execute().
+
+        With array_binding on MariaDB, UPDATE, DELETE, INSERT and REPLACE
+        statements are executed for all args in one request, when args is
+        a list, the connection uses the default literal() and encoders and
+        the args of each placeholder have the same type. If this fails,
+        the index of the exception is None.
         """
         if not args:
             return
 
-        m = RE_INSERT_VALUES.match(query)
-        if m:
-            q_prefix = m.group(1) % ()
-            q_values = m.group(2).rstrip()
-            q_postfix = m.group(3) or ""
-            assert q_values[0] == "(" and q_values[-1] == ")"
+        rowcount = self._execute_bulk(query, args)
+        if rowcount is not None:
+            return rowcount
+
+        db = self._get_db()
+        insert, batch = _parse_many(query, db.encoding)
+        if insert:
+            q_prefix, q_values, q_postfix = insert
             return self._do_execute_many(
                 q_prefix,
                 q_values,
                 q_postfix,
                 args,
                 self.max_stmt_length,
-                self._get_db().encoding,
+                db.encoding,
             )
 
+        if batch and db._multi_statements:
+            return self._do_execute_batch(batch, args, self.max_stmt_length)
+
         self.rowcount = sum(self.execute(query, arg) for arg in args)
         return self.rowcount
 
+    def _execute_bulk(self, query, args):
+        """Executes query with all args in one request with the array
+        binding of MariaDB. Returns None if it can't be used, before
+        anything is executed."""
+        if not self.array_binding or not isinstance(args, list):
+            return None
+        db = self._get_db()
+        if (
+            not db._array_binding
+            or not db._default_encoders()
+            or not _parse_many(query, db.encoding)[1]
+        ):
+            return None
+        self._discard()
+        try:
+            stmt, names = self._prepare(query, ())
+            params = [self._params(names, arg) for arg in args]
+        except Error:
+            return None
+        try:
+            stmt.execute_many(params)
+        except (NotSupportedError, ValueError, TypeError):
+            # The args can't be bound as arrays, nothing was executed.
+            return None
+        except Error as e:
+            # The server doesn't tell which row failed.
+            e.index = None
+            self.rowcount = -1
+            raise
+        self._result = None
+        self.rowcount = stmt.affected_rows()
+        self.lastrowid = stmt.insert_id()
+        self.warning_count = db.warning_count()
+        return self.rowcount
+
+    def _do_execute_batch(self, query, args, max_stmt_length):
+        if isinstance(query, str):
+            query = query.encode(self._get_db().encoding)
+        statements, sizer = self._bulk_values(
+            b"", query, b"", args, max_stmt_length, b";\n"
+        )
+        return self._execute_statements(statements, sizer, batch=True)
+
+    def _execute_statements(self, statements, sizer, batch=False):
+        """Executes the statements of executemany() without fetching their
+        results and returns the number of affected rows. With
+        overlapped_executemany, the next statement is built while the
+        server executes the previous one. With batch, errors get the index
+        of the failing statement."""
+        db = self._get_db()
+        overlapped = self.overlapped_executemany
+        self._discard()
+        self._result = None
+        self.warning_count = 0
+        self.rowcount = None
+        self.lastrowid = None
+        rows = index = 0
+        sql = next(statements, None)
+        while sql is not None:
+            self._executed = sql
+            start = time.perf_counter()
+            try:
+                if overlapped:
+                    db.send_query(sql)
+                    try:
+                        following = next(statements, None)
+                    except Exception:
+                        # Read the result to keep the connection usable.
+                        db.read_query_result()
+                        self._discard()
+                        raise
+                    db.read_query_result()
+                else:
+                    db.query(sql)
+                while True:
+                    db.discard_result()
+                    rows += db.affected_rows()
+                    index += 1
+                    if db.next_result() == -1:
+                        break
+            except Error as e:
+                if sizer is not None:
+                    sizer.failed(e, len(sql))
+                if batch:
+                    # The server skips the rest of the batch.
+                    e.index = index
+                self.rowcount = rows
+                raise
+            if sizer is not None:
+                sizer.record(len(sql), time.perf_counter() - start)
+                statements.max_stmt_length = sizer.length
+            if not overlapped:
+                following = next(statements, None)
+            sql = following
+        self.rowcount = rows
+        self.warning_count = db.warning_count()
+        self.lastrowid = db.insert_id()
+        self.rownumber = 0
+        self._post_get_result()
+        return rows
+
     def _do_execute_many(
         self, prefix, values, postfix, args, max_stmt_length, encoding
     ):
@@ -251,23 +698,43 @@ class BaseCursor:
             values = values.encode(encoding)
         if isinstance(postfix, str):
             postfix = postfix.encode(encoding)
-        sql = bytearray(prefix)
-        args = iter(args)
-        v = self._mogrify(values, next(args))
-        sql += v
+        statements, sizer = self._bulk_values(
+            prefix, values, postfix, args, max_stmt_length
+        )
+        if self.overlapped_executemany:
+            return self._execute_statements(statements, sizer)
         rows = 0
-        for arg in args:
-            v = self._mogrify(values, arg)
-            if len(sql) + len(v) + len(postfix) + 1 > max_stmt_length:
-                rows += self.execute(sql + postfix)
-                sql = bytearray(prefix)
-            else:
-                sql += b","
-            sql += v
-        rows += self.execute(sql + postfix)
+        for sql in statements:
+            with sizer.measure(statements, sql) if sizer else _no_sizer:
+                rows += self.execute(sql)
         self.rowcount = rows
         return rows
 
+    def _bulk_values(
+        self, prefix, values, postfix, args, max_stmt_length, separator=b","
+    ):
+        """Returns the statements of executemany() and the StatementSizer
+        which adapts their length, or None if max_stmt_length is fixed."""
+        db = self._get_db()
+        sizer = None
+        if max_stmt_length is None:
+            if db.statement_sizer is None:
+                db.statement_sizer = StatementSizer(db.max_allowed_packet())
+            sizer = db.statement_sizer
+            max_stmt_length = sizer.length
+        statements = db.bulk_values(
+            prefix,
+            values,
+            postfix,
+            args,
+            max_stmt_length,
+            db.literal,
+            db._literal_types(),
+            db._binary_prefix,
+            separator,
+        )
+        return statements, sizer
+
     def callproc(self, procname, args=()):
         """Execute stored procedure procname with args
 
@@ -315,13 +782,123 @@ class BaseCursor:
         self._query(q)
         return args
 
-    def _query(self, q):
+    def load_data(self, table, source, columns=None, format="tsv"):
+        """Load rows into a table with LOAD DATA LOCAL INFILE, reading
+        the data from Python instead of a file.
+
+        table -- name of the table, optionally qualified as "db.table", or
+            a sequence of these parts, which may contain dots.
+        source -- binary or text file object, or an iterable of
+            sequences which are sent in the tsv format.
+        columns -- optional sequence of the column names of the fields
+        format -- "tsv" (the default format of LOAD DATA) or "csv", as
+            written by copy_to(). csv can't represent NULL.
+
+        The connection must enable local_infile (or local_infile_dir), and
+        the server must allow it. If source raises an exception, the rows
+        sent before may have been loaded.
+
+        Returns the number of loaded rows. Non-standard.
+        """
+        db = self._get_db()
+        if format not in LOAD_DATA_FORMATS:
+            raise ValueError(f"Unknown format: {format}")
+        if hasattr(source, "read"):
+            if isinstance(source, io.TextIOBase):
+
+                def read(size):
+                    return source.read(size).encode(db.encoding)
+
+            else:
+                read = source.read
+            infile = {"read": read}
+        elif format != "tsv":
+            raise ValueError("rows are sent in the tsv format")
+        else:
+            infile = {"rows": source, "encode": _load_data_value}
+
+        if isinstance(table, (str, bytes)):
+            table = table.split("." if isinstance(table, str) else b".")
+        q = b"LOAD DATA LOCAL INFILE 'load_data' INTO TABLE %s CHARACTER SET %s %s" % (
+            b".".join(_quote_identifier(part, db.encoding) for part in table),
+            db.character_set_name().encode(),
+            LOAD_DATA_FORMATS[format],
+        )
+        if columns:
+            q += b" (%s)" % b",".join(
+                _quote_identifier(c, db.encoding) for c in columns
+            )
+
+        self._discard()
+        return self._query(q, **infile)
+
+    def _execute_prepared(self, query, args):
+        if self._fetch_type != 0 or not isinstance(self, CursorStoreResultMixIn):
+            raise NotSupportedError(
+                "prepared statements need a cursor which stores tuple rows"
+            )
+        self._discard()
+        stmt, names = self._prepare(query, args)
+        self._execute_statement(stmt, self._params(names, args))
+        return self.rowcount
+
+    def _prepare(self, query, args):
+        """Returns the cached statement of query and the names of its
+        placeholders. The placeholders are only replaced if there are args,
+        like with execute()."""
+        db = self._get_db()
+        if isinstance(query, str):
+            query = query.encode(db.encoding)
+        if args is None:
+            qmark_query, names = query, ()
+        else:
+            qmark_query, names = _qmark_query(query)
+        if db.statement_cache is None:
+            db.statement_cache = StatementCache()
+        self._executed = query
+        return db.statement_cache.get(db, qmark_query), names
+
+    def _params(self, names, args):
+        """Returns the args in the order of the placeholders."""
+        if not isinstance(args, dict):
+            if any(names):
+                raise ProgrammingError("format requires a mapping")
+            return args or ()
+        encoding = self._get_db().encoding
+        params = []
+        for name in names:
+            if name is None:
+                raise ProgrammingError("format requires a sequence")
+            key = name.decode(encoding)
+            params.append(args[key] if key in args else args[name])
+        return params
+
+    def _execute_statement(self, stmt, params):
         db = self._get_db()
         self._result = None
         self.warning_count = 0
         self.rowcount = None
         self.lastrowid = None
-        db.query(q)
+        stmt.execute(params, decimal_format=self.decimal_format or db.decimal_format)
+        self.description = stmt.describe()
+        self.description_flags = stmt.field_flags()
+        self._rows = stmt.fetch_row(0)
+        self.rowcount = stmt.affected_rows()
+        self.lastrowid = stmt.insert_id()
+        stmt.free_result()
+        self.warning_count = db.warning_count()
+        self.rownumber = 0
+
+    def _query(self, q, **infile):
+        db = self._get_db()
+        self._result = None
+        self.warning_count = 0
+        self.rowcount = None
+        self.lastrowid = None
+        if infile:
+            db.query_local_infile(q, **infile)
+        else:
+            db.query(q)
         self._do_get_result(db)
         self._post_get_result()
         self._executed = q
@@ -376,10 +953,15 @@ class CursorStoreResultMixIn:
     query, or using CursorUseResultMixIn instead."""
 
     def _get_result(self):
-        return self._get_db().store_result()
+        db = self._get_db()
+        return db.store_result(decimal_format=self.decimal_format or db.decimal_format)
 
     def _post_get_result(self):
-        self._rows = self._fetch_row(0)
+        # Rows are converted when they are fetched.
+        if self._result:
+            self._rows = self._result.rows(self._fetch_type)
+        else:
+            self._rows = ()
         self._result = None
 
     def fetchone(self):
@@ -404,13 +986,29 @@ class CursorStoreResultMixIn:
     def fetchall(self):
         """Fetches all available rows from the cursor."""
         self._check_executed()
-        if self.rownumber:
-            result = self._rows[self.rownumber :]
-        else:
-            result = self._rows
+        result = self._rows[self.rownumber :]
         self.rownumber = len(self._rows)
         return result
 
+    def __arrow_c_stream__(self, requested_schema=None):
+        """Exports the remaining rows as an Arrow C stream (PyCapsule).
+        Rows are converted from the stored result when the stream is
+        consumed. Non-standard."""
+        result = self._remaining_result()
+        self.rownumber = len(self._rows)
+        return result.__arrow_c_stream__(
+            requested_schema, batch_size=self.arrow_batch_size
+        )
+
+    def _remaining_result(self):
+        """Returns the result positioned at the next row to fetch."""
+        self._check_executed()
+        result = getattr(self._rows, "result", None)
+        if result is None:
+            raise ProgrammingError("no result set")
+        result.data_seek(self.rownumber)
+        return result
+
     def scroll(self, value, mode="relative"):
         """Scroll the cursor in the result set to a new position according
         to mode.
@@ -437,39 +1035,224 @@ class CursorUseResultMixIn:
     close() the cursor before additional queries can be performed on
     the connection."""
 
+    #: Number of rows which fetchone() and iteration read ahead from the
+    #: server at once. 1 disables the read-ahead buffer.
+    fetch_batch_size = 1000
+
     def _get_result(self):
-        return self._get_db().use_result()
+        db = self._get_db()
+        return db.use_result(decimal_format=self.decimal_format or db.decimal_format)
+
+    def _post_get_result(self):
+        # Iterator over the rows read ahead by fetchone().
+        self._rows = iter(())
+
+    def _buffered_rows(self, size=None):
+        """Returns up to size (default all) rows read ahead by fetchone()."""
+        if not self._rows:
+            return ()
+        return tuple(itertools.islice(self._rows, size))
+
+    def __arrow_c_stream__(self, requested_schema=None):
+        """Exports the remaining rows as an Arrow C stream (PyCapsule).
+        Rows are read from the server in batches of arrow_batch_size rows
+        while the stream is consumed. Non-standard."""
+        return self._remaining_result().__arrow_c_stream__(
+            requested_schema, batch_size=self.arrow_batch_size
+        )
+
+    def _remaining_result(self):
+        """Returns the result positioned at the next row to fetch."""
+        self._check_executed()
+        if not self._result:
+            raise ProgrammingError("no result set")
+        buffered = operator.length_hint(self._rows) if self._rows else 0
+        if buffered:
+            # Give the rows read ahead by fetchone() back to the result.
+            self._result.unread(buffered)
+            self._rows = iter(())
+        return self._result
 
     def fetchone(self):
         """Fetches a single row from the cursor."""
         self._check_executed()
-        r = self._fetch_row(1)
-        if not r:
-            self.warning_count = self._get_db().warning_count()
-            return None
+        row = next(self._rows, None) if self._rows else None
+        if row is None:
+            self._rows = iter(self._fetch_row(self.fetch_batch_size))
+            row = next(self._rows, None)
+            if row is None:
+                self.warning_count = self._get_db().warning_count()
+                return None
         self.rownumber = self.rownumber + 1
-        return r[0]
+        return row
 
     def fetchmany(self, size=None):
         """Fetch up to size rows from the cursor. Result set may be smaller
         than size. If size is not defined, cursor.arraysize is used."""
         self._check_executed()
         size = size or self.arraysize
-        r = self._fetch_row(size)
+        r = self._buffered_rows(size)
         if len(r) < size:
-            self.warning_count = self._get_db().warning_count()
+            r += self._fetch_row(size - len(r))
+            if len(r) < size:
+                self.warning_count = self._get_db().warning_count()
         self.rownumber = self.rownumber + len(r)
         return r
 
     def fetchall(self):
         """Fetches all available rows from the cursor."""
         self._check_executed()
-        r = self._fetch_row(0)
+        r = self._buffered_rows() + self._fetch_row(0)
         self.warning_count = self._get_db().warning_count()
         self.rownumber = self.rownumber + len(r)
         return r
 
 
+class _Prefetcher:
+    """Reads batches of rows of a use result on a helper thread. At most
+    max_batches batches are kept in the queue."""
+
+    def __init__(self, result, how, batch_size, max_batches):
+        self._result = result
+        self._how = how
+        self._batch_size = batch_size
+        self._queue = queue.Queue(max_batches)
+        self._stopping = threading.Event()
+        self._rows = ()
+        self._pos = 0
+        self._done = False
+        self._thread = threading.Thread(
+            target=self._run, name="MySQLdb prefetch", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                rows = self._result.fetch_row(self._batch_size, self._how)
+                self._queue.put(rows)
+                # fetch_row(0) reads all rows, so a batch size of 0 ends
+                # with an empty batch.
+                if not rows or len(rows) < self._batch_size:
+                    return
+        except Exception as e:
+            self._queue.put(e)
+
+    def fetch(self, size):
+        """Returns up to size rows, or all remaining rows if size is 0.
+        Errors of the helper thread are raised here."""
+        r = []
+        while not size or len(r) < size:
+            if self._pos == len(self._rows):
+                if self._done:
+                    break
+                item = self._queue.get()
+                if isinstance(item, Exception):
+                    self._done = True
+                    raise item
+                self._rows = item
+                self._pos = 0
+                self._done = not item or len(item) < self._batch_size
+                continue
+            end = len(self._rows)
+            if size:
+                end = min(end, self._pos + size - len(r))
+            r.extend(self._rows[self._pos : end])
+            self._pos = end
+        return tuple(r)
+
+    def stop(self):
+        """Stops the helper thread. The rest of the result is not read."""
+        self._stopping.set()
+        # The thread puts at most one more item after the queue is drained.
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self._done = True
+
+
+class CursorPrefetchMixIn(CursorUseResultMixIn):
+    """This is a MixIn class like CursorUseResultMixIn, but a helper
+    thread reads and converts the next batches of fetch_batch_size rows
+    while the application processes the current one. The connection
+    must not be used until all rows are fetched or the cursor is
+    closed. This is a non-standard feature."""
+
+    #: Max number of batches which the helper thread reads ahead.
+    prefetch_batches = 2
+
+    _prefetcher = None
+
+    def _stop_prefetch(self):
+        if self._prefetcher is not None:
+            # Calls _Prefetcher.stop(), also when the cursor is collected.
+            self._prefetch_finalizer()
+            self._prefetcher = None
+
+    def _discard(self):
+        self._stop_prefetch()
+        super()._discard()
+
+    def _post_get_result(self):
+        super()._post_get_result()
+        self._stop_prefetch()
+        if self._result:
+            self._prefetcher = _Prefetcher(
+                self._result,
+                self._fetch_type,
+                self.fetch_batch_size,
+                self.prefetch_batches,
+            )
+            self._prefetch_finalizer = weakref.finalize(self, self._prefetcher.stop)
+            self._prefetch_finalizer.atexit = False
+
+    def _fetch_row(self, size=1):
+        if self._prefetcher is None:
+            return ()
+        return self._prefetcher.fetch(size)
+
+    def _remaining_result(self):
+        raise NotSupportedError("the result is read by the prefetching thread")
+
+
+class CursorPreparedMixIn:
+    """This is a MixIn class which causes queries with args to be executed
+    as server-side prepared statements, which are cached by the connection.
+    The args and the rows are sent in the binary protocol, so they are
+    neither escaped nor parsed from text. It requires CursorStoreResultMixIn.
+    This is a non-standard feature."""
+
+    def execute(self, query, args=None, prepared=None):
+        if prepared is None:
+            prepared = args is not None
+        return super().execute(query, args, prepared)
+
+    def executemany(self, query, args):
+        """Execute a query once for each element of args. The statement
+        is prepared once."""
+        if not args:
+            return
+        rowcount = self._execute_bulk(query, args)
+        if rowcount is not None:
+            return rowcount
+        self._discard()
+        stmt, names = self._prepare(query, args[0])
+        rowcount = 0
+        for index, arg in enumerate(args):
+            try:
+                self._execute_statement(stmt, self._params(names, arg))
+            except Error as e:
+                e.index = index
+                raise
+            rowcount += self.rowcount
+        self.rowcount = rowcount
+        return rowcount
+
+
 class CursorTupleRowsMixIn:
     """This is a MixIn class that causes all rows to be returned as tuples,
     which is the standard form required by DB API."""
@@ -484,6 +1267,24 @@ class CursorDictRowsMixIn:
     _fetch_type = 1
 
 
+class CursorLazyRowsMixIn:
+    """This is a MixIn class that causes all rows to be returned as
+    lazy rows, which convert a column when it is accessed by index or
+    by name. They compare equal to tuples. It requires
+    CursorStoreResultMixIn. This is a non-standard feature."""
+
+    _fetch_type = 3
+
+
+class CursorNamedTupleRowsMixIn:
+    """This is a MixIn class that causes all rows to be returned as
+    named tuples. Columns can be accessed as attributes, and the keys
+    of CursorDictRowsMixIn are used as the names. This is a non-standard
+    feature."""
+
+    _fetch_type = 4
+
+
 class Cursor(CursorStoreResultMixIn, CursorTupleRowsMixIn, BaseCursor):
     """This is the standard Cursor class that returns rows as tuples
     and stores the result set in the client."""
@@ -502,3 +1303,51 @@ class SSCursor(CursorUseResultMixIn, CursorTupleRowsMixIn, BaseCursor):
 class SSDictCursor(CursorUseResultMixIn, CursorDictRowsMixIn, BaseCursor):
     """This is a Cursor class that returns rows as dictionaries and
     stores the result set in the server."""
+
+
+class SSPrefetchCursor(CursorPrefetchMixIn, CursorTupleRowsMixIn, BaseCursor):
+    """This is a Cursor class like SSCursor, but the next rows are read
+    from the server by a helper thread while the current rows are
+    processed."""
+
+
+class LazyCursor(CursorStoreResultMixIn, CursorLazyRowsMixIn, BaseCursor):
+    """This is a Cursor class that returns lazy rows and stores the
+    result set in the client. Useful when only a few columns of wide
+    rows are used."""
+
+
+class PreparedCursor(
+    CursorPreparedMixIn, CursorStoreResultMixIn, CursorTupleRowsMixIn, BaseCursor
+):
+    """This is a Cursor class that returns rows as tuples and executes
+    queries with args as server-side prepared statements."""
+
+
+class NamedTupleCursor(CursorStoreResultMixIn, CursorNamedTupleRowsMixIn, BaseCursor):
+    """This is a Cursor class that returns rows as named tuples and
+    stores the result set in the client."""
+
+
+class ColumnarCursor(CursorUseResultMixIn, CursorTupleRowsMixIn, BaseCursor):
+    """This is a Cursor class that can fetch the result set as columns
+    with :meth:`fetchcolumns`. It stores the result set in the server
+    like SSCursor."""
+
+    # fetchcolumns() can't return rows read ahead by fetchone().
+    fetch_batch_size = 1
+
+    def fetchcolumns(self, size=None):
+        """Fetches up to size rows (all remaining rows by default) as
+        columns. Returns (columns, nulls); see ``result.fetch_columns()``.
+        Integer and float columns are array.array objects with a NULL
+        bitmap in nulls, other columns are lists."""
+        self._check_executed()
+        if not self._result:
+            return (), ()
+        columns, nulls = self._result.fetch_columns(size or 0)
+        if columns:
+            self.rownumber += len(columns[0])
+        if not size or not columns or len(columns[0]) < size:
+            self.warning_count = self._get_db().warning_count()
+        return columns, nulls
@@ -1,3 +1,5 @@
+import datetime
+import decimal
 import threading
 import time
 
@@ -122,3 +124,37 @@ def test_result_concurrent_use_raises(conn):
     done.wait()
     thread.join()
     assert thread_error is None
+
+
+def test_literal(conn):
+    assert conn.literal(1) == b"1"
+    assert conn.literal(None) == b"NULL"
+    assert conn.literal("a'b") == b"'a\\'b'"
+    assert conn.literal((1, b"x", [2.5])) == b"(1,'x',(2.5e0))"
+    assert conn.literal(datetime.date(2020, 1, 2)) == b"'2020-01-02'"
+    assert (
+        conn.literal(datetime.datetime(2020, 1, 2, 3, 4, 5, 6))
+        == b"'2020-01-02 03:04:05.000006'"
+    )
+    assert conn.literal(datetime.timedelta(1, 3723)) == b"'1 1:2:3'"
+    assert conn.literal(decimal.Decimal("1E+2")) == b"100"
+    recursive = [1]
+    recursive.append(recursive)
+    with pytest.raises(RecursionError):
+        conn.literal(recursive)
+
+    # Types whose encoder is replaced go through the encoder.
+    conn.encoders = {**conn.encoders, int: lambda o, d: "x%d" % o}
+    assert conn.literal((1, 2)) == b"(x1,x2)"
+
+
+def test_literal_many(conn):
+    values = [1, "a'b", b"x", None, (1, 2), decimal.Decimal("1.5")]
+    assert conn.literal_many(values) == [conn.literal(v) for v in values]
+    assert conn.literal_many(iter([1, 2])) == [b"1", b"2"]
+
+
+def test_query_buffer(conn):
+    for query in (b"SELECT 1", bytearray(b"SELECT 1"), memoryview(b" SELECT 1")[1:]):
+        conn.query(query)
+        assert conn.store_result().fetch_row() == ((1,),)
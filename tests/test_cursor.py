@@ -190,6 +190,36 @@ def test_mogrify_with_dict_args():
     assert mogrified_query == cursor._executed.decode()
 
 
+def test_mogrify_template():
+    conn = connect()
+    cursor = conn.cursor()
+
+    query = "SELECT %(a)s, '100%%', %(a)s, %(b)s"
+    for i in range(2):  # parsed, then cached
+        assert (
+            cursor.mogrify(query, {"a": i, "b": "x"}) == f"SELECT {i}, '100%', {i}, 'x'"
+        )
+    with pytest.raises(MySQLdb.ProgrammingError):
+        cursor.mogrify("SELECT %s, %s", (1,))
+    with pytest.raises(MySQLdb.ProgrammingError):
+        cursor.mogrify("SELECT %s", (1, 2))
+    # Without args, queries are sent as they are, and long ones aren't cached.
+    assert cursor.mogrify("SELECT '100%%'") == "SELECT '100%%'"
+    long_query = "SELECT %s" + ", 1" * 5000
+    assert cursor.mogrify(long_query, (0,)) == long_query % (0,)
+
+
+def test_mogrify_large_str():
+    conn = connect()
+    cursor = conn.cursor()
+
+    value = "a'b\\é" * 100000
+    query = cursor._mogrify("SELECT %s, %s", [value, 1])
+    assert query == b"SELECT " + conn.string_literal(value.encode()) + b", 1"
+    cursor.execute("SELECT %s", (value,))
+    assert cursor.fetchone() == (value,)
+
+
 # Test that cursor can be used without reading whole resultset.
 @pytest.mark.parametrize("Cursor", [MySQLdb.cursors.Cursor, MySQLdb.cursors.SSCursor])
 def test_cursor_discard_result(Cursor):
@@ -330,3 +360,633 @@ def test_callproc_escaping():
         assert cur.fetchone()[0] == 246
     finally:
         cur.execute("DROP PROCEDURE IF EXISTS `foo.bar`")
+
+
+def test_temporal_columns():
+    from datetime import date, datetime, timedelta
+
+    conn = connect()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "SELECT TIMESTAMP'2015-12-13 01:02:03', TIMESTAMP'2015-12-13 01:02:03.120',"
+        " DATE'2015-12-13', TIME'-12:55:30.5', CAST(NULL AS DATETIME)"
+    )
+    assert cursor.fetchone() == (
+        datetime(2015, 12, 13, 1, 2, 3),
+        datetime(2015, 12, 13, 1, 2, 3, 120000),
+        date(2015, 12, 13),
+        -timedelta(hours=12, minutes=55, seconds=30, microseconds=500000),
+        None,
+    )
+
+    # User supplied converters take precedence over the C implementation.
+    from MySQLdb.constants import FIELD_TYPE
+    from MySQLdb.converters import conversions
+
+    conn = connect(conv={**conversions, FIELD_TYPE.DATE: str})
+    cursor = conn.cursor()
+    cursor.execute("SELECT DATE'2015-12-13'")
+    assert cursor.fetchone() == ("2015-12-13",)
+
+
+def test_converter_reassign():
+    from MySQLdb.constants import FIELD_TYPE
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1")
+    assert cursor.fetchone() == (1,)
+
+    # Decode plans cached for the previous mapping must not be reused.
+    conn.converter = {**conn.converter, FIELD_TYPE.LONGLONG: str}
+    cursor.execute("SELECT 1")
+    assert cursor.fetchone() == ("1",)
+
+
+@pytest.mark.parametrize("Cursor", [MySQLdb.cursors.Cursor, MySQLdb.cursors.SSCursor])
+def test_decimal_format(Cursor):
+    from decimal import Decimal
+    from MySQLdb.constants import FIELD_TYPE
+
+    conn = connect()
+    cursor = conn.cursor(Cursor)
+    query = "SELECT CAST(-12.5 AS DECIMAL(10,2)), CAST(0.5 AS DOUBLE), CAST(NULL AS DECIMAL)"
+
+    cursor.execute(query)
+    assert cursor.fetchall() == ((Decimal("-12.50"), 0.5, None),)
+
+    cursor.decimal_format = "float"
+    cursor.execute(query)
+    assert cursor.fetchall() == ((-12.5, 0.5, None),)
+
+    cursor.decimal_format = "int"
+    cursor.execute(query)
+    assert cursor.fetchall() == ((-1250, 0.5, None),)
+
+    cursor.decimal_format = "str"
+    cursor.execute(query)
+    assert cursor.fetchall() == (("-12.50", 0.5, None),)
+
+    conn = connect(decimal_format="float")
+    cursor = conn.cursor(Cursor)
+    cursor.execute(query)
+    assert cursor.fetchall() == ((-12.5, 0.5, None),)
+
+    with pytest.raises(ValueError):
+        connect(decimal_format="money")
+
+    # int as the converter of DECIMAL is called, not scaled.
+    conn = connect()
+    conn.converter = {**conn.converter, FIELD_TYPE.NEWDECIMAL: int}
+    cursor = conn.cursor(Cursor)
+    with pytest.raises(ValueError):
+        cursor.execute(query)
+        cursor.fetchall()
+
+
+def test_lazy_rows():
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE test_rows (a int, b varchar(10))")
+    _tables.append("test_rows")
+    cursor.executemany(
+        "INSERT INTO test_rows VALUES (%s, %s)", [(i, str(i)) for i in range(10)]
+    )
+
+    cursor.execute("SELECT a, b FROM test_rows ORDER BY a")
+    rows = cursor._rows
+    assert len(rows) == 10
+    assert rows[3] == (3, "3")
+    assert rows[-1] == (9, "9")
+    assert rows[8:1:-3] == ((8, "8"), (5, "5"), (2, "2"))
+    with pytest.raises(IndexError):
+        rows[10]
+
+    assert cursor.fetchone() == (0, "0")
+    cursor.scroll(5, "absolute")
+    assert cursor.fetchmany(2) == ((5, "5"), (6, "6"))
+    assert cursor.fetchall() == ((7, "7"), (8, "8"), (9, "9"))
+
+    cursor = conn.cursor(MySQLdb.cursors.DictCursor)
+    cursor.execute("SELECT a, b FROM test_rows ORDER BY a")
+    r1, r2 = cursor.fetchmany(2)
+    assert r1 == {"a": 0, "b": "0"}
+    assert r2 == {"a": 1, "b": "1"}
+    # Keys are shared by all rows.
+    assert [id(k) for k in r1] == [id(k) for k in r2]
+    assert cursor.fetchall()[-1] == {"a": 9, "b": "9"}
+
+
+def test_lazy_cursor():
+    from datetime import date
+
+    conn = connect()
+    cursor = conn.cursor(MySQLdb.cursors.LazyCursor)
+    cursor.execute("SELECT 1 AS a, 'x' AS b, DATE'2015-12-13' AS c, NULL AS d")
+
+    row = cursor.fetchone()
+    assert len(row) == 4
+    assert row["b"] == "x"
+    assert row[2] is row["c"]  # converted once
+    assert row[-1] is row["d"] is None
+    assert row == (1, "x", date(2015, 12, 13), None)
+    assert hash(row) == hash((1, "x", date(2015, 12, 13), None))
+    a, b, c, d = row
+    assert (a, b, c, d) == (1, "x", date(2015, 12, 13), None)
+    assert row[1:3] == ("x", date(2015, 12, 13))
+    with pytest.raises(KeyError):
+        row["z"]
+    with pytest.raises(IndexError):
+        row[4]
+
+
+def test_namedtuple_cursor():
+    conn = connect()
+    cursor = conn.cursor(MySQLdb.cursors.NamedTupleCursor)
+    cursor.execute("SELECT 1 AS a, 'x' AS b UNION ALL SELECT 2, 'y'")
+
+    r1, r2 = cursor.fetchall()
+    assert r1 == (1, "x")
+    assert (r2.a, r2.b) == (2, "y")
+    assert type(r1) is type(r2)
+    assert type(r1)._fields == ("a", "b")
+
+    # Types are cached by column names.
+    cursor.execute("SELECT 3 AS a, 'z' AS b")
+    assert type(cursor.fetchone()) is type(r1)
+    cursor.execute("SELECT 3 AS a, 'z' AS c")
+    assert cursor.fetchone().c == "z"
+
+
+def test_columnar_cursor():
+    conn = connect()
+    cursor = conn.cursor(MySQLdb.cursors.ColumnarCursor)
+    cursor.execute("CREATE TABLE test_columns (a int, b double, c varchar(10))")
+    _tables.append("test_columns")
+    cursor.executemany(
+        "INSERT INTO test_columns VALUES (%s, %s, %s)",
+        [(i, i / 2, str(i)) if i != 9 else (None, None, None) for i in range(10)],
+    )
+
+    cursor.execute("SELECT a, b, c FROM test_columns ORDER BY a IS NULL, a")
+    (a, b, c), nulls = cursor.fetchcolumns(4)
+    assert (a.typecode, b.typecode) == ("q", "d")
+    assert list(a) == [0, 1, 2, 3]
+    assert list(b) == [0.0, 0.5, 1.0, 1.5]
+    assert c == ["0", "1", "2", "3"]
+    assert nulls == (None, None, None)
+
+    (a, b, c), nulls = cursor.fetchcolumns()
+    assert list(a) == [4, 5, 6, 7, 8, 0]
+    assert c == ["4", "5", "6", "7", "8", None]
+    assert nulls[0] == nulls[1] == bytearray([0b100000])
+    assert nulls[2] is None
+    assert cursor.rownumber == 10
+
+
+@pytest.mark.parametrize("Cursor", [MySQLdb.cursors.Cursor, MySQLdb.cursors.SSCursor])
+def test_arrow_c_stream(Cursor):
+    pa = pytest.importorskip("pyarrow")
+    from datetime import date, datetime
+    from decimal import Decimal
+
+    conn = connect()
+    cursor = conn.cursor(Cursor)
+    cursor.arrow_batch_size = 2
+    cursor.execute(
+        "SELECT 1 AS i, 'x' AS s, DATE'2015-12-13' AS d, TIMESTAMP'2015-12-13 01:02:03' AS dt,"
+        " CAST(-12.5 AS DECIMAL(10,2)) AS dc, CAST(0.5 AS DOUBLE) AS f"
+        " UNION ALL SELECT 2, NULL, NULL, NULL, NULL, NULL"
+        " UNION ALL SELECT 3, 'z', NULL, NULL, NULL, NULL"
+    )
+    reader = pa.RecordBatchReader.from_stream(cursor)
+    assert reader.schema.types == [
+        pa.int64(),
+        pa.large_utf8(),
+        pa.date32(),
+        pa.timestamp("us"),
+        pa.decimal128(10, 2),
+        pa.float64(),
+    ]
+    batches = list(reader)
+    assert [len(b) for b in batches] == [2, 1]
+    table = pa.Table.from_batches(batches)
+    assert table.to_pylist()[0] == {
+        "i": 1,
+        "s": "x",
+        "d": date(2015, 12, 13),
+        "dt": datetime(2015, 12, 13, 1, 2, 3),
+        "dc": Decimal("-12.50"),
+        "f": 0.5,
+    }
+    assert table.column("s").to_pylist() == ["x", None, "z"]
+
+
+def test_sscursor_read_ahead():
+    import io
+
+    conn = connect()
+    cursor = conn.cursor(MySQLdb.cursors.SSCursor)
+    cursor.fetch_batch_size = 3
+
+    cursor.execute("DROP TABLE IF EXISTS test_sscursor_read_ahead")
+    cursor.execute("CREATE TABLE test_sscursor_read_ahead (id INT PRIMARY KEY)")
+    _tables.append("test_sscursor_read_ahead")
+    cursor.executemany(
+        "INSERT INTO test_sscursor_read_ahead (id) VALUES (%s)",
+        [(i,) for i in range(10)],
+    )
+
+    cursor.execute("SELECT id FROM test_sscursor_read_ahead ORDER BY id")
+    assert cursor.fetchone() == (0,)
+    assert cursor.fetchmany(4) == ((1,), (2,), (3,), (4,))
+    assert cursor.fetchone() == (5,)
+    assert next(cursor) == (6,)
+    assert cursor.fetchall() == ((7,), (8,), (9,))
+    assert cursor.rownumber == 10
+    assert cursor.fetchone() is None
+
+    cursor.execute("SELECT id FROM test_sscursor_read_ahead ORDER BY id")
+    assert [row[0] for row in cursor] == list(range(10))
+
+    # copy_to() writes the rows read ahead by fetchone() first.
+    cursor.execute("SELECT id FROM test_sscursor_read_ahead ORDER BY id")
+    assert cursor.fetchone() == (0,)
+    f = io.BytesIO()
+    assert cursor.copy_to(f, "tsv") == 9
+    assert f.getvalue() == b"".join(b"%d\n" % i for i in range(1, 10))
+    assert cursor.rownumber == 10
+
+
+def test_prefetch_cursor():
+    conn = connect()
+    cursor = conn.cursor(MySQLdb.cursors.SSPrefetchCursor)
+    cursor.fetch_batch_size = 3
+
+    cursor.execute("DROP TABLE IF EXISTS test_prefetch_cursor")
+    cursor.execute("CREATE TABLE test_prefetch_cursor (id INT PRIMARY KEY)")
+    _tables.append("test_prefetch_cursor")
+    cursor.executemany(
+        "INSERT INTO test_prefetch_cursor (id) VALUES (%s)", [(i,) for i in range(10)]
+    )
+
+    cursor.execute("SELECT id FROM test_prefetch_cursor ORDER BY id")
+    assert cursor.fetchone() == (0,)
+    assert cursor.fetchmany(4) == ((1,), (2,), (3,), (4,))
+    assert [row[0] for row in cursor] == list(range(5, 10))
+    assert cursor.fetchone() is None
+
+    # Early termination discards the rest of the result.
+    cursor.execute("SELECT id FROM test_prefetch_cursor ORDER BY id")
+    assert cursor.fetchone() == (0,)
+    cursor.execute("SELECT COUNT(*) FROM test_prefetch_cursor")
+    assert cursor.fetchall() == ((10,),)
+
+    cursor.execute("SELECT id FROM test_prefetch_cursor ORDER BY id")
+    assert cursor.fetchone() == (0,)
+    cursor.close()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1")
+    assert cursor.fetchall() == ((1,),)
+
+    # 0 reads all rows in one batch.
+    cursor = conn.cursor(MySQLdb.cursors.SSPrefetchCursor)
+    cursor.fetch_batch_size = 0
+    cursor.execute("SELECT id FROM test_prefetch_cursor ORDER BY id")
+    assert [row[0] for row in cursor] == list(range(10))
+    assert cursor.fetchone() is None
+
+    cursor = conn.cursor(MySQLdb.cursors.SSPrefetchCursor)
+    with pytest.raises(MySQLdb.ProgrammingError):
+        cursor.execute("SELECT * FROM test_prefetch_cursor_no_exists")
+
+
+@pytest.mark.parametrize("Cursor", [MySQLdb.cursors.Cursor, MySQLdb.cursors.SSCursor])
+def test_copy_to(Cursor):
+    import io
+    import json
+
+    conn = connect()
+    cursor = conn.cursor(Cursor)
+    query = (
+        "SELECT 1 AS i, 'a,b \"q\"\\n' AS s, CAST(1.5 AS DECIMAL(5,2)) AS d"
+        " UNION ALL SELECT 2, '', NULL"
+    )
+
+    cursor.execute(query)
+    f = io.StringIO(newline="")
+    assert cursor.copy_to(f, header=True) == 2
+    assert f.getvalue() == 'i,s,d\r\n1,"a,b ""q""\n",1.50\r\n2,"",\r\n'
+    assert cursor.rownumber == 2
+
+    cursor.execute(query)
+    f = io.BytesIO()
+    cursor.copy_to(f, "tsv")
+    assert f.getvalue() == b'1\ta,b "q"\\n\t1.50\n2\t\t\\N\n'
+
+    cursor.execute(query)
+    f = io.BytesIO()
+    cursor.copy_to(f, "ndjson")
+    assert [json.loads(line) for line in f.getvalue().splitlines()] == [
+        {"i": 1, "s": 'a,b "q"\n', "d": 1.5},
+        {"i": 2, "s": "", "d": None},
+    ]
+
+    # Binary columns may not decode, so text files only take them as ndjson.
+    cursor.execute("SELECT x'00ff' AS b")
+    with pytest.raises(MySQLdb.ProgrammingError):
+        cursor.copy_to(io.StringIO(newline=""))
+    cursor.execute("SELECT x'00ff' AS b")
+    f = io.StringIO(newline="")
+    assert cursor.copy_to(f, "ndjson") == 1
+    assert f.getvalue() == '{"b":"AP8="}\n'
+
+
+def test_load_data():
+    import io
+
+    conn = connect(local_infile=True)
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS test_load_data")
+    cursor.execute(
+        "CREATE TABLE test_load_data (id INT PRIMARY KEY, s VARCHAR(20), b BLOB)"
+    )
+    _tables.append("test_load_data")
+
+    rows = [(1, "a\tb\\c\n", b"\x00\xff"), (2, None, b"")]
+    try:
+        assert cursor.load_data("test_load_data", rows) == 2
+    except MySQLdb.DatabaseError as e:
+        # LOAD DATA LOCAL is disabled by the server or the client library.
+        if e.args[0] in (ER.NOT_ALLOWED_COMMAND, 3948, 2068):
+            pytest.skip(str(e))
+        raise
+    cursor.execute("SELECT id, s, b FROM test_load_data ORDER BY id")
+    assert cursor.fetchall() == ((1, "a\tb\\c\n", b"\x00\xff"), (2, None, b""))
+
+    f = io.BytesIO(b'3,"x,y"\r\n4,""\r\n')
+    assert cursor.load_data("test_load_data", f, columns=["id", "s"], format="csv") == 2
+    cursor.execute("SELECT s FROM test_load_data WHERE id > 2 ORDER BY id")
+    assert cursor.fetchall() == (("x,y",), ("",))
+
+    # Qualified table names, as a string or a sequence of parts.
+    cursor.execute("SELECT DATABASE()")
+    (database,) = cursor.fetchone()
+    assert cursor.load_data(f"{database}.test_load_data", [(5, "q", None)]) == 1
+    assert cursor.load_data((database, "test_load_data"), [(6, "r", None)]) == 1
+
+
+def test_executemany_values():
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(
+        "CREATE TABLE test_executemany_values"
+        " (id INT PRIMARY KEY, s VARCHAR(20), f DOUBLE, b BLOB)"
+    )
+    _tables.append("test_executemany_values")
+
+    rows = [
+        (1, "it's \\ é", 1.5, b"\x00\xff'"),
+        (2, None, 1e16, bytearray(b"ab")),
+        (3, "x", None, None),
+    ]
+    q = "INSERT INTO test_executemany_values (id, s, f, b) VALUES (%s, %s, %s, %s)"
+    assert cursor.executemany(q, rows) == 3
+    cursor.execute("SELECT id, s, f, b FROM test_executemany_values ORDER BY id")
+    assert cursor.fetchall() == (
+        (1, "it's \\ é", 1.5, b"\x00\xff'"),
+        (2, None, 1e16, b"ab"),
+        (3, "x", None, None),
+    )
+
+    # Values which are not encoded in C go through the encoders.
+    conn.encoders[int] = lambda v, d: b"%d" % (v * 10)
+    q = "INSERT INTO test_executemany_values (id, s) VALUES (%(id)s, %(s)s)"
+    cursor.executemany(q, [{"id": 4, "s": "a"}, {"id": 5, "s": "b"}])
+    assert cursor._executed.endswith(b"(40, 'a'),(50, 'b')")
+
+    cursor.max_stmt_length = 60
+    q = "INSERT INTO test_executemany_values (id) VALUES (%s)"
+    assert cursor.executemany(q, [(i,) for i in range(10, 20)]) == 10
+    cursor.execute("SELECT COUNT(*) FROM test_executemany_values")
+    assert cursor.fetchone() == (15,)
+
+
+def test_executemany_batch():
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE test_executemany_batch (id INT PRIMARY KEY, v INT)")
+    _tables.append("test_executemany_batch")
+    cursor.executemany(
+        "INSERT INTO test_executemany_batch (id, v) VALUES (%s, 0)",
+        [(i,) for i in range(20)],
+    )
+
+    cursor.max_stmt_length = 200
+    q = "UPDATE test_executemany_batch SET v = %s WHERE id = %s;"
+    assert cursor.executemany(q, [(i * 2, i) for i in range(10)]) == 10
+    assert cursor._executed.count(b";") < 9
+    cursor.execute("SELECT SUM(v) FROM test_executemany_batch")
+    assert cursor.fetchone() == (90,)
+
+    q = "UPDATE test_executemany_batch SET id = %s WHERE id = %s"
+    with pytest.raises(MySQLdb.IntegrityError) as e:
+        cursor.executemany(q, [(100, 0), (101, 1), (3, 2), (103, 4)])
+    assert e.value.index == 2
+    assert cursor.rowcount == 2
+
+    # The rest of the batch was skipped and the connection is still usable.
+    cursor.execute("SELECT id FROM test_executemany_batch WHERE id >= 100")
+    assert cursor.fetchall() == ((100,), (101,))
+
+
+def test_executemany_adaptive_length():
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(
+        "CREATE TABLE test_executemany_adaptive (id INT PRIMARY KEY, s TEXT)"
+    )
+    _tables.append("test_executemany_adaptive")
+
+    cursor.max_stmt_length = None
+    q = "INSERT INTO test_executemany_adaptive (id, s) VALUES (%s, %s)"
+    assert cursor.executemany(q, [(i, "x" * 1000) for i in range(1000)]) == 1000
+
+    sizer = conn.statement_sizer
+    assert sizer.max_length < conn.max_allowed_packet()
+    assert sizer.length <= sizer.max_length
+    assert sizer.stats
+    assert sum(length for length, seconds in sizer.stats) > 1000 * 1000
+    cursor.execute("SELECT COUNT(*) FROM test_executemany_adaptive")
+    assert cursor.fetchone() == (1000,)
+
+
+def test_executemany_overlapped():
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(
+        "CREATE TABLE test_executemany_overlapped (id INT PRIMARY KEY, v INT)"
+    )
+    _tables.append("test_executemany_overlapped")
+
+    cursor.overlapped_executemany = True
+    cursor.max_stmt_length = 100
+    q = "INSERT INTO test_executemany_overlapped (id, v) VALUES (%s, %s)"
+    assert cursor.executemany(q, [(i, 0) for i in range(100)]) == 100
+    q = "UPDATE test_executemany_overlapped SET v = %s WHERE id = %s"
+    assert cursor.executemany(q, [(1, i) for i in range(50)]) == 50
+
+    # The statement which was sent is read before raising the error.
+    q = "INSERT INTO test_executemany_overlapped (id, v) VALUES (%s, %s)"
+    with pytest.raises(MySQLdb.ProgrammingError):
+        cursor.executemany(q, [(i, 0) for i in range(100, 120)] + [(1,)])
+    cursor.execute("SELECT COUNT(*), SUM(v) FROM test_executemany_overlapped")
+    count, total = cursor.fetchone()
+    assert 100 < count < 120
+    assert total == 50
+
+
+def test_prepared_cursor():
+    from datetime import date, datetime, timedelta
+    from decimal import Decimal
+
+    conn = connect()
+    cursor = conn.cursor(MySQLdb.cursors.PreparedCursor)
+    cursor.execute(
+        "CREATE TABLE test_prepared_cursor (id INT PRIMARY KEY, i BIGINT UNSIGNED,"
+        " f DOUBLE, d DECIMAL(10, 2), s VARCHAR(1000), b BLOB, dt DATETIME(6),"
+        " da DATE, t TIME(6))"
+    )
+    _tables.append("test_prepared_cursor")
+
+    rows = [
+        (
+            1,
+            2**64 - 1,
+            1.5,
+            Decimal("1.25"),
+            "spam 100%",
+            b"\x00'\\",
+            datetime(2015, 12, 13, 1, 2, 3, 120000),
+            date(2015, 12, 13),
+            -timedelta(hours=12, minutes=55, seconds=30, microseconds=500000),
+        ),
+        (2, None, None, None, "x" * 1000, b"", None, None, None),
+    ]
+    q = "INSERT INTO test_prepared_cursor VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    assert cursor.executemany(q, rows) == 2
+
+    cursor.execute("SELECT * FROM test_prepared_cursor WHERE id > %s ORDER BY id", (0,))
+    assert cursor.fetchall() == tuple(rows)
+    assert [d[0] for d in cursor.description] == [
+        "id",
+        "i",
+        "f",
+        "d",
+        "s",
+        "b",
+        "dt",
+        "da",
+        "t",
+    ]
+
+    cursor.execute(
+        "SELECT s FROM test_prepared_cursor WHERE id = %(id)s AND s LIKE 'spam 100%%'",
+        {"id": 1},
+    )
+    assert cursor.fetchall() == (("spam 100%",),)
+
+    cursor.execute("UPDATE test_prepared_cursor SET f = %s WHERE id = %s", (2.5, 1))
+    assert cursor.rowcount == 1
+    assert cursor.description is None
+
+    with pytest.raises(MySQLdb.IntegrityError) as e:
+        cursor.executemany(q, [(3,) + rows[1][1:], rows[0]])
+    assert e.value.index == 1
+
+
+def test_prepared_cursor_stream():
+    import io
+
+    conn = connect()
+    cursor = conn.cursor(MySQLdb.cursors.PreparedCursor)
+    cursor.execute(
+        "CREATE TABLE test_prepared_cursor_stream (id INT PRIMARY KEY, b LONGBLOB)"
+    )
+    _tables.append("test_prepared_cursor_stream")
+
+    data = bytes(range(256)) * 10000  # several chunks
+    q = "INSERT INTO test_prepared_cursor_stream VALUES (%s, %s)"
+    cursor.execute(q, (1, io.BytesIO(data)))
+    cursor.execute(q, (2, iter([b"spam", "égg"])))
+    cursor.execute(q, (3, io.BytesIO()))
+
+    cursor.execute("SELECT b FROM test_prepared_cursor_stream ORDER BY id")
+    assert cursor.fetchall() == ((data,), ("spamégg".encode(),), (b"",))
+
+
+def test_statement_cache():
+    conn = connect()
+    cursor = conn.cursor()
+    q = "SELECT %s + 1"
+    assert cursor.execute(q, (1,), prepared=True) == 1
+    assert cursor.fetchall() == ((2,),)
+    cursor.execute(q, (2,), prepared=True)
+    assert cursor.fetchall() == ((3,),)
+    cache = conn.statement_cache
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+    # Evicted statements are closed.
+    cache.max_size = 2
+    for i in range(3):
+        cursor.execute("SELECT %s - " + str(i), (i,), prepared=True)
+    assert len(cache) == 2
+    assert cache.misses == 4
+
+    with pytest.raises(MySQLdb.NotSupportedError):
+        conn.cursor(MySQLdb.cursors.DictCursor).execute(q, (1,), prepared=True)
+
+
+def test_executemany_array_binding():
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(
+        "CREATE TABLE test_executemany_array_binding (id INT PRIMARY KEY, v VARCHAR(10))"
+    )
+    _tables.append("test_executemany_array_binding")
+
+    # Sent with array binding on MariaDB, and in batches otherwise.
+    cursor.array_binding = True
+    q = "INSERT INTO test_executemany_array_binding (id, v) VALUES (%s, %s)"
+    assert (
+        cursor.executemany(q, [(i, None if i % 2 else str(i)) for i in range(10)]) == 10
+    )
+    q = "UPDATE test_executemany_array_binding SET v = %s WHERE id = %s"
+    assert cursor.executemany(q, [("a", 1), ("b", 2), ("c", 100)]) == 2
+    # Parameters of different types can't be bound as arrays.
+    assert cursor.executemany(q, [("a", 3), (4, 4)]) == 2
+    # Nor sequences, or generators, which are only read once.
+    q = "UPDATE test_executemany_array_binding SET v = %s WHERE id IN %s"
+    assert cursor.executemany(q, [("x", (5, 6)), ("y", (7,))]) == 3
+    assert cursor.executemany(q, (("z", (i,)) for i in (8, 9))) == 2
+
+    q = "UPDATE test_executemany_array_binding SET id = %s WHERE id = %s"
+    with pytest.raises(MySQLdb.IntegrityError) as e:
+        cursor.executemany(q, [(100, 9), (0, 8)])
+    # The server doesn't tell the failing row of array binding.
+    assert e.value.index in (None, 1)
+
+    cursor.execute(
+        "SELECT v FROM test_executemany_array_binding WHERE id < 8 ORDER BY id"
+    )
+    assert cursor.fetchall() == (
+        ("0",),
+        ("a",),
+        ("b",),
+        ("a",),
+        ("4",),
+        ("x",),
+        ("x",),
+        ("y",),
+    )